@@ -4,6 +4,7 @@ import time
 import math
 from typing import Tuple, List
 from arm_control_pkg.utils import get_yaw_from_quaternion, normalize_angle
+from pros_car_py.log_sampling import LogSampler
 import random
 class ArmAutoController:
     def __init__(
@@ -14,6 +15,7 @@ class ArmAutoController:
         self.arm_commute_node = arm_commute_node
         self.arm_agnle_control = arm_agnle_control
         self.depth = 100.0
+        self._log_sampler = LogSampler()
 
     def catch2(self, should_cancel=lambda: False):
         self.arm_agnle_control.arm_index_change(0, 100.0)
@@ -78,17 +80,24 @@ class ArmAutoController:
 
     def catch(self, should_cancel=lambda: False):
         label = "tennis"
+        seq = 0
+        # 等待 YOLO 更新，每筆新資料才檢查一次深度
         while self.depth > 0.4:
-            print(self.depth)
-            try:
-                self.depth = self.arm_commute_node.get_latest_object_coordinates(label=label)[0]
-            except:
+            if should_cancel():
+                self._log_sampler.flush()
+                return ArmGoal.Result(success=False, message="Canceled by user")
+            seq, coordinates = self._wait_for_object(label, seq)
+            if coordinates is None:
                 continue
+            self.depth = coordinates[0]
+            self._log_sampler.log("catch depth", self.depth)
+        self._log_sampler.flush()
         while 1:
             if should_cancel():
                 return ArmGoal.Result(success=False, message="Canceled by user")
             if self.follow_obj(label=label)  == True:
                 break
+            seq, _ = self._wait_for_object(label, seq)
             # if self.follow_obj(label="ball") == True:
             #     break
 
@@ -124,6 +133,21 @@ class ArmAutoController:
 
         return ArmGoal.Result(success=True, message="success")
 
+    def _wait_for_object(self, label, seq, timeout=0.5):
+        """
+        等待比 seq 更新的 YOLO 座標。
+
+        Returns:
+            (seq, coordinates): 最新的序號與 label 的 [x, y, z]，
+            逾時或沒偵測到 label 時 coordinates 為 None。
+        """
+        sample = self.arm_commute_node.wait_for(
+            "object_coordinates", newer_than=seq, timeout=timeout
+        )
+        if sample is None:
+            return seq, None
+        return sample.seq, sample.value.get(label)
+
     def seek_arucode(self, joint_idx: int = 0, sleep_s: float = 0.2):
         """
         掃描指定關節 (joint_idx) 從 0~180 度，邊掃邊讀取 ArUco 深度；
@@ -189,16 +213,25 @@ class ArmAutoController:
         # 開始旋轉
         self.arm_commute_node.publish_control(vel=[5.0, -5.0, 5.0, -5.0])
 
+        seq = 0
         while True:
             _, rotation = self.arm_commute_node.get_car_position_and_orientation()
             yaw = get_yaw_from_quaternion(rotation)
             yaw_error = normalize_angle(target_yaw - yaw)
 
-            print(f"Current Yaw: {math.degrees(yaw):.2f}, Target: {math.degrees(target_yaw):.2f}, Error: {math.degrees(yaw_error):.2f}")
+            self._log_sampler.log(
+                "rotate_car yaw error (deg)", math.degrees(yaw_error)
+            )
 
             if abs(yaw_error) < math.radians(5):  # 誤差小於 5 度即停止
                 break
-            time.sleep(0.1)
+            # 收到新的 AMCL pose 才重新計算
+            sample = self.arm_commute_node.wait_for(
+                "amcl_pose", newer_than=seq, timeout=0.5
+            )
+            if sample is not None:
+                seq = sample.seq
+        self._log_sampler.flush()
 
         for i in range(5):
             # 停止轉動
@@ -224,9 +257,13 @@ class ArmAutoController:
             time.sleep(1.0)
 
     def object_follow(self, should_cancel=lambda: False):
+        seq = 0
         while 1:
             if should_cancel():
                 return ArmGoal.Result(success=False, message="Canceled by user")
+            seq, coordinates = self._wait_for_object("tennis", seq)
+            if coordinates is None:
+                continue
             self.follow_obj(label="tennis", step=5)
 
     def radians_to_degrees(self, radians_list):
@@ -8,9 +8,19 @@ from rclpy.clock import Clock
 from builtin_interfaces.msg import Time
 import numpy as np
 from scipy.spatial.transform import Rotation as R
-import json  # Import the json module
+import orjson
 from geometry_msgs.msg import PoseWithCovarianceStamped, PoseStamped, Twist
 from visualization_msgs.msg import Marker
+from custome_interfaces.msg import ObjectOffsets
+from pros_car_py.message_buffers import ArrayPublisher
+from pros_car_py.topic_cache import TopicCache
+from pros_car_py.topic_qos import TopicQosConfig
+from pros_car_py.yolo_offsets import object_offsets_from_msg, parse_object_offsets
+
+
+def _imu_orientation(msg: Imu):
+    orientation = msg.orientation
+    return [orientation.x, orientation.y, orientation.z, orientation.w]
 
 # can change one index angle
 # chnage the angle of all joints
@@ -23,6 +33,10 @@ class ArmCummuteNode(Node):
         self.arm_angle_control = arm_angle_control
         # Load parameters first
         self.arm_params = arm_params.get_arm_params()
+        # Subscription QoS and callback groups from config/topic_qos.yaml
+        self.topic_qos = TopicQosConfig(self)
+        # Latest subscribed data, read by ArmAutoController from the action thread
+        self.topic_cache = TopicCache(self.topic_qos)
 
         # Initialize arm parameters publisher
         self.arm_pub = self.create_publisher(
@@ -39,6 +53,15 @@ class ArmCummuteNode(Node):
             'car_C_front_wheel',
             10
         )
+        # Reused messages for the arm and wheel commands sent at control rate
+        self.arm_command = ArrayPublisher(
+            self.arm_pub,
+            field="positions",
+            typecode="d",
+            size=int(self.arm_params["global"]["joints_count"]),
+        )
+        self.rear_wheel_command = ArrayPublisher(self.rear_wheel_pub, size=2)
+        self.front_wheel_command = ArrayPublisher(self.front_wheel_pub, size=2)
 
         self.arucode_pub = self.create_publisher(Float32, '/aruco/id100/depth_m', 10)
 
@@ -55,14 +78,14 @@ class ArmCummuteNode(Node):
         )
 
         # --- Add IMU Subscriber ---
-        self.latest_imu_data = None
-        self.imu_sub = self.create_subscription(
+        self.imu_sub = self.topic_cache.subscribe(
+            self,
             Imu,
             self.arm_params["global"][
                 "imu_receive_topic"
             ],  # Get topic name from config
-            self.imu_callback,
-            10,
+            key="imu",
+            convert=_imu_orientation,
         )
         self.get_logger().info(
             f"Subscribing to IMU topic: {self.arm_params['global']['imu_receive_topic']}"
@@ -70,33 +93,41 @@ class ArmCummuteNode(Node):
         # --------------------------
 
         # --- Add arucode Subscriber ---
-        self.latest_arucode_depth = None
-        self.arucode_sub = self.create_subscription(
+        self.arucode_sub = self.topic_cache.subscribe(
+            self,
             Float32,               # 訊息型別
             '/aruco/id100/depth_m', # topic 名稱
-            self.arucode_sub_callback,   # callback 函式
-            10                     # QoS
+            key="arucode_depth",
+            convert=lambda msg: msg.data,
         )
         # --------------------------
 
         # --- Add yolo object offset Subscriber ---
-        self.object_coordinates = {}
-        self.yolo_object_offset_sub = self.create_subscription(
-            String,
-            self.arm_params["global"][
-                "yolo_object_offset_receive_topic"
-            ],  # Get topic name from config
-            self.yolo_object_offset_callback,
-            1,
-        )
+        yolo_offset_topic = self.arm_params["global"][
+            "yolo_object_offset_receive_topic"
+        ]  # Get topic name from config
+        # True: read custome_interfaces/ObjectOffsets from <topic>_typed instead of JSON
+        if self.declare_parameter("yolo_offset_typed", False).value:
+            self.yolo_object_offset_sub = self.topic_qos.subscribe(
+                ObjectOffsets,
+                f"{yolo_offset_topic}_typed",
+                self.yolo_object_offset_typed_callback,
+                1,
+            )
+        else:
+            self.yolo_object_offset_sub = self.topic_qos.subscribe(
+                String,
+                yolo_offset_topic,
+                self.yolo_object_offset_callback,
+                1,
+            )
         self.get_logger().info(
             f"Subscribing to IMU topic: {self.arm_params['global']['imu_receive_topic']}"
         )
         # --------------------------
         # --- Add AMCL Pose Subscriber ---
-        self.latest_amcl_pose = None
-        self.amcl_sub = self.create_subscription(
-            PoseWithCovarianceStamped, "/amcl_pose", self._amcl_callback, 10
+        self.amcl_sub = self.topic_cache.subscribe(
+            self, PoseWithCovarianceStamped, "/amcl_pose", key="amcl_pose"
         )
 
     def clear_arucode_topic(self):
@@ -104,38 +135,29 @@ class ArmCummuteNode(Node):
         msg.data = float('nan')
         self.arucode_pub.publish(msg)
 
-    def _amcl_callback(self, msg):
-        """Store latest AMCL pose"""
-        self.latest_amcl_pose = msg
-
-    def get_car_position_and_orientation(self):
+    def get_car_position_and_orientation(self, max_age=None):
         """
         Get current car position and orientation
 
+        Args:
+            max_age (float): treat poses older than this many seconds as unavailable
+
         Returns:
             Tuple containing (position, orientation) or (None, None) if data unavailable
         """
-        if self.latest_amcl_pose:
-            position = self.latest_amcl_pose.pose.pose.position
-            orientation = self.latest_amcl_pose.pose.pose.orientation
+        amcl_pose = self.topic_cache.get("amcl_pose", max_age=max_age)
+        if amcl_pose:
+            position = amcl_pose.pose.pose.position
+            orientation = amcl_pose.pose.pose.orientation
             return position, orientation
         return None, None
 
-    def imu_callback(self, msg: Imu):
-        """Callback function for processing incoming IMU data."""
-        # Example: Log the orientation quaternion
-        orientation = msg.orientation
-        self.latest_imu_data = msg
-        # You can add more processing here, e.g., converting quaternion to Euler angles
-        # or using linear acceleration/angular velocity data.
-
-    def get_latest_imu_data(self):
+    def get_latest_imu_data(self, max_age=None):
         """
         回傳收到的最新 IMU 方向四元數 [x, y, z, w]。
         如果還沒收到過就回傳 None。
         """
-        orientation = self.latest_imu_data.orientation
-        return [orientation.x, orientation.y, orientation.z, orientation.w]
+        return self.topic_cache.get("imu", max_age=max_age)
 
     def publish_pos(self):
         """Publish a goal 50cm in front of the current orientation + Marker"""
@@ -190,76 +212,57 @@ class ArmCummuteNode(Node):
 
     def publish_control(self, vel):
         # Both publishers are available
-        rear_msg = Float32MultiArray()
-        front_msg = Float32MultiArray()
-        front_msg.data = vel[0:2]
-        rear_msg.data = vel[2:4]
-        self.rear_wheel_pub.publish(rear_msg)
-        self.front_wheel_pub.publish(front_msg)
-
-    def arucode_sub_callback(self, msg: Float32):
-        self.latest_arucode_depth = msg.data
+        self.rear_wheel_command.publish(vel[2:4])
+        self.front_wheel_command.publish(vel[0:2])
 
-    def get_latest_arucode_depth(self):
-        return self.latest_arucode_depth
+    def get_latest_arucode_depth(self, max_age=None):
+        return self.topic_cache.get("arucode_depth", max_age=max_age)
 
     def clear_arucode_signal(self):
-        self.latest_arucode_depth = None
+        self.topic_cache.clear("arucode_depth")
 
     def yolo_object_offset_callback(self, msg: String):
         """Callback function for processing incoming YOLO object offset data."""
         try:
-            # Extract the JSON string from the message data
-            json_string = msg.data
-            # Parse the JSON string into a Python list of dictionaries
-            object_list = json.loads(json_string)
-
-            # Create a new dictionary mapping labels to coordinates
-            new_coordinates = {}
-            for item in object_list:
-                if isinstance(item, dict) and "label" in item and "offset_flu" in item:
-                    label = item["label"]
-                    coordinates = item["offset_flu"]
-                    # Ensure coordinates are a list of floats
-                    if isinstance(coordinates, list) and len(coordinates) == 3:
-                        try:
-                            float_coords = [float(c) for c in coordinates]
-                            new_coordinates[label] = float_coords
-                        except (ValueError, TypeError):
-                            self.get_logger().warn(
-                                f"Invalid coordinate format for label '{label}': {coordinates}"
-                            )
-                    else:
-                        self.get_logger().warn(
-                            f"Unexpected coordinate format for label '{label}': {coordinates}"
-                        )
-                else:
-                    self.get_logger().warn(
-                        f"Skipping invalid item in JSON list: {item}"
-                    )
-
-            # Update the stored coordinates
-            self.object_coordinates = new_coordinates
-            # self.get_logger().info(
-            #     f"Updated object coordinates: {self.object_coordinates}"
-            # )
-        except json.JSONDecodeError as e:
+            coordinates = parse_object_offsets(msg.data, self.get_logger().warn)
+        except orjson.JSONDecodeError as e:
             self.get_logger().error(f"Failed to decode JSON string: {e}")
             self.get_logger().error(f"Received string: {msg.data}")
-        except Exception as e:
-            self.get_logger().error(f"Error processing YOLO offset message: {e}")
+            return
+        self.topic_cache.put("object_coordinates", coordinates, msg)
+
+    def yolo_object_offset_typed_callback(self, msg):
+        """Callback for custome_interfaces/ObjectOffsets on the typed YOLO offset topic."""
+        try:
+            coordinates = object_offsets_from_msg(msg)
+        except ValueError as e:
+            self.get_logger().error(f"Invalid ObjectOffsets message: {e}")
+            return
+        self.topic_cache.put("object_coordinates", coordinates, msg)
+
+    def wait_for(self, key, newer_than=None, timeout=None):
+        """
+        Block the calling thread until the cached topic `key` gets a sample
+        with a sequence number above `newer_than` (see TopicCache.wait_for).
+
+        Returns the TopicSample, or None on timeout.
+        """
+        return self.topic_cache.wait_for(key, newer_than, timeout)
 
-    def get_latest_object_coordinates(self, label: str = None) -> dict:
+    def get_latest_object_coordinates(self, label: str = None, max_age=None) -> dict:
         """
         回傳解析後的 YOLO 物體偏移字典，
         格式 { label: [x, y, z], … }，
         若還沒收到就回空 dict。
         """
+        object_coordinates = self.topic_cache.get(
+            "object_coordinates", {}, max_age=max_age
+        )
         if label is None:
             # 全部回傳
-            return self.object_coordinates
+            return object_coordinates
         # 單一物體回傳
-        return self.object_coordinates.get(label, None)
+        return object_coordinates.get(label, None)
 
     def degrees_to_radians(self, degree_positions):
         """Convert a list of positions from degrees to radians using NumPy
@@ -292,13 +295,11 @@ class ArmCummuteNode(Node):
     def publish_arm_angle(self):
         """Publish the current arm joint angles"""
         joint_positions = self.arm_angle_control.get_arm_angles()
-        msg = JointTrajectoryPoint()
-        radian_positions = self.degrees_to_radians(joint_positions)
-        msg.positions = radian_positions
-        msg.velocities = []
-        msg.accelerations = []
-        msg.effort = []
-        msg.time_from_start.sec = 0
-        msg.time_from_start.nanosec = 0
-        self.arm_pub.publish(msg)
+        try:
+            radian_positions = np.deg2rad(np.asarray(joint_positions, dtype=float))
+        except (ValueError, TypeError):
+            # Converts the valid values one by one and logs the others
+            radian_positions = self.degrees_to_radians(joint_positions)
+        # velocities, accelerations, effort and time_from_start stay empty / zero
+        self.arm_command.publish(radian_positions)
         # self.get_logger().info(f"Published angles in radians: {radian_positions}")
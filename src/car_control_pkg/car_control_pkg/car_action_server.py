@@ -5,6 +5,14 @@ from action_interface.action import NavGoal
 from car_control_pkg.car_control_common import BaseCarControlNode
 import functools  # Import functools
 from car_control_pkg.car_nav_controller import NavigationController
+from pros_car_py.rate_loop import EventRateLoop, format_event_stats
+
+# Cached topics whose updates trigger a control step in the "event" tick mode
+MODE_TRIGGERS = {
+    "Manual_Nav": ("amcl_pose", "global_plan", "goal_pose"),
+    "Customize_Nav": ("amcl_pose", "global_plan", "goal_pose", "object_coordinates"),
+}
+NAV_TICK_MODES = ("event", "fixed")
 
 
 class NavigationActionServer(Node):
@@ -20,17 +28,28 @@ class NavigationActionServer(Node):
         )
         self.car_control_node = car_control_node
         self.nav_controller = NavigationController(self.car_control_node)
+        # "event": step on input updates, between nav_tick_min_rate and
+        # nav_tick_max_rate; "fixed": step at nav_tick_rate
+        self.tick_mode = self.declare_parameter("nav_tick", "event").value
+        if self.tick_mode not in NAV_TICK_MODES:
+            raise ValueError(
+                f"Invalid nav_tick '{self.tick_mode}', expected one of {NAV_TICK_MODES}"
+            )
+        self.tick_min_rate = self.declare_parameter("nav_tick_min_rate", 5.0).value
+        self.tick_max_rate = self.declare_parameter("nav_tick_max_rate", 30.0).value
+        self.tick_rate = self.declare_parameter("nav_tick_rate", 10.0).value
         self.get_logger().info("Navigation Action Server initialized")
 
     def goal_callback(self, goal_request):
         self.get_logger().info("Received goal request")
         requested_mode = goal_request.mode
+        if requested_mode not in MODE_TRIGGERS:
+            self.get_logger().error(f"Unknown mode requested: {requested_mode}")
+            return GoalResponse.REJECT
         if requested_mode == "Manual_Nav":
             car_position, _ = self.car_control_node.get_car_position_and_orientation()
-            path_points = self.car_control_node.get_path_points(
-                include_orientation=True
-            )
-            if not car_position or not path_points:
+            path = self.car_control_node.get_path_snapshot()
+            if not car_position or path is None:
                 self.get_logger().error("Cannot start navigation: Missing data")
                 return GoalResponse.REJECT
         return GoalResponse.ACCEPT
@@ -45,12 +64,27 @@ class NavigationActionServer(Node):
         result = NavGoal.Result()
         mode = goal_handle.request.mode
         print("mode : ", mode)
-        rate = self.create_rate(10)
+        car_auto_method = self._select_car_auto_method(mode)
+        if car_auto_method is None:
+            goal_handle.abort()
+            return NavGoal.Result(success=False, message=f"Unknown mode: {mode}")
+        if self.tick_mode == "event":
+            # Subscriptions run on other executor threads and wake this one
+            loop = EventRateLoop(
+                self.car_control_node.topic_cache,
+                MODE_TRIGGERS[mode],
+                self.tick_min_rate,
+                self.tick_max_rate,
+                name=f"{mode} tick",
+                report=self.get_logger().debug,
+            )
+        else:
+            loop = self.create_rate(self.tick_rate)
         self.nav_controller.reset_index()
+        feedback_msg = NavGoal.Feedback()
         while rclpy.ok():
             # First give executor time to process callbacks
-            rate.sleep()
-            car_auto_method = self._select_car_auto_method(mode)
+            loop.sleep()
             if goal_handle.is_cancel_requested:
                 self.get_logger().info("Navigation canceled by user")
                 self.car_control_node.publish_control("STOP")
@@ -72,11 +106,14 @@ class NavigationActionServer(Node):
                 result = nav_result
                 break
 
-            # Publish feedback if navigation is ongoing
-            feedback_msg = NavGoal.Feedback()
-            feedback_msg.distance_to_goal = float(0.0)
+            # Publish feedback if navigation is ongoing, NaN before the first distance
+            feedback_msg.distance_to_goal = float(self.nav_controller.distance_to_goal)
             goal_handle.publish_feedback(feedback_msg)
 
+        if self.tick_mode == "event":
+            self.get_logger().info(format_event_stats(loop.stats()))
+        else:
+            self.destroy_rate(loop)
         return result
 
     def _select_car_auto_method(self, mode: str):
@@ -6,7 +6,20 @@ from nav_msgs.msg import Path
 from car_control_pkg.utils import get_action_mapping, parse_control_signal
 import copy
 from car_control_pkg.nav2_utils import cal_distance
-import json
+import orjson
+from pros_car_py.log_sampling import LogSampler
+from pros_car_py.message_buffers import ArrayPublisher
+from pros_car_py.path_arrays import path_snapshot
+from pros_car_py.path_index import PathIndex
+from pros_car_py.topic_cache import TopicCache
+from pros_car_py.topic_qos import TopicQosConfig
+from pros_car_py.yolo_offsets import (
+    OBJECT_OFFSET_TOPIC,
+    OBJECT_OFFSET_TYPED_TOPIC,
+    object_offsets_from_msg,
+    parse_object_offsets,
+)
+from custome_interfaces.msg import ObjectOffsets
 
 
 class CarControlPublishers:
@@ -14,7 +27,10 @@ class CarControlPublishers:
 
     @staticmethod
     def create_publishers(node):
-        """Create and return common publishers for car control"""
+        """
+        Create and return common publishers for car control, as
+        ArrayPublisher wrappers reusing one wheel command message each.
+        """
         rear_wheel_pub = node.create_publisher(
             Float32MultiArray, "car_C_rear_wheel", 10
         )
@@ -22,18 +38,23 @@ class CarControlPublishers:
             Float32MultiArray, "car_C_front_wheel", 10
         )
 
-        return rear_wheel_pub, front_wheel_pub
+        return ArrayPublisher(rear_wheel_pub, size=2), ArrayPublisher(
+            front_wheel_pub, size=2
+        )
 
     @staticmethod
     def create_control_subscription(node, callback):
         """Create subscription for car control signals"""
-        return node.create_subscription(String, "car_control_signal", callback, 10)
+        return node.topic_qos.subscribe(String, "car_control_signal", callback, 10)
 
     @staticmethod
-    def publish_control(node, action, rear_wheel_pub, front_wheel_pub=None):
+    def publish_control(
+        node, action, rear_wheel_pub, front_wheel_pub=None, log_sampler=None
+    ):
         """
         If the action is a string, it will be converted to a velocity array using the action mapping.
         If the action is a list, it will be used as the velocity array directly.
+        The publishers are ArrayPublisher instances from create_publishers.
         """
         if not isinstance(action, str):
             vel = [action[0], action[1], action[0], action[1]]
@@ -43,21 +64,15 @@ class CarControlPublishers:
 
         if front_wheel_pub is None:
             # Only rear wheel publisher is available
-            rear_msg = Float32MultiArray()
-            rear_msg.data = vel  # Use entire velocity array [0:4]
-            rear_wheel_pub.publish(rear_msg)
-            node.get_logger().debug(f"Publishing all control data to rear wheel: {vel}")
+            rear_wheel_pub.publish(vel)  # Use entire velocity array [0:4]
+            if log_sampler is not None:
+                log_sampler.log("Publishing all control data to rear wheel", vel)
         else:
             # Both publishers are available
-            rear_msg = Float32MultiArray()
-            front_msg = Float32MultiArray()
-            front_msg.data = vel[0:2]
-            rear_msg.data = vel[2:4]
-            rear_wheel_pub.publish(rear_msg)
-            front_wheel_pub.publish(front_msg)
-            node.get_logger().debug(
-                f"Publishing split control data: front={vel[0:2]}, rear={vel[2:4]}"
-            )
+            rear_wheel_pub.publish(vel[2:4])
+            front_wheel_pub.publish(vel[0:2])
+            if log_sampler is not None:
+                log_sampler.log("Publishing split control data (front + rear)", vel)
 
 
 class BaseCarControlNode(Node):
@@ -66,6 +81,12 @@ class BaseCarControlNode(Node):
     def __init__(self, node_name, enable_nav_subscribers=False):
         super().__init__(node_name)
 
+        # Subscription QoS and callback groups from config/topic_qos.yaml
+        self.topic_qos = TopicQosConfig(self)
+
+        # Sampled debug logging for the per-tick control and navigation paths
+        self.log_sampler = LogSampler(self.get_logger().debug, node=self)
+
         # Create common publishers
         self.rear_wheel_pub, self.front_wheel_pub = (
             CarControlPublishers.create_publishers(self)
@@ -80,13 +101,11 @@ class BaseCarControlNode(Node):
             self, self.key_callback
         )
 
-        # Navigation data storage
-        self.latest_amcl_pose = None
-        self.latest_goal_pose = None
-        self.latest_global_plan = None
-        self.latest_camera_depth = None
-        self.latest_yolo_info = None
-        self.latest_cmd_vel = None
+        # Navigation data storage, written by the subscriptions and read by
+        # the navigation action thread
+        self.topic_cache = TopicCache(self.topic_qos)
+        # (global_plan seq, PathIndex) of the last plan indexed by get_path_index
+        self._path_index = None
 
         # Create navigation data subscribers if enabled
         if enable_nav_subscribers:
@@ -109,7 +128,7 @@ class BaseCarControlNode(Node):
         empty.pose.orientation.z = 0.0
         empty.pose.orientation.w = 1.0
         self.goal_clear_pub.publish(empty)
-        self.latest_goal_pose = None
+        self.topic_cache.clear("goal_pose")
         self.get_logger().info('Cleared /goal_pose topic')
 
     def clear_plan(self):
@@ -122,139 +141,130 @@ class BaseCarControlNode(Node):
         empty.header.frame_id = ''
         empty.poses = []
         self.plan_clear_pub.publish(empty)
-        self.latest_global_plan = None
+        self.topic_cache.clear("global_plan")
         self.get_logger().info('Cleared /plan topic')
 
     def _create_navigation_subscribers(self):
         """Create all subscribers needed for navigation"""
-        self.amcl_sub = self.create_subscription(
-            PoseWithCovarianceStamped, "/amcl_pose", self._amcl_callback, 10
+        cache = self.topic_cache
+        self.amcl_sub = cache.subscribe(
+            self, PoseWithCovarianceStamped, "/amcl_pose", key="amcl_pose"
         )
 
-        self.goal_pose_sub = self.create_subscription(
-            PoseStamped, "/goal_pose", self._goal_pose_callback, 10
+        self.goal_pose_sub = cache.subscribe(
+            self, PoseStamped, "/goal_pose", key="goal_pose"
         )
 
-        self.plan_sub = self.create_subscription(
-            Path, "/received_global_plan", self._global_plan_callback, 1
+        self.plan_sub = cache.subscribe(
+            self,
+            Path,
+            "/received_global_plan",
+            key="global_plan",
+            convert=path_snapshot,
+            qos=1,
         )
 
-        self.cmd_vel_sub = self.create_subscription(
-            Twist, "/cmd_vel", self.cmd_vel_callback, 10
+        self.cmd_vel_sub = cache.subscribe(
+            self, Twist, "/cmd_vel", key="cmd_vel", convert=self.cmd_vel_to_wheel_speeds
         )
 
-        self.camera_depth_sub = self.create_subscription(
+        self.camera_depth_sub = cache.subscribe(
+            self,
             Float32MultiArray,
             "/camera/x_multi_depth_values",
-            self._camera_depth_callback,
-            10,
-        )
-        self.object_coordinates = {}
-        self.yolo_sub = self.create_subscription(
-            String, "/yolo/object/offset", self._yolo_callback, 10
+            key="camera_depth",
+            convert=lambda msg: list(msg.data),
         )
+        # True: read custome_interfaces/ObjectOffsets instead of the JSON topic
+        if self.declare_parameter("yolo_offset_typed", False).value:
+            self.yolo_sub = self.topic_qos.subscribe(
+                ObjectOffsets, OBJECT_OFFSET_TYPED_TOPIC, self._yolo_typed_callback, 10
+            )
+        else:
+            self.yolo_sub = self.topic_qos.subscribe(
+                String, OBJECT_OFFSET_TOPIC, self._yolo_callback, 10
+            )
 
         self.get_logger().info("Navigation subscribers created")
 
     # Callback methods for navigation data
-    def _amcl_callback(self, msg):
-        """Store latest AMCL pose"""
-        self.latest_amcl_pose = msg
-
-    def _goal_pose_callback(self, msg):
-        """Store latest AMCL pose"""
-        self.latest_goal_pose = msg
-
-    def _global_plan_callback(self, msg):
-        """Store latest global plan"""
-        self.latest_global_plan = msg
-
-    def _camera_depth_callback(self, msg):
-        """Store latest camera depth data"""
-        self.latest_camera_depth = list(msg.data)
-
     def _yolo_callback(self, msg):
-        """ "Callback function for processing incoming YOLO object offset data."""
+        """Callback function for processing incoming YOLO object offset data."""
         try:
-            # Extract the JSON string from the message data
-            json_string = msg.data
-            # Parse the JSON string into a Python list of dictionaries
-            object_list = json.loads(json_string)
-
-            # Create a new dictionary mapping labels to coordinates
-            new_coordinates = {}
-            for item in object_list:
-                if isinstance(item, dict) and "label" in item and "offset_flu" in item:
-                    label = item["label"]
-                    coordinates = item["offset_flu"]
-                    # Ensure coordinates are a list of floats
-                    if isinstance(coordinates, list) and len(coordinates) == 3:
-                        try:
-                            float_coords = [float(c) for c in coordinates]
-                            new_coordinates[label] = float_coords
-                        except (ValueError, TypeError):
-                            self.get_logger().warn(
-                                f"Invalid coordinate format for label '{label}': {coordinates}"
-                            )
-                    else:
-                        self.get_logger().warn(
-                            f"Unexpected coordinate format for label '{label}': {coordinates}"
-                        )
-                else:
-                    self.get_logger().warn(
-                        f"Skipping invalid item in JSON list: {item}"
-                    )
-
-            # Update the stored coordinates
-            self.object_coordinates = new_coordinates
-            # self.get_logger().info(
-            #     f"Updated object coordinates: {self.object_coordinates}"
-            # )
-        except json.JSONDecodeError as e:
+            coordinates = parse_object_offsets(msg.data, self.get_logger().warn)
+        except orjson.JSONDecodeError as e:
             self.get_logger().error(f"Failed to decode JSON string: {e}")
             self.get_logger().error(f"Received string: {msg.data}")
-        except Exception as e:
-            self.get_logger().error(f"Error processing YOLO offset message: {e}")
+            return
+        self.topic_cache.put("object_coordinates", coordinates, msg)
+
+    def _yolo_typed_callback(self, msg):
+        """Callback for custome_interfaces/ObjectOffsets on the typed YOLO offset topic."""
+        try:
+            coordinates = object_offsets_from_msg(msg)
+        except ValueError as e:
+            self.get_logger().error(f"Invalid ObjectOffsets message: {e}")
+            return
+        self.topic_cache.put("object_coordinates", coordinates, msg)
 
-    def get_latest_object_coordinates(self, label: str = None) -> dict:
+    def wait_for(self, key, newer_than=None, timeout=None):
+        """
+        Block the calling thread until the cached topic `key` gets a sample
+        with a sequence number above `newer_than` (see TopicCache.wait_for).
+
+        Returns the TopicSample, or None on timeout.
+        """
+        return self.topic_cache.wait_for(key, newer_than, timeout)
+
+    def get_latest_object_coordinates(self, label: str = None, max_age=None) -> dict:
         """
         回傳解析後的 YOLO 物體偏移字典，
         格式 { label: [x, y, z], … }，
         若還沒收到就回空 dict。
         """
+        object_coordinates = self.topic_cache.get(
+            "object_coordinates", {}, max_age=max_age
+        )
         if label is None:
             # 全部回傳
-            return self.object_coordinates
+            return object_coordinates
         # 單一物體回傳
-        return self.object_coordinates.get(label, None)
+        return object_coordinates.get(label, None)
 
-    def get_goal_pose(self):
+    def get_goal_pose(self, max_age=None):
         """Get goal position or None if unavailable"""
-        if self.latest_goal_pose is None:
+        goal_pose = self.topic_cache.get("goal_pose", max_age=max_age)
+        if goal_pose is None:
             return None
 
         try:
-            return self.latest_goal_pose.pose.position
+            return goal_pose.pose.position
         except AttributeError:
             # Handle cases where the message structure is unexpected
             self.get_logger().warn("Goal pose has unexpected structure")
             return None
 
     # Helper methods for navigation data access
-    def get_car_position_and_orientation(self):
+    def get_car_position_and_orientation(self, max_age=None):
         """
         Get current car position and orientation
 
+        Args:
+            max_age (float): treat poses older than this many seconds as unavailable
+
         Returns:
             Tuple containing (position, orientation) or (None, None) if data unavailable
         """
-        if self.latest_amcl_pose:
-            position = self.latest_amcl_pose.pose.pose.position
-            orientation = self.latest_amcl_pose.pose.pose.orientation
+        amcl_pose = self.topic_cache.get("amcl_pose", max_age=max_age)
+        if amcl_pose:
+            position = amcl_pose.pose.pose.position
+            orientation = amcl_pose.pose.pose.orientation
             return position, orientation
         return None, None
 
-    def cmd_vel_callback(self, msg: Twist):
+    @staticmethod
+    def cmd_vel_to_wheel_speeds(msg: Twist):
+        """Convert a /cmd_vel Twist into clamped [v_left, v_right] wheel speeds"""
         wheel_distance = 0.5
         max_speed = 30.0
         min_speed = -30.0
@@ -267,32 +277,38 @@ class BaseCarControlNode(Node):
         v_left = max(min_speed, min(max_speed, v_left))
         v_right = max(min_speed, min(max_speed, v_right))
 
-        speed_msg = Float32MultiArray()
-        speed_msg.data = [v_left, v_right]
-        self.latest_cmd_vel = [v_left, v_right]
-
-    def get_cmd_vel_data(self):
-        return self.latest_cmd_vel
-
-    def get_path_points(self, include_orientation=True):
-        path_points = []
-
-        plan_to_use = self.latest_global_plan
-        if plan_to_use and plan_to_use.poses:
-            for pose in plan_to_use.poses:
-                pos = pose.pose.position
-                if include_orientation:
-                    # Return both position and orientation data
-                    orient = pose.pose.orientation
-                    path_points.append(
-                        {
-                            "position": [pos.x, pos.y, pos.z],
-                            "orientation": [orient.x, orient.y, orient.z, orient.w],
-                        }
-                    )
-                else:
-                    path_points.append([pos.x, pos.y])
-        return path_points
+        return [v_left, v_right]
+
+    def get_cmd_vel_data(self, max_age=None):
+        return self.topic_cache.get("cmd_vel", max_age=max_age)
+
+    def get_path_snapshot(self, max_age=None):
+        """
+        Current global plan as a read-only PathSnapshot of (N, 3) positions
+        and (N, 4) orientations, or None without a non-empty plan. Each
+        /received_global_plan is converted once, when it arrives.
+        """
+        snapshot = self.topic_cache.get("global_plan", max_age=max_age)
+        if snapshot is None or len(snapshot.positions) == 0:
+            return None
+        return snapshot
+
+    def get_path_index(self):
+        """
+        PathIndex (with pose orientations) of the current global plan, or
+        None without a plan. Only rebuilt when a new plan arrives.
+        """
+        sample = self.topic_cache.sample("global_plan")
+        if sample is None or len(sample.value.positions) == 0:
+            return None
+        cached = self._path_index
+        if cached is None or cached[0] != sample.seq:
+            snapshot = sample.value
+            cached = self._path_index = (
+                sample.seq,
+                PathIndex(snapshot.positions, snapshot.orientations),
+            )
+        return cached[1]
 
     # Common methods for all car control nodes
     def key_callback(self, msg):
@@ -307,7 +323,7 @@ class BaseCarControlNode(Node):
     def publish_control(self, action):
         """Common method to publish control actions"""
         CarControlPublishers.publish_control(
-            self, action, self.rear_wheel_pub, self.front_wheel_pub
+            self, action, self.rear_wheel_pub, self.front_wheel_pub, self.log_sampler
         )
 
     # If you inherit from this class, you must implement this method
@@ -315,3 +331,7 @@ class BaseCarControlNode(Node):
         """Handle parsed commands - to be implemented by subclasses"""
         # Default implementation does nothing
         pass
+
+    def destroy_node(self):
+        self.log_sampler.flush()
+        super().destroy_node()
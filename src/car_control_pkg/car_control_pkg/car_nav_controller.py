@@ -3,12 +3,21 @@ from car_control_pkg.nav2_utils import (
     calculate_diff_angle,
 )
 from action_interface.action import NavGoal
+from pros_car_py.path_tracker import (
+    PurePursuitTracker,
+    declare_tracker_config,
+    yaw_from_quaternion,
+)
+import math
 import time
 
 class NavigationController:
     def __init__(self, car_control_node):
         self.car_control_node = car_control_node
         self.nav_end_flag = 0 
+        # "pure_pursuit" drives Manual_Nav with continuous wheel velocities
+        self.tracker = PurePursuitTracker(declare_tracker_config(car_control_node))
+        self.reset_index()
 
     def check_prerequisites(self):
         """Check if all prerequisites for navigation are met"""
@@ -16,18 +25,18 @@ class NavigationController:
         car_position, car_orientation = (
             self.car_control_node.get_car_position_and_orientation()
         )
-        path_points = self.car_control_node.get_path_points()
+        path = self.car_control_node.get_path_snapshot()
         goal_pose = self.car_control_node.get_goal_pose()
 
         # Check data validity
-        if not car_position or not path_points or not goal_pose:
+        if not car_position or path is None or not goal_pose:
             # Determine the specific error message based on what's missing
             message = (
                 "Cannot obtain car position data"
                 if not car_position
                 else (
                     "No path points available for navigation"
-                    if not path_points
+                    if path is None
                     else "No goal pose defined for navigation"
                 )
             )
@@ -35,7 +44,7 @@ class NavigationController:
             return NavGoal.Result(success=False, message=message)
         else:
             # All prerequisites are met
-            return car_position, car_orientation, path_points, goal_pose
+            return car_position, car_orientation, path, goal_pose
 
     def data_init(self, car_position, car_orientation, goal_pose):
         return (
@@ -46,6 +55,11 @@ class NavigationController:
 
     def reset_index(self):
         self.index = 0
+        self.segment = 0
+        self.path_index = None
+        self.tracker.reset()
+        # Distance (m) to the goal at the last step, NaN until one is known
+        self.distance_to_goal = math.nan
 
     def customize_nav(self):
         result = self.check_prerequisites()
@@ -63,6 +77,7 @@ class NavigationController:
             self.nav_end_flag = 0
             y_offset = coordinate["ball"][1]
             object_depth = coordinate["ball"][0]
+            self.distance_to_goal = object_depth
             if object_depth < 0.3:
                 for i in range(10):
                     self.car_control_node.publish_control("STOP")
@@ -100,12 +115,13 @@ class NavigationController:
             return result
 
         # 正常情況才解包
-        car_position, car_orientation, path_points, goal_pose = result
+        car_position, car_orientation, path, goal_pose = result
         car_position, car_orientation, goal_pose = self.data_init(
             car_position, car_orientation, goal_pose
         )
 
         target_distance = cal_distance(car_position, goal_pose)
+        self.distance_to_goal = target_distance
         if target_distance < 0.5:
             self.nav_end_flag = 1
             self.car_control_node.publish_control("STOP")
@@ -113,16 +129,38 @@ class NavigationController:
                 success=True,
                 message="Navigation goal reached successfully. Final distance",
             )
+        elif self.tracker.config.controller == "pure_pursuit":
+            self.pursuit_nav(
+                car_position, car_orientation, self.car_control_node.get_path_index()
+            )
         else:
             target_points, orientation_points = self.get_next_target_point(
-                car_position=car_position, path_points=path_points
+                car_position=car_position,
+                path_index=self.car_control_node.get_path_index(),
             )
+            if target_points is None:
+                # Plan cleared since check_prerequisites
+                self.car_control_node.publish_control("STOP")
+                return
             diff_angle = calculate_diff_angle(
                 car_position, car_orientation, target_points
             )
             action_key = self.choose_action(diff_angle)
             self.car_control_node.publish_control(action_key)
 
+    def pursuit_nav(self, car_position, car_orientation, path_index):
+        """Publish the PurePursuitTracker wheel velocities for one manual_nav step"""
+        self.tracker.set_path(path_index)
+        command = self.tracker.step(car_position, yaw_from_quaternion(*car_orientation))
+        if command.target is None or command.finished:
+            self.car_control_node.publish_control("STOP")
+            return
+        self.car_control_node.log_sampler.log(
+            "Pure pursuit (speed, curvature)", (command.speed, command.curvature)
+        )
+        # publish_control mirrors [left, right] onto both axles
+        self.car_control_node.publish_control(command.wheels[:2])
+
     def choose_action(self, diff_angle):
         if diff_angle < 20 and diff_angle > -20:
             action_key = "FORWARD"
@@ -133,62 +171,34 @@ class NavigationController:
         return action_key
 
     def get_next_target_point(
-        self, car_position, path_points, min_required_distance=0.5
+        self, car_position, path_index, min_required_distance=0.5
     ):
         """
-        Get the next target point along the path that is at least min_required_distance away
-        from the car_position. Returns a tuple of ([target_x, target_y], [orientation_x, orientation_y])
-        or (None, None) if no valid target is found.
+        Get the path pose min_required_distance along the path past the car's
+        projection onto it. Returns a tuple of ([target_x, target_y],
+        [orientation_x, orientation_y]), the last pose near the end of the
+        path, or (None, None) without a path.
         """
         logger = self.car_control_node.get_logger()
 
-        if not path_points:
+        if path_index is None:
             logger.error("Error: No path points available!")
             return None, None
 
-        # Ensure self.index is initialized
-        if not hasattr(self, "index"):
-            self.index = 0
-
-        # Iterate over the remaining path points starting from the current index
-        for idx in range(self.index, len(path_points)):
-            point = path_points[idx]
-            try:
-                pos = point["position"]
-                orient = point["orientation"]
-                target_x, target_y = pos[0], pos[1]
-                orientation_x, orientation_y = orient[0], orient[1]
-            except (KeyError, IndexError, TypeError) as e:
-                logger.error(f"Invalid path point format at index {idx}: {e}")
-                continue
-
-            distance_to_target = cal_distance(car_position, (target_x, target_y))
-            if distance_to_target >= min_required_distance:
-                # Update self.index to current valid point index for future calls
-                self.index = idx
-                logger.debug(
-                    f"Found valid target point at index {idx} with distance {distance_to_target:.2f}"
-                )
-                return [target_x, target_y], [orientation_x, orientation_y]
-            else:
-                logger.debug(
-                    f"Skipping point at index {idx}: distance {distance_to_target:.2f} is less than required {min_required_distance}"
-                )
-
-        # If no intermediate point meets the criteria, return the final point regardless of distance.
-        try:
-            last_point = path_points[-1]
-            pos = last_point["position"]
-            orient = last_point["orientation"]
-            last_x, last_y = pos[0], pos[1]
-            last_ox, last_oy = orient[0], orient[1]
-            logger.info(
-                "No point met the minimum distance requirement; using the last point as target."
-            )
-            self.index = len(path_points) - 1
-            return [last_x, last_y], [last_ox, last_oy]
-        except (KeyError, IndexError, TypeError) as e:
-            logger.error(f"Invalid format for last path point: {e}")
+        # A new plan restarts the projection search at its first segment
+        if path_index is not self.path_index:
+            self.path_index = path_index
+            self.segment = 0
 
-        logger.warning("No valid target point found.")
-        return None, None
+        self.index, projection = path_index.lookahead(
+            car_position, min_required_distance, self.segment
+        )
+        self.segment = projection.segment
+        self.car_control_node.log_sampler.log(
+            "Target point (index, distance from path)", (self.index, projection.distance)
+        )
+        target_x, target_y = path_index.points[self.index].tolist()
+        if path_index.orientations is None:
+            return [target_x, target_y], None
+        orientation_x, orientation_y = path_index.orientations[self.index][:2].tolist()
+        return [target_x, target_y], [orientation_x, orientation_y]
@@ -9,6 +9,10 @@ from scipy.spatial.transform import Rotation as R
 import pybullet as p
 import numpy as np
 import threading
+from pros_car_py.rate_loop import RateLoop, format_rate_stats
+
+# Default rate (Hz) of the auto arm loop, `arm_control_rate` parameter
+ARM_CONTROL_RATE = 10.0
 
 
 class ArmController:
@@ -33,6 +37,9 @@ class ArmController:
         self.flag = 0
         self._thread_running = False
         self._stop_event = threading.Event()
+        self.control_rate = ros_communicator.declare_parameter(
+            "arm_control_rate", ARM_CONTROL_RATE
+        ).value
 
     def ensure_joint_pos_initialized(self):
         if len(self.joint_pos) < self.num_joints:
@@ -116,9 +123,18 @@ class ArmController:
         return False
 
     def background_task(self, stop_event, mode):
-        while not stop_event.is_set():
+        # Paced loop: modes without a step no longer spin a CPU core, and a
+        # wave longer than one period skips the missed ticks
+        loop = RateLoop(
+            self.control_rate,
+            overrun="skip",
+            name="[background_task] arm control",
+            report=print,
+        )
+        while loop.sleep(stop_event):
             if mode == "auto_arm_human":
                 self.human_like_wave(num_moves=1, steps=10)
+        print(format_rate_stats(loop.stats()))
         # self.ensure_joint_pos_initialized()
         # if key == "q":
         #     self.action_in_progress = False
@@ -196,7 +212,14 @@ class ArmController:
             tolerance (float): 允許的偏移量容忍範圍，默認為 0.03 米。
         """
         # 獲取物體在相機畫面中的偏移量
+        seq = 0
         for _ in range(10):
+            # 等待移動後的新 YOLO 偏移量，避免用舊畫面重複校正
+            sample = self.ros_communicator.wait_for(
+                "yolo_offset", newer_than=seq, timeout=0.5
+            )
+            if sample is not None:
+                seq = sample.seq
             x_offset, y_offset, _ = (
                 self.data_processor.get_processed_yolo_detection_offset()
             )
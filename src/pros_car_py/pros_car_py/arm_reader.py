@@ -14,6 +14,8 @@ It will publish arm state.
 
 """
 
+import math
+import time
 import orjson
 import rclpy
 from rclpy.node import Node
@@ -22,6 +24,9 @@ from rclpy.duration import Duration
 from sensor_msgs.msg import JointState
 from serial import Serial
 from .env import ARM_SERIAL_PORT_DEFAULT
+from .car_models import FrameError, decode_servo_current_angles_frame
+from .serial_io import FrameAssembler, frame_delimiter, receive_stamp
+from .arm_utils import JointVelocityEstimator
 
 
 class ArmSerialReader(Node):
@@ -46,12 +51,24 @@ class ArmSerialReader(Node):
             "serial_port", ARM_SERIAL_PORT_DEFAULT
         ).value
         self._serial = Serial(serial_port, 115200, timeout=0)
+        # "json" or "binary" framing on the wire, see car_models
+        protocol = self.declare_parameter("protocol", "json").value
+        # Frames are split from bulk reads; partial lines wait for the next tick
+        self._assembler = FrameAssembler(frame_delimiter(protocol))
+        # Frames are drained every 1 / read_rate seconds and only the newest
+        # frame of each read is published. publish_latest:=False (not the
+        # default) publishes all of them; they share the read's stamp, so
+        # only the newest one carries velocities.
+        read_rate = self.declare_parameter("read_rate", 10.0).value
+        self._publish_latest = self.declare_parameter("publish_latest", True).value
+        # Number of samples the joint velocities are differentiated over
+        velocity_window = self.declare_parameter("velocity_window", 5).value
+        self._velocity = JointVelocityEstimator(velocity_window)
 
         # Create a publisher for the serial data
         # TODO dynamic to adjust arm
         self._publisher = self.create_publisher(JointState, "joint_states", 10)
-        timer_period = 0.1  # seconds
-        self._timer = self.create_timer(0.1, self.reader_callback)
+        self._timer = self.create_timer(1.0 / read_rate, self.reader_callback)
         self._joint_names = ["joint1", "joint2", "joint3", "joint4", "joint5"]
         self._position = [0.0, 0.0, 0.0, 0.0, 0.0]
         self.log_interval = Duration(seconds=0.5)  # Log every 1 seconds
@@ -65,28 +82,50 @@ class ArmSerialReader(Node):
         """
         Callback function for reading serial data and publishing joint states.
 
-        Reads data from the ESP32 via the serial connection, decodes the JSON data, converts the joint angles
-        from degrees to radians, and publishes the joint states as a `JointState` message. Errors during
-        reading or parsing are logged.
+        Reads everything the ESP32 sent since the last tick and publishes the newest complete
+        frame as a `JointState` message, or every frame without `publish_latest`. Errors during
+        parsing are logged and only drop the offending frame.
         """
         # Read data from the serial device
-        data = self._serial.readline()
+        receive_time = time.monotonic()
+        frames = self._assembler.read(self._serial)
+        if self._publish_latest:
+            # Older frames of the same read are stale; fall back to them only if the newest is corrupt
+            for data in reversed(frames):
+                if self.publish_frame(data, receive_time):
+                    break
+        else:
+            last = len(frames) - 1
+            for i, data in enumerate(frames):
+                self.publish_frame(data, receive_time, with_velocity=i == last)
+
+    def publish_frame(self, data, receive_time, with_velocity=True):
+        """
+        Decode one frame from the ESP32 and publish it as a `JointState` message.
+
+        The joint angles are converted from degrees to radians, the header is stamped with the time the
+        frame was read, and `velocity` holds finite-difference joint velocities (rad/s) once enough
+        samples are available. Without `with_velocity` (older frames of a read, which share its
+        stamp) `velocity` is left empty and the estimator is not updated.
+
+        Returns:
+            bool: True if the frame was valid and published.
+        """
         try:
-            # esp32_json_str = data.decode('utf-8')
-            degree_data = orjson.loads(data)
-            degree_positions = degree_data[
-                "servo_current_angles"
-            ]  # Assuming this is the key in your JSON
+            degree_positions = decode_servo_current_angles_frame(data)
 
+        except FrameError as error:
+            self.get_logger().error(f"Binary frame error when recv {data}: {error}")
+            return False
         except orjson.JSONDecodeError as error:
             self.get_logger().error(f"Json decode error when recv {data}")
-            return
+            return False
         except KeyError as error:
-            self.get_logger().error(f"KeyError when recv {degree_data}")
-            return
+            self.get_logger().error(f"KeyError when recv {data}")
+            return False
         except UnicodeDecodeError as error:
             self.get_logger().error(f"UnicodeDecodeError when recv {data}")
-            return
+            return False
 
         # esp32_json_obj -> position
 
@@ -95,17 +134,21 @@ class ArmSerialReader(Node):
 
         # Publish the data to the serial_data topic
         msg = JointState()
-        msg.header.stamp = self.get_clock().now().to_msg()
+        msg.header.stamp = receive_stamp(self.get_clock(), receive_time)
         msg.name = self._joint_names
         msg.position = radian_positions
-        msg.velocity = []
+        if with_velocity:
+            msg.velocity = self._velocity.update(receive_time, radian_positions)
+        else:
+            msg.velocity = []
         msg.effort = []
 
         self._publisher.publish(msg)
         current_time = self.get_clock().now()
         if current_time - self.last_log_time >= self.log_interval:
-            self.get_logger().info(f"Receive from arm esp32: {degree_data}")
+            self.get_logger().info(f"Receive from arm esp32: {degree_positions}")
             self.last_log_time = current_time
+        return True
 
 
 def main(args=None):
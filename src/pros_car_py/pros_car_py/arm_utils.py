@@ -0,0 +1,45 @@
+from collections import deque
+
+
+class JointVelocityEstimator:
+    """
+    Joint velocities from timestamped positions by finite differences.
+
+    Keeps the last `window` samples and returns the slope between the oldest
+    and the newest one, which smooths the quantisation of the servo readback
+    without lagging much at typical report rates. Samples that share a
+    receive time (frames drained in one read) replace each other, so only
+    distinct times contribute to a difference.
+    """
+
+    def __init__(self, window=5):
+        self._history = deque(maxlen=max(2, window))
+
+    def update(self, receive_time, positions):
+        """
+        Add a sample and return the velocity estimate.
+
+        Args:
+            receive_time (float): time.monotonic() the frame was read at.
+            positions (list): joint positions (rad).
+
+        Returns:
+            list: joint velocities (rad/s), empty until two distinct samples
+            with the same joint count are available.
+        """
+        history = self._history
+        if history and history[-1][0] == receive_time:
+            history.pop()
+        if history and len(history[-1][1]) != len(positions):
+            history.clear()
+        history.append((receive_time, positions))
+        if len(history) < 2:
+            return []
+        first_time, first_positions = history[0]
+        dt = receive_time - first_time
+        if dt <= 0.0:
+            return []
+        return [(p - p0) / dt for p, p0 in zip(positions, first_positions)]
+
+    def reset(self):
+        self._history.clear()
@@ -24,6 +24,9 @@ import std_msgs.msg
 from trajectory_msgs.msg import JointTrajectoryPoint
 from pros_car_py.car_models import *
 from .env import ARM_SERIAL_PORT_DEFAULT
+from .serial_io import negotiate_protocol
+from .log_sampling import LogSampler
+from .topic_qos import TopicQosConfig
 
 
 class ArmSerialWriter(Node):
@@ -48,15 +51,24 @@ class ArmSerialWriter(Node):
         listen for JointTrajectoryPoint messages.
         """
         super().__init__("arm_serial_writer")
+        # Subscription QoS and callback groups from config/topic_qos.yaml
+        self.topic_qos = TopicQosConfig(self)
 
         # Set up the serial connection
         serial_port = self.declare_parameter(
             "serial_port", ARM_SERIAL_PORT_DEFAULT
         ).value
         self._serial = Serial(serial_port, 115200, timeout=0)
+        # "json" (default), "binary", or "auto" to negotiate with the ESP32
+        protocol = self.declare_parameter("protocol", "json").value
+        self._protocol = negotiate_protocol(self._serial, protocol)
+        self.get_logger().info(f"Serial protocol: {self._protocol}")
+        # Sent angles are summarised once per log_period instead of per message
+        log_period = self.declare_parameter("log_period", 1.0).value
+        self._log_sampler = LogSampler(self.get_logger().info, log_period, node=self)
 
         # Subscribe to JointTrajectoryPoint messages
-        self._subscriber = self.create_subscription(
+        self._subscriber = self.topic_qos.subscribe(
             JointTrajectoryPoint,
             DeviceDataTypeEnum.robot_arm,
             self.listener_callback,
@@ -73,25 +85,30 @@ class ArmSerialWriter(Node):
         Args:
             msg (JointTrajectoryPoint): The incoming message containing radian positions.
 
+        In binary protocol mode the angles are sent as a `servo_target_angles`
+        binary frame instead (see `car_models.encode_servo_angles`).
+
         Raises:
             orjson.JSONEncodeError: If an error occurs during JSON encoding.
         """
         # TODO send pos to esp32
         # Extract the radian positions from the message
         radian_positions = msg.positions
-        self.get_logger().info(f"receive {radian_positions}")
 
         # Convert radian positions to degrees
         degree_positions = [math.degrees(rad) % 360 for rad in radian_positions]
-        ctrl_json = {"servo_target_angles": degree_positions}
         try:
-            ctrl_str = orjson.dumps(ctrl_json, option=orjson.OPT_APPEND_NEWLINE)
+            ctrl_str = encode_servo_target_angles_frame(degree_positions, self._protocol)
             self._serial.write(ctrl_str)
         except orjson.JSONEncodeError as error:
             self.get_logger().error(f"Json encode error when recv message: {msg}")
             return
         # Log the output sent to ESP32
-        self.get_logger().info(f"{ctrl_str}")
+        self._log_sampler.log("servo_target_angles", degree_positions)
+
+    def destroy_node(self):
+        self._log_sampler.flush()
+        super().destroy_node()
 
 
 def main(args=None):
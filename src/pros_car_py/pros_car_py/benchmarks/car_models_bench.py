@@ -0,0 +1,80 @@
+"""
+Per-frame cost of the CarCState / CarCControl validation paths.
+
+Compares the original reader/writer code (orjson -> pydantic model -> dict ->
+DeviceData model -> dict -> orjson) against the fast path in car_models and
+prints nanoseconds per frame for each.
+
+    ros2 run pros_car_py bench_car_models --number 200000
+"""
+
+import argparse
+import timeit
+
+import orjson
+
+from pros_car_py.car_models import (
+    CarCControl,
+    CarCState,
+    DeviceData,
+    DeviceDataTypeEnum,
+    SerialProtocolEnum,
+    car_c_state_envelope,
+    decode_car_c_state_frame,
+    encode_car_c_control_frame,
+    validate_car_c_control,
+)
+
+STATE_FRAME = b'{"vels": [12.5, -3.25], "encoders": [120345, -98765]}\n'
+CONTROL_DATA = {"target_vel": [10.0, -10.0]}
+
+
+def legacy_state(frame=STATE_FRAME):
+    state_data = dict(CarCState(**orjson.loads(frame)))
+    device_data = DeviceData(type=DeviceDataTypeEnum.car_C_state, data=state_data)
+    return orjson.dumps(dict(device_data)).decode()
+
+
+def fast_state(frame=STATE_FRAME):
+    return car_c_state_envelope(decode_car_c_state_frame(frame))
+
+
+def legacy_control(data=CONTROL_DATA):
+    control_signal = CarCControl(**data)
+    return orjson.dumps(dict(control_signal), option=orjson.OPT_APPEND_NEWLINE)
+
+
+def fast_control(data=CONTROL_DATA):
+    return encode_car_c_control_frame(
+        validate_car_c_control(data), SerialProtocolEnum.json
+    )
+
+
+def bench(func, number, repeat):
+    best = min(timeit.repeat(func, number=number, repeat=repeat))
+    return best / number * 1e9
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args(args)
+
+    assert legacy_state() == fast_state()
+    assert legacy_control() == fast_control()
+
+    for name, legacy, fast in (
+        ("car_C_state  frame -> envelope", legacy_state, fast_state),
+        ("car_C_control data -> frame", legacy_control, fast_control),
+    ):
+        before = bench(legacy, options.number, options.repeat)
+        after = bench(fast, options.number, options.repeat)
+        print(
+            f"{name}: before {before:8.0f} ns/frame, after {after:8.0f} ns/frame "
+            f"({before / after:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+ESP32 emulator for the wheel and arm serial links.
+
+Each `EmulatedDevice` owns a pty pair. The slave side is what the serial
+nodes open in place of /dev/usb_rear_wheel, /dev/usb_front_wheel or
+/dev/usb_robot_arm; the emulator talks on the master side with the same
+frames as the boards:
+
+- wheel: streams `CarCState` ({"vels", "encoders"}) and accepts `CarCControl`
+  ({"target_vel"}); the reported velocities follow the last target.
+- arm: streams `servo_current_angles` and accepts `servo_target_angles`; the
+  reported angles follow the last target.
+
+Both JSON lines and binary frames are spoken. With `accept_handshake` the
+device acknowledges `handshake_request()` and switches to binary, like the
+binary-capable firmware.
+
+To let a benchmark match frames end to end, state frames carry a sequence
+number: encoders[0] for the wheels, the first angle for the arm. Send times
+are kept in `sent_times` keyed by that number.
+
+Run standalone to get the three devices as symlinks for manual testing:
+
+    ros2 run pros_car_py esp32_emulator --link-dir /tmp --rate 100
+    ros2 run pros_car_py carC_reader --ros-args -p serial_port:=/tmp/usb_rear_wheel \
+        -p serial_port_forward:=/tmp/usb_front_wheel
+"""
+
+import argparse
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+import orjson
+
+from pros_car_py.car_models import (
+    BINARY_FRAME_DELIMITER,
+    JSON_FRAME_DELIMITER,
+    PROTOCOL_VERSION,
+    FrameError,
+    FrameType,
+    SerialProtocolEnum,
+    decode_car_c_control,
+    decode_frame,
+    decode_servo_angles,
+    encode_car_c_state,
+    encode_servo_angles,
+    is_binary_frame,
+    validate_car_c_control,
+)
+from pros_car_py.serial_io import FrameAssembler
+
+WHEEL = "wheel"
+ARM = "arm"
+
+
+class EmulatedDevice:
+    """One emulated ESP32 behind a pty pair; `port` is the path to open."""
+
+    def __init__(
+        self,
+        kind,
+        rate=100.0,
+        jitter=0.0,
+        protocol=SerialProtocolEnum.json,
+        accept_handshake=True,
+        link=None,
+        joint_count=5,
+        seed=None,
+    ):
+        """
+        Args:
+            kind: WHEEL or ARM.
+            rate: state frames per second, 0 to only answer commands.
+            jitter: relative jitter of the send interval, 0.2 means +-20 %.
+            link: optional symlink to create for the port.
+        """
+        if kind not in (WHEEL, ARM):
+            raise ValueError(f"unknown device kind {kind}")
+        self.kind = kind
+        self.rate = rate
+        self.jitter = jitter
+        self.protocol = SerialProtocolEnum(protocol)
+        self.accept_handshake = accept_handshake
+        self._random = random.Random(seed)
+
+        self._master, self._slave = os.openpty()
+        # No echo or newline translation, the link carries raw bytes
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        self.link = link
+        if link is not None:
+            if os.path.islink(link):
+                os.unlink(link)
+            os.symlink(self.port, link)
+
+        self._assembler = FrameAssembler(self._delimiter())
+        self._write_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+        self._target = [0.0, 0.0] if kind == WHEEL else [0.0] * joint_count
+        self.sent = 0
+        self.sent_times = {}
+        # (receive_time, values) of every command decoded from the host
+        self.received = []
+        self.decode_errors = 0
+
+    def _delimiter(self):
+        if self.protocol == SerialProtocolEnum.binary:
+            return BINARY_FRAME_DELIMITER
+        return JSON_FRAME_DELIMITER
+
+    def start(self):
+        self._stop_event.clear()
+        targets = [self._receive_loop]
+        if self.rate > 0:
+            targets.append(self._send_loop)
+        for target in targets:
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        if self.link is not None and os.path.islink(self.link):
+            os.unlink(self.link)
+
+    # ---------------------------------------------------------------- state
+    def state_frame(self, seq):
+        binary = self.protocol == SerialProtocolEnum.binary
+        if self.kind == WHEEL:
+            vels = list(self._target)
+            encoders = [seq, seq]
+            if binary:
+                return encode_car_c_state(vels, encoders)
+            return orjson.dumps(
+                {"vels": vels, "encoders": encoders}, option=orjson.OPT_APPEND_NEWLINE
+            )
+        angles = [float(seq)] + list(self._target[1:])
+        if binary:
+            return encode_servo_angles(FrameType.servo_current_angles, angles)
+        return orjson.dumps(
+            {"servo_current_angles": angles}, option=orjson.OPT_APPEND_NEWLINE
+        )
+
+    def _write(self, data):
+        """Write all of `data`, waiting while the host is not reading."""
+        with self._write_lock:
+            view = memoryview(data)
+            while view:
+                try:
+                    view = view[os.write(self._master, view):]
+                except BlockingIOError:
+                    if self._stop_event.is_set():
+                        raise
+                    select.select([], [self._master], [], 0.05)
+
+    def _send_loop(self):
+        interval = 1.0 / self.rate
+        next_send = time.monotonic()
+        seq = 0
+        while not self._stop_event.is_set():
+            frame = self.state_frame(seq)
+            send_time = time.monotonic()
+            try:
+                self._write(frame)
+            except OSError:
+                return
+            self.sent_times[seq] = send_time
+            self.sent += 1
+            seq += 1
+            jitter = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+            next_send += interval * (1.0 + jitter)
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            else:
+                # Fell behind (host not reading, slow machine); do not burst
+                next_send = time.monotonic()
+
+    # ------------------------------------------------------------- commands
+    def _receive_loop(self):
+        while not self._stop_event.is_set():
+            readable, _, _ = select.select([self._master], [], [], 0.05)
+            if not readable:
+                continue
+            try:
+                data = os.read(self._master, 4096)
+            except OSError:
+                # EIO while nobody has the slave side open
+                time.sleep(0.01)
+                continue
+            receive_time = time.monotonic()
+            for frame in self._assembler.feed(data):
+                self._handle_command(frame, receive_time)
+
+    def _handle_command(self, frame, receive_time):
+        try:
+            if is_binary_frame(frame):
+                values = self._decode_binary_command(frame)
+            else:
+                command = orjson.loads(frame)
+                if "protocol" in command:
+                    self._handle_handshake(command)
+                    return
+                values = self._decode_json_command(command)
+        except (orjson.JSONDecodeError, FrameError, KeyError, TypeError, ValueError):
+            self.decode_errors += 1
+            return
+        self._target = list(values)
+        self.received.append((receive_time, values))
+
+    def _decode_binary_command(self, frame):
+        frame_type, payload = decode_frame(frame)
+        if self.kind == WHEEL and frame_type == FrameType.car_C_control:
+            return decode_car_c_control(payload)
+        if self.kind == ARM and frame_type == FrameType.servo_target_angles:
+            return decode_servo_angles(payload)
+        raise FrameError(f"unexpected frame type {frame_type.name}")
+
+    def _decode_json_command(self, command):
+        if self.kind == WHEEL:
+            return validate_car_c_control(command)
+        return command["servo_target_angles"]
+
+    def _handle_handshake(self, command):
+        if not self.accept_handshake:
+            # JSON-only firmware ignores lines it does not know
+            return
+        if command.get("version") != PROTOCOL_VERSION:
+            return
+        self._write(
+            orjson.dumps({"protocol_ack": PROTOCOL_VERSION}, option=orjson.OPT_APPEND_NEWLINE)
+        )
+        self.protocol = SerialProtocolEnum.binary
+        self._assembler = FrameAssembler(self._delimiter())
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Emulate the wheel and arm ESP32 boards on pty pairs."
+    )
+    parser.add_argument("--link-dir", default="/tmp")
+    parser.add_argument("--rate", type=float, default=100.0, help="state frames per second")
+    parser.add_argument("--jitter", type=float, default=0.0, help="relative send jitter")
+    parser.add_argument("--protocol", default="json", choices=["json", "binary"])
+    parser.add_argument("--report-period", type=float, default=5.0)
+    options = parser.parse_args(args)
+
+    devices = [
+        EmulatedDevice(kind, options.rate, options.jitter, options.protocol,
+                       link=os.path.join(options.link_dir, name))
+        for kind, name in (
+            (WHEEL, "usb_rear_wheel"),
+            (WHEEL, "usb_front_wheel"),
+            (ARM, "usb_robot_arm"),
+        )
+    ]
+    for device in devices:
+        device.start()
+        print(f"{device.link} -> {device.port} ({device.kind})")
+    try:
+        while True:
+            time.sleep(options.report_period)
+            for device in devices:
+                print(
+                    f"{device.link}: sent {device.sent}, "
+                    f"commands {len(device.received)}, errors {device.decode_errors}"
+                )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for device in devices:
+            device.stop()
+
+
+if __name__ == "__main__":
+    main()
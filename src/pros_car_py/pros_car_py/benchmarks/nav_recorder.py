@@ -0,0 +1,116 @@
+"""
+Record the navigation inputs to a JSON Lines file for nav_replay.
+
+Subscribes to /amcl_pose, /received_global_plan, /goal_pose, the camera
+depth row, /yolo/target_info and the YOLO object offsets, and writes every
+message in the nav_replay format with its receive time (seconds since the
+start of the recording):
+
+    ros2 run pros_car_py nav_recorder run.jsonl
+"""
+
+import argparse
+import time
+
+import orjson
+import rclpy
+from geometry_msgs.msg import PoseStamped, PoseWithCovarianceStamped
+from nav_msgs.msg import Path
+from rclpy.node import Node
+from std_msgs.msg import Float32MultiArray, String
+
+from pros_car_py.nav_replay import pose_values
+from pros_car_py.yolo_offsets import OBJECT_OFFSET_TOPIC, parse_object_offsets
+
+
+class NavRecorder(Node):
+    def __init__(self, path):
+        super().__init__("nav_recorder")
+        self._file = open(path, "wb")
+        self._start = time.monotonic()
+        self.count = 0
+        for msg_type, topic, key, convert in (
+            (
+                PoseWithCovarianceStamped,
+                "/amcl_pose",
+                "amcl_pose",
+                lambda msg: pose_values(msg.pose.pose),
+            ),
+            (
+                Path,
+                "/received_global_plan",
+                "global_plan",
+                lambda msg: [pose_values(pose.pose) for pose in msg.poses],
+            ),
+            (
+                PoseStamped,
+                "/goal_pose",
+                "goal",
+                lambda msg: pose_values(msg.pose)[:3],
+            ),
+            (
+                Float32MultiArray,
+                "/camera/x_multi_depth_values",
+                "camera_depth",
+                lambda msg: list(msg.data),
+            ),
+            (
+                Float32MultiArray,
+                "/yolo/target_info",
+                "yolo_target_info",
+                lambda msg: list(msg.data),
+            ),
+            (
+                String,
+                OBJECT_OFFSET_TOPIC,
+                "object_offsets",
+                self._object_offsets,
+            ),
+        ):
+            self.create_subscription(
+                msg_type,
+                topic,
+                lambda msg, key=key, convert=convert: self._write(key, convert(msg)),
+                10,
+            )
+        self.get_logger().info(f"Recording navigation inputs to {path}")
+
+    def _object_offsets(self, msg):
+        try:
+            return parse_object_offsets(msg.data, self.get_logger().warn)
+        except orjson.JSONDecodeError as e:
+            self.get_logger().error(f"Failed to decode JSON string: {e}")
+            return None
+
+    def _write(self, topic, data):
+        if data is None:
+            return
+        line = {"time": time.monotonic() - self._start, "topic": topic, "data": data}
+        self._file.write(orjson.dumps(line))
+        self._file.write(b"\n")
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output", help="JSON Lines file to write")
+    options, ros_args = parser.parse_known_args(args)
+
+    rclpy.init(args=ros_args)
+    node = NavRecorder(options.output)
+    try:
+        rclpy.spin(node)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        node.close()
+        print(f"Recorded {node.count} messages to {options.output}")
+        node.destroy_node()
+        rclpy.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Replay navigation recordings through the car controllers, without Nav2 or a robot.
+
+Runs each controller on a recording made with nav_recorder (or on a
+built-in synthetic scenario) and prints the outcome, the simulated time to
+goal, the compute time per tick and the emitted action sequence:
+
+    ros2 run pros_car_py nav_replay run.jsonl --controllers discrete pure_pursuit
+    ros2 run pros_car_py nav_replay --scenario S --closed-loop
+    ros2 run pros_car_py nav_replay --scenario L --write l_turn.jsonl
+
+The manual_nav and customize_nav controllers need car_control_pkg and
+action_interface to be built.
+"""
+
+import argparse
+
+import numpy as np
+
+from pros_car_py.nav_replay import (
+    CONTROLLERS,
+    DiffDriveModel,
+    RecordedMessage,
+    format_replay_result,
+    load_recording,
+    pose_from_yaw,
+    replay,
+    write_recording,
+)
+
+
+def _staircase():
+    # Nav2 plans on a grid costmap step along the cells of a diagonal
+    points = []
+    x = y = 0.0
+    for _ in range(60):
+        points.append((x, y))
+        x += 0.05
+        points.append((x, y))
+        y += 0.05
+    return np.array(points)
+
+
+def _l_turn():
+    straight = np.arange(0.0, 3.0, 0.05)
+    turn = np.arange(0.05, 3.0, 0.05)
+    return np.vstack(
+        (
+            np.column_stack((straight, np.zeros_like(straight))),
+            np.column_stack((np.full_like(turn, 3.0), turn)),
+        )
+    )
+
+
+def _s_curve():
+    x = np.arange(0.0, 8.0, 0.05)
+    return np.column_stack((x, np.sin(x / 1.2)))
+
+
+SCENARIOS = {"L": _l_turn, "S": _s_curve, "stair": _staircase}
+
+
+def scenario_recording(name):
+    """Synthetic recording: the plan, the goal at its end, the car at its start."""
+    points = SCENARIOS[name]()
+    headings = np.arctan2(*np.diff(points, axis=0).T[::-1])
+    headings = np.append(headings, headings[-1])
+    poses = [pose_from_yaw(x, y, yaw) for (x, y), yaw in zip(points.tolist(), headings)]
+    return [
+        RecordedMessage(0.0, "goal", points[-1].tolist()),
+        RecordedMessage(0.0, "global_plan", poses),
+        RecordedMessage(0.0, "amcl_pose", pose_from_yaw(0.0, 0.0, 0.0)),
+    ]
+
+
+def _parameter(text):
+    name, _, value = text.partition("=")
+    if not value:
+        raise argparse.ArgumentTypeError(f"Expected name=value, got {text!r}")
+    try:
+        value = float(value)
+    except ValueError:
+        pass
+    return name, value
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("recording", nargs="?", help="JSON Lines recording")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--write", help="save the scenario as a recording and exit")
+    parser.add_argument(
+        "--controllers",
+        nargs="+",
+        choices=CONTROLLERS,
+        default=["discrete", "pure_pursuit"],
+    )
+    parser.add_argument("--rate", type=float, default=20.0, help="control rate (Hz)")
+    parser.add_argument(
+        "--closed-loop",
+        action="store_true",
+        help="move the car with the commands instead of replaying the poses",
+    )
+    parser.add_argument("--max-time", type=float, default=120.0)
+    parser.add_argument("--track-width", type=float, default=0.5)
+    parser.add_argument(
+        "--wheel-scale", type=float, default=0.05, help="m/s per unit of wheel velocity"
+    )
+    parser.add_argument(
+        "--param",
+        type=_parameter,
+        action="append",
+        default=[],
+        help="node parameter name=value, e.g. path_tracker_config=tuned.yaml",
+    )
+    options = parser.parse_args(args)
+
+    if options.scenario is not None:
+        messages = scenario_recording(options.scenario)
+        if options.write:
+            write_recording(options.write, messages)
+            print(f"Wrote {options.write}")
+            return
+        # A scenario only has the start pose
+        options.closed_loop = True
+    elif options.recording is not None:
+        messages = load_recording(options.recording)
+    else:
+        parser.error("give a recording or --scenario")
+
+    for controller in options.controllers:
+        model = None
+        if options.closed_loop:
+            start = next(message for message in messages if message.topic == "amcl_pose")
+            model = DiffDriveModel.from_pose(
+                start.data,
+                track_width=options.track_width,
+                wheel_scale=options.wheel_scale,
+            )
+        result = replay(
+            messages,
+            controller,
+            rate=options.rate,
+            closed_loop=options.closed_loop,
+            parameters=dict(options.param),
+            model=model,
+            max_time=options.max_time,
+        )
+        print(format_replay_result(result))
+
+
+if __name__ == "__main__":
+    main()
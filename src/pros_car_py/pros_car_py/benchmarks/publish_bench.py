@@ -0,0 +1,106 @@
+"""
+Per-command cost of publishing wheel and arm commands.
+
+Compares building a new Float32MultiArray / JointTrajectoryPoint from Python
+lists for every command (the original publish paths) against reusing one
+message per publisher through ArrayPublisher. Both variants publish on real
+rclpy publishers of a local node, so serialization is included. Prints
+nanoseconds per command and the CPU share of a publish loop at each rate.
+
+    ros2 run pros_car_py bench_publish --number 20000 --rates 50 100
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+import rclpy
+from std_msgs.msg import Float32MultiArray
+from trajectory_msgs.msg import JointTrajectoryPoint
+
+from pros_car_py.message_buffers import ArrayPublisher
+
+WHEEL_COMMAND = [10.0, -10.0, 10.0, -10.0]
+ARM_DEGREES = [0.0, 45.0, 90.0, 120.0, 10.0]
+
+
+def legacy_wheels(rear, front, vel=WHEEL_COMMAND):
+    rear_msg = Float32MultiArray()
+    front_msg = Float32MultiArray()
+    front_msg.data = vel[0:2]
+    rear_msg.data = vel[2:4]
+    rear.publish(rear_msg)
+    front.publish(front_msg)
+
+
+def fast_wheels(rear, front, vel=WHEEL_COMMAND):
+    rear.publish(vel[2:4])
+    front.publish(vel[0:2])
+
+
+def legacy_arm(publisher, degrees=ARM_DEGREES):
+    msg = JointTrajectoryPoint()
+    msg.positions = np.deg2rad(np.array(degrees, dtype=float)).tolist()
+    msg.velocities = []
+    msg.accelerations = []
+    msg.effort = []
+    publisher.publish(msg)
+
+
+def fast_arm(publisher, degrees=ARM_DEGREES):
+    publisher.publish(np.deg2rad(np.asarray(degrees, dtype=float)))
+
+
+def bench(func, number, repeat):
+    best = min(timeit.repeat(func, number=number, repeat=repeat))
+    return best / number * 1e9
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rates", type=float, nargs="+", default=[50.0, 100.0])
+    options = parser.parse_args(args)
+
+    rclpy.init()
+    node = rclpy.create_node("publish_bench")
+    try:
+        rear = node.create_publisher(Float32MultiArray, "bench_rear_wheel", 10)
+        front = node.create_publisher(Float32MultiArray, "bench_front_wheel", 10)
+        arm = node.create_publisher(JointTrajectoryPoint, "bench_robot_arm", 10)
+        rear_command = ArrayPublisher(rear, size=2)
+        front_command = ArrayPublisher(front, size=2)
+        arm_command = ArrayPublisher(
+            arm, field="positions", typecode="d", size=len(ARM_DEGREES)
+        )
+
+        for name, legacy, fast in (
+            (
+                "wheel command (2 msgs)",
+                lambda: legacy_wheels(rear, front),
+                lambda: fast_wheels(rear_command, front_command),
+            ),
+            (
+                "arm command",
+                lambda: legacy_arm(arm),
+                lambda: fast_arm(arm_command),
+            ),
+        ):
+            before = bench(legacy, options.number, options.repeat)
+            after = bench(fast, options.number, options.repeat)
+            load = ", ".join(
+                f"{rate:.0f} Hz {before * rate * 1e-7:.4f}% -> {after * rate * 1e-7:.4f}% CPU"
+                for rate in options.rates
+            )
+            print(
+                f"{name}: before {before:8.0f} ns/command, after {after:8.0f} ns/command "
+                f"({before / after:.1f}x); {load}"
+            )
+    finally:
+        node.destroy_node()
+        rclpy.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Serial throughput benchmark against emulated ESP32 boards.
+
+Runs the real reader and writer nodes on pty pairs from `esp32_emulator` and
+reports, per scenario, delivered frames/s, drop rate and p50/p99 latency:
+
+- wheel_read:  emulator -> carC_reader -> car_C_state
+- wheel_write: car_C_rear_wheel -> carC_writer -> emulator
+- arm_read:    emulator -> arm_reader -> joint_states
+- arm_write:   robot_arm -> arm_writer -> emulator
+
+Latency is measured from the emulator writing a state frame to the probe
+node receiving the topic (reads), or from publishing a command to the
+emulator decoding it (writes). Frames are matched by the sequence numbers
+the emulator and the probe embed in them. Writers coalesce commands by
+design, so their drop rate includes coalesced frames.
+
+    ros2 run pros_car_py bench_serial --rate 200 --duration 10 --protocol binary
+"""
+
+import argparse
+import math
+import time
+
+import orjson
+import rclpy
+from rclpy.executors import SingleThreadedExecutor
+from rclpy.node import Node
+from sensor_msgs.msg import JointState
+from std_msgs.msg import String
+from trajectory_msgs.msg import JointTrajectoryPoint
+
+from pros_car_py.benchmarks.esp32_emulator import ARM, WHEEL, EmulatedDevice
+from pros_car_py.car_models import DeviceDataTypeEnum
+
+SCENARIOS = ("wheel_read", "wheel_write", "arm_read", "arm_write")
+
+
+class BenchProbe(Node):
+    """Publishes sequenced commands and timestamps sequenced state on arrival."""
+
+    def __init__(self, scenario, rate):
+        super().__init__("serial_bench_probe")
+        self.scenario = scenario
+        self.published_times = {}
+        # seq -> receive time of state frames seen on the topic
+        self.received_times = {}
+        self._seq = 0
+        if scenario == "wheel_read":
+            self.create_subscription(
+                String, DeviceDataTypeEnum.car_C_state, self.wheel_state_callback, 100
+            )
+        elif scenario == "arm_read":
+            self.create_subscription(
+                JointState, "joint_states", self.joint_state_callback, 100
+            )
+        elif scenario == "wheel_write":
+            self._publisher = self.create_publisher(
+                String, DeviceDataTypeEnum.car_C_rear_wheel, 100
+            )
+            self.create_timer(1.0 / rate, self.publish_wheel_command)
+        else:
+            self._publisher = self.create_publisher(
+                JointTrajectoryPoint, DeviceDataTypeEnum.robot_arm, 100
+            )
+            self.create_timer(1.0 / rate, self.publish_arm_command)
+
+    def wheel_state_callback(self, msg):
+        now = time.monotonic()
+        seq = orjson.loads(msg.data)["data"]["encoders"][0]
+        self.received_times.setdefault(seq, now)
+
+    def joint_state_callback(self, msg):
+        now = time.monotonic()
+        seq = round(math.degrees(msg.position[0]))
+        self.received_times.setdefault(seq, now)
+
+    def publish_wheel_command(self):
+        msg = String()
+        msg.data = orjson.dumps(
+            {
+                "type": DeviceDataTypeEnum.car_C_rear_wheel,
+                "data": {"target_vel": [float(self._seq), 0.0]},
+            }
+        ).decode()
+        self.published_times[self._seq] = time.monotonic()
+        self._publisher.publish(msg)
+        self._seq += 1
+
+    def publish_arm_command(self):
+        # arm_writer sends degrees % 360, so spread seq over two joints
+        msg = JointTrajectoryPoint()
+        msg.positions = [
+            math.radians(self._seq % 360),
+            math.radians(self._seq // 360 % 360),
+            0.0,
+            0.0,
+            0.0,
+        ]
+        self.published_times[self._seq] = time.monotonic()
+        self._publisher.publish(msg)
+        self._seq += 1
+
+
+def command_seq(kind, values):
+    if kind == WHEEL:
+        return round(values[0])
+    return round(values[0]) % 360 + 360 * (round(values[1]) % 360)
+
+
+def summarize(scenario, sent_times, received_times, duration):
+    latencies = sorted(
+        received_times[seq] - sent_times[seq]
+        for seq in received_times
+        if seq in sent_times
+    )
+    sent = len(sent_times)
+    delivered = len(latencies)
+    result = {
+        "scenario": scenario,
+        "sent": sent,
+        "delivered": delivered,
+        "rate": delivered / duration,
+        "drop_rate": 1.0 - delivered / sent if sent else 0.0,
+        "p50_ms": 0.0,
+        "p99_ms": 0.0,
+    }
+    if latencies:
+        result["p50_ms"] = latencies[int(0.50 * (delivered - 1))] * 1e3
+        result["p99_ms"] = latencies[int(0.99 * (delivered - 1))] * 1e3
+    return result
+
+
+def node_under_test(scenario):
+    # Imported here so every scenario constructs its node after rclpy.init
+    if scenario == "wheel_read":
+        from pros_car_py.carC_serial_reader import CarCSerialReader
+        return CarCSerialReader()
+    if scenario == "wheel_write":
+        from pros_car_py.carC_serial_writer import CarCControlSubscriber
+        return CarCControlSubscriber()
+    if scenario == "arm_read":
+        from pros_car_py.arm_reader import ArmSerialReader
+        return ArmSerialReader()
+    from pros_car_py.arm_writer import ArmSerialWriter
+    return ArmSerialWriter()
+
+
+def run_scenario(scenario, options):
+    kind = WHEEL if scenario.startswith("wheel") else ARM
+    reading = scenario.endswith("read")
+    device = EmulatedDevice(
+        kind,
+        rate=options.rate if reading else 0.0,
+        jitter=options.jitter,
+        protocol=options.protocol,
+        seed=0,
+    ).start()
+    # The wheel nodes always open the front port as well
+    front = EmulatedDevice(WHEEL, rate=0.0, protocol=options.protocol).start()
+
+    rclpy.init(
+        args=[
+            "--ros-args",
+            "-p", f"serial_port:={device.port}",
+            "-p", f"serial_port_forward:={front.port}",
+            "-p", f"protocol:={options.protocol}",
+            "-p", f"read_mode:={options.read_mode}",
+            "--log-level", "warn",
+        ]
+    )
+    node = node_under_test(scenario)
+    probe = BenchProbe(scenario, options.rate)
+    executor = SingleThreadedExecutor()
+    executor.add_node(node)
+    executor.add_node(probe)
+    try:
+        # Let discovery settle before measuring
+        deadline = time.monotonic() + options.warmup
+        while time.monotonic() < deadline:
+            executor.spin_once(timeout_sec=0.01)
+        device.sent_times.clear()
+        probe.published_times.clear()
+        probe.received_times.clear()
+        device.received.clear()
+
+        start = time.monotonic()
+        deadline = start + options.duration
+        while time.monotonic() < deadline:
+            executor.spin_once(timeout_sec=0.01)
+        duration = time.monotonic() - start
+        if reading:
+            sent_times = dict(device.sent_times)
+        else:
+            sent_times = dict(probe.published_times)
+        # Drain frames still in flight, without counting newer ones
+        deadline = time.monotonic() + options.drain
+        while time.monotonic() < deadline:
+            executor.spin_once(timeout_sec=0.01)
+
+        if reading:
+            received_times = probe.received_times
+        else:
+            received_times = {}
+            for receive_time, values in device.received:
+                received_times.setdefault(command_seq(kind, values), receive_time)
+        return summarize(scenario, sent_times, received_times, duration)
+    finally:
+        executor.shutdown()
+        node.destroy_node()
+        probe.destroy_node()
+        rclpy.shutdown()
+        device.stop()
+        front.stop()
+
+
+def format_result(result):
+    return (
+        f"{result['scenario']:<12} {result['rate']:9.1f} frames/s  "
+        f"drop {result['drop_rate'] * 100:5.1f} %  "
+        f"p50 {result['p50_ms']:7.3f} ms  p99 {result['p99_ms']:7.3f} ms  "
+        f"({result['delivered']}/{result['sent']})"
+    )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--rate", type=float, default=100.0, help="frames/s sent")
+    parser.add_argument("--jitter", type=float, default=0.0, help="relative send jitter")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--drain", type=float, default=0.5)
+    parser.add_argument("--protocol", default="json", choices=["json", "binary"])
+    parser.add_argument("--read-mode", default="timer", choices=["timer", "event"])
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    options = parser.parse_args(args)
+
+    results = []
+    for scenario in options.scenarios:
+        result = run_scenario(scenario, options)
+        results.append(result)
+        print(format_result(result), flush=True)
+
+    if options.output:
+        with open(options.output, "wb") as f:
+            f.write(orjson.dumps(
+                {"options": vars(options), "results": results},
+                option=orjson.OPT_INDENT_2,
+            ))
+
+
+if __name__ == "__main__":
+    main()
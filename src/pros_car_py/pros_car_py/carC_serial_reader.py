@@ -1,11 +1,21 @@
 from pros_car_py.env import SERIAL_DEV_DEFAULT, SERIAL_DEV_FORWARD_DEFAULT
 from pros_car_py.car_models import *
+from pros_car_py.serial_io import (
+    FrameAssembler,
+    PortStats,
+    SerialEventLoop,
+    format_stats,
+    frame_delimiter,
+    receive_stamp,
+)
 import rclpy
 from rclpy.node import Node
 import orjson
+import time
 from std_msgs.msg import String
 from serial import Serial
 from rclpy.duration import Duration
+from custome_interfaces.msg import WheelState
 
 
 class CarCSerialReader(Node):
@@ -14,6 +24,17 @@ class CarCSerialReader(Node):
 
         serial_port = self.declare_parameter('serial_port', SERIAL_DEV_DEFAULT).value
         serial_port_forward = self.declare_parameter('serial_port_forward', SERIAL_DEV_FORWARD_DEFAULT).value
+        # "timer": poll both ports every 10 ms (legacy behaviour)
+        # "event": block on the ports in an I/O thread and publish on arrival
+        read_mode = self.declare_parameter('read_mode', 'timer').value
+        stats_period = self.declare_parameter('stats_period', 5.0).value
+        # "json" or "binary": how frames are delimited on the wire. The
+        # format of each frame is still detected individually.
+        protocol = self.declare_parameter('protocol', 'json').value
+        self._delimiter = frame_delimiter(protocol)
+        # Also publish custome_interfaces/WheelState on <topic>_typed, stamped
+        # with the serial receive time, so consumers can skip JSON decoding.
+        publish_typed = self.declare_parameter('publish_typed', False).value
 
         self._serial = Serial(serial_port, 115200, timeout=0)
         self._serial_forward = Serial(serial_port_forward, 115200, timeout=0)
@@ -30,53 +51,111 @@ class CarCSerialReader(Node):
             10
         )
 
-        # Create a timer to read from the serial port and publish state every 100 ms
-        self.timer = self.create_timer(0.01, self.timer_callback)
-        self.timer_forward = self.create_timer(0.01, self.timer_callback_forward)
+        self.typed_publisher = None
+        self.typed_publisher_forward = None
+        if publish_typed:
+            self.typed_publisher = self.create_publisher(
+                WheelState,
+                f'{DeviceDataTypeEnum.car_C_state}_typed',
+                10
+            )
+            self.typed_publisher_forward = self.create_publisher(
+                WheelState,
+                f'{DeviceDataTypeEnum.car_C_state_front}_typed',
+                10
+            )
+
+        self.stats = PortStats('rear')
+        self.stats_forward = PortStats('front')
 
         self.log_interval = Duration(seconds=1)  # Log every 1 seconds
         current_time = self.get_clock().now()
         self.last_log_time = current_time
 
+        self._event_loop = None
+        if read_mode == 'event':
+            self._event_loop = SerialEventLoop(log=self.get_logger().error)
+            self._event_loop.register(
+                self._serial,
+                lambda frame, receive_time: self.handle_frame(
+                    frame, receive_time, self.publisher, self.typed_publisher, self.stats
+                ),
+                self._delimiter,
+                name='rear',
+                stats=self.stats,
+            )
+            self._event_loop.register(
+                self._serial_forward,
+                lambda frame, receive_time: self.handle_frame(
+                    frame, receive_time, self.publisher_forward,
+                    self.typed_publisher_forward, self.stats_forward
+                ),
+                self._delimiter,
+                name='front',
+                stats=self.stats_forward,
+            )
+            self._event_loop.start()
+        else:
+            # Create a timer to read from the serial port and publish state every 10 ms.
+            # Each tick drains the port and keeps a partial line for the next one.
+            self._assembler = FrameAssembler(self._delimiter)
+            self._assembler_forward = FrameAssembler(self._delimiter)
+            self.timer = self.create_timer(0.01, self.timer_callback)
+            self.timer_forward = self.create_timer(0.01, self.timer_callback_forward)
+
+        if stats_period > 0:
+            self.stats_timer = self.create_timer(stats_period, self.stats_callback)
+        self.get_logger().info(f'Serial read mode: {read_mode}, protocol: {protocol}')
+
     def timer_callback(self):
-        if self._serial.in_waiting > 0:
-            incoming_data = self._serial.readline()
-            current_time = self.get_clock().now()
-            if current_time - self.last_log_time >= self.log_interval:
-                self.get_logger().info(f'Receive from car esp32: {incoming_data}')
-                self.last_log_time = current_time
-
-            try:
-                # Assuming the incoming data is already in the required JSON format
-                state_msg = String()
-                # validation should be customized
-                state_data = dict(CarCState(**orjson.loads(incoming_data)))
-                state_msg.data = orjson.dumps(
-                    dict(DeviceData(type=DeviceDataTypeEnum.car_C_state,
-                                    data=state_data))
-                ).decode()
-                self.publisher.publish(state_msg)
-            except orjson.JSONDecodeError as e:
-                self.get_logger().error(f'JSON decode error: {e}')
+        receive_time = time.monotonic()
+        for incoming_data in self._assembler.read(self._serial):
+            self.handle_frame(
+                incoming_data, receive_time, self.publisher, self.typed_publisher, self.stats
+            )
 
     def timer_callback_forward(self):
-        if self._serial_forward.in_waiting > 0:
-            incoming_data_forward = self._serial_forward.readline()
-            current_time = self.get_clock().now()
-            if current_time - self.last_log_time >= self.log_interval:
-                self.get_logger().info(f'Receive from car esp32: {incoming_data_forward}')
-                self.last_log_time = current_time
-
-            try:
-                state_msg = String()
-                state_data = dict(CarCState(**orjson.loads(incoming_data_forward)))
-                state_msg.data = orjson.dumps(
-                    dict(DeviceData(type=DeviceDataTypeEnum.car_C_state,
-                                    data=state_data))
-                ).decode()
-                self.publisher_forward.publish(state_msg)
-            except orjson.JSONDecodeError as e:
-                self.get_logger().error(f'JSON decode error: {e}')
+        receive_time = time.monotonic()
+        for incoming_data_forward in self._assembler_forward.read(self._serial_forward):
+            self.handle_frame(
+                incoming_data_forward, receive_time, self.publisher_forward,
+                self.typed_publisher_forward, self.stats_forward
+            )
+
+    def handle_frame(self, incoming_data, receive_time, publisher, typed_publisher, stats):
+        """Validate one raw ESP32 frame and publish it as a DeviceData envelope."""
+        current_time = self.get_clock().now()
+        if current_time - self.last_log_time >= self.log_interval:
+            self.get_logger().info(f'Receive from car esp32: {incoming_data}')
+            self.last_log_time = current_time
+
+        try:
+            state_msg = String()
+            state_data = decode_car_c_state_frame(incoming_data)
+            state_msg.data = car_c_state_envelope(state_data)
+            publisher.publish(state_msg)
+            if typed_publisher is not None:
+                typed_msg = WheelState()
+                typed_msg.header.stamp = receive_stamp(self.get_clock(), receive_time)
+                typed_msg.vels = state_data['vels']
+                typed_msg.encoders = state_data['encoders']
+                typed_publisher.publish(typed_msg)
+            stats.record(receive_time)
+        except orjson.JSONDecodeError as e:
+            stats.record_error()
+            self.get_logger().error(f'JSON decode error: {e}')
+        except FrameError as e:
+            stats.record_error()
+            self.get_logger().error(f'Invalid frame: {e}')
+
+    def stats_callback(self):
+        for stats in (self.stats, self.stats_forward):
+            self.get_logger().info(format_stats(stats.snapshot()))
+
+    def destroy_node(self):
+        if self._event_loop is not None:
+            self._event_loop.stop()
+        super().destroy_node()
 
 
 def main(args=None):
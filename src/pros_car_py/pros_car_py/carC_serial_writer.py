@@ -1,5 +1,12 @@
 from pros_car_py.env import SERIAL_DEV_DEFAULT, SERIAL_DEV_FORWARD_DEFAULT
 from pros_car_py.car_models import *
+from pros_car_py.serial_io import (
+    CoalescingWriter,
+    format_writer_counters,
+    negotiate_protocol,
+)
+from pros_car_py.log_sampling import LogSampler
+from pros_car_py.topic_qos import TopicQosConfig
 import rclpy
 from rclpy.node import Node
 import orjson
@@ -10,7 +17,9 @@ from serial import Serial
 class CarCControlSubscriber(Node):
     def __init__(self):
         super().__init__("car_c_control_subscriber")
-        self.subscription = self.create_subscription(
+        # Subscription QoS and callback groups from config/topic_qos.yaml
+        self.topic_qos = TopicQosConfig(self)
+        self.subscription = self.topic_qos.subscribe(
             String,
             DeviceDataTypeEnum.car_C_rear_wheel,  # topic name
             self.listener_callback,
@@ -21,7 +30,7 @@ class CarCControlSubscriber(Node):
         self.subscription  # prevent unused variable warning
         self._serial = Serial(serial_port, 115200, timeout=0)
         # ------------------------------------------------------------------
-        self.subscription_forward = self.create_subscription(
+        self.subscription_forward = self.topic_qos.subscribe(
             String,
             DeviceDataTypeEnum.car_C_front_wheel,  # topic name
             self.listener_callback_forward,
@@ -34,6 +43,36 @@ class CarCControlSubscriber(Node):
         self.subscription_forward  # prevent unused variable warning
         self._serial_forward = Serial(serial_port_forward, 115200, timeout=0)
 
+        # "json" (default), "binary", or "auto" to try the binary handshake
+        # and fall back to JSON for boards that do not acknowledge it
+        protocol = self.declare_parameter("protocol", "json").value
+        self._protocol = negotiate_protocol(self._serial, protocol)
+        self._protocol_forward = negotiate_protocol(self._serial_forward, protocol)
+        self.get_logger().info(
+            f"Serial protocol rear: {self._protocol}, front: {self._protocol_forward}"
+        )
+
+        # Opt-in latest-wins write stage per port, e.g. max_write_rate:=100.0
+        # for controllers that publish faster than the UART drains. The
+        # default (<= 0) writes every command straight to the port as before.
+        max_write_rate = self.declare_parameter("max_write_rate", 0.0).value
+        max_out_waiting = self.declare_parameter("max_out_waiting", 0).value
+        stats_period = self.declare_parameter("stats_period", 5.0).value
+        # Received commands are summarised once per log_period instead of per frame
+        log_period = self.declare_parameter("log_period", 1.0).value
+        self._log_sampler = LogSampler(self.get_logger().info, log_period, node=self)
+        self._writer = None
+        self._writer_forward = None
+        if max_write_rate > 0:
+            self._writer = CoalescingWriter(
+                self._serial, max_write_rate, max_out_waiting, name="rear"
+            )
+            self._writer_forward = CoalescingWriter(
+                self._serial_forward, max_write_rate, max_out_waiting, name="front"
+            )
+            if stats_period > 0:
+                self.stats_timer = self.create_timer(stats_period, self.stats_callback)
+
     # -------------------------------------------------------------------
     def listener_callback(self, msg):
         try:
@@ -41,11 +80,13 @@ class CarCControlSubscriber(Node):
             # TODO use more clear method to write
             # TODO divide serial data and data validation
             if control_data.get("type") == DeviceDataTypeEnum.car_C_rear_wheel:
-                self.process_control_data(CarCControl, control_data.get("data", {}))
+                self.process_control_data(control_data.get("data", {}))
         except orjson.JSONDecodeError as e:
             self.get_logger().error("JSON decode error: {}".format(e))
         except KeyError as e:
             self.get_logger().error("Missing key in JSON data: {}".format(e))
+        except FrameError as e:
+            self.get_logger().error("Binary frame error: {}".format(e))
 
     def listener_callback_forward(self, msg):
         try:
@@ -53,39 +94,52 @@ class CarCControlSubscriber(Node):
             # TODO use more clear method to write
             # TODO divide serial data and data validation
             if control_data_forward.get("type") == DeviceDataTypeEnum.car_C_front_wheel:
-                self.process_control_data_forward(
-                    CarCControl, control_data_forward.get("data", {})
-                )
+                self.process_control_data_forward(control_data_forward.get("data", {}))
         except orjson.JSONDecodeError as e:
             self.get_logger().error("JSON decode error: {}".format(e))
         except KeyError as e:
             self.get_logger().error("Missing key in JSON data: {}".format(e))
+        except FrameError as e:
+            self.get_logger().error("Binary frame error: {}".format(e))
 
-    def process_control_data(self, type_cls, data: dict):
+    def process_control_data(self, data: dict):
         # Process the control data as needed
         # direction = data.get('direction')
-        # target_vel = data.get('target_vel')
         # TODO should be customized
-        control_signal = type_cls(**data)
+        target_vel = validate_car_c_control(data)
 
-        self._serial.write(
-            orjson.dumps(dict(control_signal), option=orjson.OPT_APPEND_NEWLINE)
-        )
+        frame = encode_car_c_control_frame(target_vel, self._protocol)
+        if self._writer is not None:
+            self._writer.submit(frame)
+        else:
+            self._serial.write(frame)
         # self.get_logger().info(f'Received type:{type(data)} data: {data}')
-        self.get_logger().info(f"Received {control_signal}")
+        self._log_sampler.log("rear target_vel", target_vel)
 
-    def process_control_data_forward(self, type_cls, data: dict):
+    def process_control_data_forward(self, data: dict):
         # Process the control data as needed
         # direction = data.get('direction')
-        # target_vel = data.get('target_vel')
         # TODO should be customized
-        control_signal_forward = type_cls(**data)
+        target_vel_forward = validate_car_c_control(data)
 
-        self._serial_forward.write(
-            orjson.dumps(dict(control_signal_forward), option=orjson.OPT_APPEND_NEWLINE)
-        )
+        frame = encode_car_c_control_frame(target_vel_forward, self._protocol_forward)
+        if self._writer_forward is not None:
+            self._writer_forward.submit(frame)
+        else:
+            self._serial_forward.write(frame)
         # self.get_logger().info(f'Received type:{type(data)} data: {data}')
-        self.get_logger().info(f"Received {control_signal_forward}")
+        self._log_sampler.log("front target_vel", target_vel_forward)
+
+    def stats_callback(self):
+        for writer in (self._writer, self._writer_forward):
+            self.get_logger().info(format_writer_counters(writer.counters()))
+
+    def destroy_node(self):
+        self._log_sampler.flush()
+        for writer in (self._writer, self._writer_forward):
+            if writer is not None:
+                writer.stop()
+        super().destroy_node()
 
 
 def main(args=None):
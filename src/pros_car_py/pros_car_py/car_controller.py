@@ -1,10 +1,21 @@
 from rclpy.node import Node
 from std_msgs.msg import String
 from pros_car_py.car_models import DeviceDataTypeEnum, CarCControl
+from pros_car_py.log_sampling import LogSampler
+from pros_car_py.mission import (
+    MissionExecutor,
+    declare_mission_config,
+    format_mission_stats,
+)
+from pros_car_py.rate_loop import RateLoop, format_rate_stats
 import threading
 import time
 
 
+# Default rate (Hz) of the auto navigation loop, `car_control_rate` parameter
+CAR_CONTROL_RATE = 20.0
+
+
 class CarController:
 
     def __init__(self, ros_communicator, nav_processing):
@@ -19,13 +30,19 @@ class CarController:
         self._auto_nav_thread = None
         self._stop_event = threading.Event()
         self._thread_running = False
-
-        self.target_idx = 0  # 目標索引
-        self.target_list = [
-            [0.12577216615733916, 4.207528556910003],
-            [0.004709751367064641, -0.43933601070552486],
-            [3.202388878639925, 3.893176401328583],
-        ]
+        # background_task runs at control rate, print a summary of the actions instead
+        self._log_sampler = LogSampler()
+        # Fixed control rate, so the nav thresholds see the same period every tick
+        self.control_rate = ros_communicator.declare_parameter(
+            "car_control_rate", CAR_CONTROL_RATE
+        ).value
+
+        # target_auto_nav 的航點 (config/waypoints.yaml)，下一段路徑預先規劃
+        self.mission = MissionExecutor(
+            nav_processing,
+            declare_mission_config(ros_communicator),
+            request_plan=ros_communicator.request_plan,
+        )
 
     def update_action(self, action_key):
         """
@@ -126,30 +143,30 @@ class CarController:
     def background_task(self, stop_event, mode, target):
         """
         後台任務：不斷執行導航動作直到 stop_event 被設定。
+
+        以固定頻率 (car_control_rate) 重新計算動作並發布，使用最新的感測資料；
+        計算超過一個週期時跳過錯過的週期 (RateLoop "skip")。
         """
+        loop = RateLoop(
+            self.control_rate,
+            overrun="skip",
+            name="[background_task] car control",
+            report=print,
+        )
+        if mode == "target_auto_nav":
+            self.mission.start()
 
-        while not stop_event.is_set():
+        while loop.sleep(stop_event):
 
             if mode == "manual_auto_nav":
-                action_key = (
-                    self.nav_processing.get_action_from_nav2_plan_no_dynamic_p_2_p(
-                        goal_coordinates=None
-                    )
+                action_key = self.nav_processing.get_command_from_nav2_plan(
+                    goal_coordinates=None
                 )
                 if self.nav_processing.get_finish_flag():
                     self.nav_processing.reset_nav_process()
             elif mode == "target_auto_nav":
-
-                current_target = self.target_list[self.target_idx]
-                action_key = (
-                    self.nav_processing.get_action_from_nav2_plan_no_dynamic_p_2_p(
-                        goal_coordinates=current_target
-                    )
-                )
-                if self.nav_processing.get_finish_flag():
-                    self.nav_processing.reset_nav_process()
-                    self.target_idx = (self.target_idx + 1) % len(self.target_list)
-                    continue
+                # 抵達航點時直接接上已規劃好的下一段路徑
+                action_key = self.mission.step()
             # 發布控制指令
 
             elif mode == "custom_nav":
@@ -157,13 +174,16 @@ class CarController:
 
             if self._thread_running == False:
                 action_key = "STOP"
-            print(action_key)
-            time.sleep(0.05)
+            self._log_sampler.log("[background_task] action", action_key)
             self.ros_communicator.publish_car_control(
                 action_key, publish_rear=True, publish_front=True
             )
-        
+
         # 收尾動作
+        self._log_sampler.flush()
+        print(format_rate_stats(loop.stats()))
+        if mode == "target_auto_nav":
+            print(format_mission_stats(self.mission.stats()))
         print("[background_task] Navigation stopped.")
 
     def run(self, mode, target):
@@ -1,23 +1,17 @@
-from enum import Enum, auto
+from enum import Enum, IntEnum, auto
 from typing import List
+import struct
+import orjson
 import pydantic
 
 
 class StringEnum(str, Enum):
+    # Members are str instances whose value equals their name, so the
+    # inherited C-level str.__eq__ already compares them with plain strings
+    # and with each other; no Python-level __eq__ on the hot path.
     def _generate_next_value_(name, start, count, last_values):
         return name
 
-    def __eq__(self, other):
-        if isinstance(other, StringEnum):
-            return self.value == other.value
-        elif isinstance(other, str):
-            return self.value == other
-
-        return False
-
-    def __ne__(self, other):
-        return not self.__eq__(other)
-
     def __str__(self):
         return self.value
 
@@ -91,3 +85,334 @@ class TwoWheelState(pydantic.BaseModel):
     motor_count: int = 2
     vels: List[float] = []
     encoders: List[int] = []
+
+
+# ---------------------------------------------------------------------------
+# Binary serial framing
+#
+# Optional compact alternative to newline-terminated JSON on the wheel and
+# arm serial links. A frame on the wire is
+#
+#     COBS(frame_type:u8 | payload | crc16:u16le) 0x00
+#
+# COBS guarantees the payload never contains 0x00, so the zero byte is a
+# reliable frame delimiter. The CRC is CRC-16/CCITT-FALSE over the frame type
+# and payload. All payload fields are little-endian.
+#
+# Boards that still speak JSON keep working: the host only switches a link to
+# binary after sending `handshake_request()` and receiving a JSON line that
+# `is_handshake_ack()` accepts. JSON frames always start with `{` (0x7B); a
+# COBS code byte only takes that value for bodies longer than 120 bytes, far
+# beyond any frame defined here, so readers can tell both formats apart per
+# frame.
+# ---------------------------------------------------------------------------
+
+PROTOCOL_VERSION = 1
+BINARY_FRAME_DELIMITER = b"\x00"
+JSON_FRAME_DELIMITER = b"\n"
+
+
+class SerialProtocolEnum(StringEnum):
+    json = auto()
+    binary = auto()
+    auto = auto()
+
+
+class FrameType(IntEnum):
+    car_C_control = 0x01
+    car_C_state = 0x02
+    servo_target_angles = 0x03
+    servo_current_angles = 0x04
+
+
+class FrameError(ValueError):
+    """Raised when a binary frame is truncated, malformed or fails its CRC."""
+
+
+_CAR_C_CONTROL_STRUCT = struct.Struct("<2f")
+_CAR_C_STATE_STRUCT = struct.Struct("<2f2i")
+_SERVO_COUNT_STRUCT = struct.Struct("<B")
+_CRC_STRUCT = struct.Struct("<H")
+
+
+def _make_crc16_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return table
+
+
+_CRC16_TABLE = _make_crc16_table()
+
+
+def crc16_ccitt(data: bytes, crc: int = 0xFFFF) -> int:
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF)."""
+    table = _CRC16_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+
+def cobs_encode(data: bytes) -> bytes:
+    """Consistent Overhead Byte Stuffing, without the trailing delimiter."""
+    out = bytearray()
+    block_start = 0
+    while True:
+        zero = data.find(0, block_start, block_start + 254)
+        if zero == -1:
+            block = data[block_start:block_start + 254]
+            if len(block) == 254:
+                out.append(255)
+                out += block
+                block_start += 254
+                continue
+            out.append(len(block) + 1)
+            out += block
+            return bytes(out)
+        out.append(zero - block_start + 1)
+        out += data[block_start:zero]
+        block_start = zero + 1
+
+
+def cobs_decode(data: bytes) -> bytes:
+    """Inverse of `cobs_encode`; `data` must not include the delimiter."""
+    out = bytearray()
+    index = 0
+    length = len(data)
+    while index < length:
+        code = data[index]
+        end = index + code
+        if code == 0 or end > length:
+            raise FrameError("invalid COBS block")
+        out += data[index + 1:end]
+        index = end
+        if code < 255 and index < length:
+            out.append(0)
+    return bytes(out)
+
+
+def encode_frame(frame_type: int, payload: bytes) -> bytes:
+    """Build a delimited binary frame ready to be written to the serial port."""
+    body = bytes((frame_type,)) + payload
+    return cobs_encode(body + _CRC_STRUCT.pack(crc16_ccitt(body))) + BINARY_FRAME_DELIMITER
+
+
+def decode_frame(frame: bytes):
+    """
+    Check and unpack one binary frame.
+
+    Args:
+        frame (bytes): raw frame, with or without the trailing 0x00 delimiter.
+
+    Returns:
+        tuple: (FrameType, payload bytes)
+
+    Raises:
+        FrameError: if the frame is malformed or the CRC does not match.
+    """
+    if frame.endswith(BINARY_FRAME_DELIMITER):
+        frame = frame[:-1]
+    body = cobs_decode(frame)
+    if len(body) < 3:
+        raise FrameError(f"frame too short ({len(body)} bytes)")
+    (crc,) = _CRC_STRUCT.unpack_from(body, len(body) - 2)
+    if crc != crc16_ccitt(body[:-2]):
+        raise FrameError("CRC mismatch")
+    try:
+        frame_type = FrameType(body[0])
+    except ValueError:
+        raise FrameError(f"unknown frame type {body[0]:#04x}")
+    return frame_type, body[1:-2]
+
+
+def is_binary_frame(frame: bytes) -> bool:
+    """JSON frames start with `{`; everything else is treated as binary."""
+    return not frame.lstrip()[:1] == b"{"
+
+
+def encode_car_c_control(target_vel) -> bytes:
+    try:
+        payload = _CAR_C_CONTROL_STRUCT.pack(*target_vel)
+    except struct.error as e:
+        raise FrameError(f"bad car_C_control target_vel {target_vel}: {e}")
+    return encode_frame(FrameType.car_C_control, payload)
+
+
+def decode_car_c_control(payload: bytes) -> list:
+    """Unpack a car_C_control payload into `target_vel`."""
+    try:
+        return list(_CAR_C_CONTROL_STRUCT.unpack(payload))
+    except struct.error as e:
+        raise FrameError(f"bad car_C_control payload: {e}")
+
+
+def decode_car_c_state(payload: bytes) -> dict:
+    """Unpack a car_C_state payload into the same dict layout as CarCState."""
+    try:
+        vel_left, vel_right, enc_left, enc_right = _CAR_C_STATE_STRUCT.unpack(payload)
+    except struct.error as e:
+        raise FrameError(f"bad car_C_state payload: {e}")
+    return {"vels": [vel_left, vel_right], "encoders": [enc_left, enc_right]}
+
+
+def encode_car_c_state(vels, encoders) -> bytes:
+    return encode_frame(FrameType.car_C_state, _CAR_C_STATE_STRUCT.pack(*vels, *encoders))
+
+
+def encode_servo_angles(frame_type: int, angles) -> bytes:
+    """Pack servo angles (degrees) as a u8 count followed by float32 values."""
+    count = len(angles)
+    payload = _SERVO_COUNT_STRUCT.pack(count) + struct.pack(f"<{count}f", *angles)
+    return encode_frame(frame_type, payload)
+
+
+def decode_servo_angles(payload: bytes) -> list:
+    """Inverse of `encode_servo_angles`; the payload must hold exactly `count` angles."""
+    if not payload:
+        raise FrameError("empty servo payload")
+    count = payload[0]
+    expected = _SERVO_COUNT_STRUCT.size + 4 * count
+    if len(payload) != expected:
+        raise FrameError(
+            f"bad servo payload: {len(payload)} bytes for {count} angles, "
+            f"expected {expected}"
+        )
+    return list(struct.unpack_from(f"<{count}f", payload, _SERVO_COUNT_STRUCT.size))
+
+
+def handshake_request() -> bytes:
+    """JSON line asking the board to switch this link to binary framing."""
+    return orjson.dumps(
+        {"protocol": SerialProtocolEnum.binary.value, "version": PROTOCOL_VERSION},
+        option=orjson.OPT_APPEND_NEWLINE,
+    )
+
+
+def is_handshake_ack(line: bytes) -> bool:
+    """True if `line` is the board's JSON acknowledgement of `handshake_request`."""
+    if is_binary_frame(line):
+        return False
+    try:
+        reply = orjson.loads(line)
+    except orjson.JSONDecodeError:
+        return False
+    return isinstance(reply, dict) and reply.get("protocol_ack") == PROTOCOL_VERSION
+
+
+def max_frame_rate(frame_size: int, baudrate: int = 115200) -> float:
+    """Upper bound on frames/s for 8N1 framing (10 bits on the wire per byte)."""
+    return baudrate / (10.0 * frame_size)
+
+
+# ---------------------------------------------------------------------------
+# Frame-level helpers shared by the serial nodes and the serial gateway.
+# Every decoder accepts both JSON lines and binary frames.
+# ---------------------------------------------------------------------------
+
+
+def _as_float_list(values):
+    """Return `values` as a list of floats, or None if it needs full validation."""
+    if type(values) is not list:
+        return None
+    if all(type(v) is float for v in values):
+        return values
+    # bool is not accepted here, it goes through the model like before
+    if all(type(v) is float or type(v) is int for v in values):
+        return [float(v) for v in values]
+    return None
+
+
+def validate_car_c_state(obj) -> dict:
+    """
+    Validate a decoded CarCState frame without allocating a model.
+
+    Well-formed frames ({"vels": [float, ...], "encoders": [int, ...]}) are
+    checked with plain type tests and returned without building a model or
+    copying the dict. Anything else goes through the pydantic model, which
+    keeps its coercion rules and error messages.
+    """
+    if type(obj) is dict and len(obj) == 2:
+        vels = _as_float_list(obj.get("vels"))
+        encoders = obj.get("encoders")
+        if (
+            vels is not None
+            and type(encoders) is list
+            and all(type(v) is int for v in encoders)
+        ):
+            obj["vels"] = vels
+            return obj
+    return dict(CarCState(**obj))
+
+
+def validate_car_c_control(obj) -> list:
+    """Same fast path as `validate_car_c_state` for CarCControl; returns `target_vel`."""
+    if type(obj) is dict and len(obj) == 1:
+        target_vel = _as_float_list(obj.get("target_vel"))
+        if target_vel is not None:
+            return target_vel
+    return CarCControl(**obj).target_vel
+
+
+def decode_car_c_state_frame(frame: bytes) -> dict:
+    """
+    Validate one wheel state frame and return it as a CarCState-shaped dict.
+
+    Raises:
+        orjson.JSONDecodeError: the line is not JSON.
+        FrameError: a corrupt binary frame, or JSON that is not a CarCState
+            object (wrong field types, or not an object at all).
+    """
+    if is_binary_frame(frame):
+        frame_type, payload = decode_frame(frame)
+        if frame_type != FrameType.car_C_state:
+            raise FrameError(f"unexpected frame type {frame_type.name}")
+        return decode_car_c_state(payload)
+    try:
+        return validate_car_c_state(orjson.loads(frame))
+    except (pydantic.ValidationError, TypeError) as e:
+        raise FrameError(f"invalid car_C_state frame: {e}")
+
+
+_CAR_C_STATE_ENVELOPE_PREFIX = b'{"type":"car_C_state","data":'
+
+
+def car_c_state_envelope(state_data: dict) -> str:
+    """
+    JSON DeviceData envelope published on the car_C_state topics.
+
+    Byte-for-byte the same as dumping DeviceData(type=car_C_state, data=...),
+    without building the model and its intermediate dicts.
+    """
+    return (_CAR_C_STATE_ENVELOPE_PREFIX + orjson.dumps(state_data) + b"}").decode()
+
+
+def encode_car_c_control_frame(target_vel, protocol) -> bytes:
+    if protocol == SerialProtocolEnum.binary:
+        return encode_car_c_control(target_vel)
+    return orjson.dumps({"target_vel": target_vel}, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def decode_servo_current_angles_frame(frame: bytes) -> list:
+    """
+    Return the servo angles (degrees) reported by the arm ESP32.
+
+    Raises:
+        orjson.JSONDecodeError, KeyError, FrameError
+    """
+    if is_binary_frame(frame):
+        frame_type, payload = decode_frame(frame)
+        if frame_type != FrameType.servo_current_angles:
+            raise FrameError(f"unexpected frame type {frame_type.name}")
+        return decode_servo_angles(payload)
+    return orjson.loads(frame)["servo_current_angles"]
+
+
+def encode_servo_target_angles_frame(degree_positions, protocol) -> bytes:
+    if protocol == SerialProtocolEnum.binary:
+        return encode_servo_angles(FrameType.servo_target_angles, degree_positions)
+    return orjson.dumps(
+        {"servo_target_angles": degree_positions}, option=orjson.OPT_APPEND_NEWLINE
+    )
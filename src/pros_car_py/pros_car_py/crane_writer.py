@@ -1,6 +1,10 @@
 import orjson
 import math
 from .env_crane import ARM_SERIAL_PORT_DEFAULT
+from .car_models import SerialProtocolEnum, encode_servo_target_angles_frame
+from .serial_io import negotiate_protocol
+from .log_sampling import LogSampler
+from .topic_qos import TopicQosConfig
 import rclpy
 from rclpy.node import Node
 from rclpy.qos import qos_profile_sensor_data
@@ -13,62 +17,75 @@ from serial import Serial
 class CraneSerialWriter(Node):
     def __init__(self):
         super().__init__('arm_serial_writer')
+        # Subscription QoS and callback groups from config/topic_qos.yaml
+        self.topic_qos = TopicQosConfig(self)
 
         # Set up the serial connection
         serial_port = self.declare_parameter('serial_port', ARM_SERIAL_PORT_DEFAULT).value
         self._serial = Serial(serial_port, 115200, timeout=0)
+        # "json" (default), "binary", or "auto"; only the joint angles have a
+        # binary layout, crane_state needs a JSON link
+        protocol = self.declare_parameter('protocol', 'json').value
+        self._protocol = negotiate_protocol(self._serial, protocol)
+        log_period = self.declare_parameter('log_period', 1.0).value
+        self._log_sampler = LogSampler(self.get_logger().info, log_period, node=self)
 
         #  subscribe
-        self.joint_trajectory_subscriber = self.create_subscription(
+        self.joint_trajectory_subscriber = self.topic_qos.subscribe(
             JointTrajectoryPoint,
             'joint_trajectory_point',
             self.joint_trajectory_listener_callback,
             10
         )
 
-        self.crane_state_subscriber = self.create_subscription(
-            std_msgs.msg.String,
-            'crane_state',
-            self.crane_state_listener_callback,
-            10
-        )
+        self.crane_state_subscriber = None
+        if self._protocol != SerialProtocolEnum.json:
+            # A JSON line on the COBS/0x00 link would only confuse the firmware
+            self.get_logger().error(
+                f'crane_state needs the json protocol, negotiated {self._protocol}; '
+                'crane_state disabled'
+            )
+        else:
+            self.crane_state_subscriber = self.topic_qos.subscribe(
+                std_msgs.msg.String,
+                'crane_state',
+                self.crane_state_listener_callback,
+                10
+            )
 
     def joint_trajectory_listener_callback(self, msg: JointTrajectoryPoint):
         radian_positions = msg.positions
-        self.get_logger().info(f"receive {radian_positions}")
 
         # radian to degree
         degree_positions = [math.degrees(rad) % 360 for rad in radian_positions]
-        ctrl_json = {"servo_target_angles": degree_positions}
         try:
-            ctrl_str = orjson.dumps(ctrl_json, option=orjson.OPT_APPEND_NEWLINE)
+            ctrl_str = encode_servo_target_angles_frame(degree_positions, self._protocol)
 
             self._serial.write(ctrl_str)
         except orjson.JSONEncodeError as error:
             self.get_logger().error(f"Json encode error when recv message: {msg}")
             return
         # log
-        self.get_logger().info(f"{ctrl_str}")
+        self._log_sampler.log("servo_target_angles", degree_positions)
 
     def crane_state_listener_callback(self, msg: std_msgs.msg.String):
         crane_state_dict = orjson.loads(msg.data)
-        self.get_logger().info(f"receive {crane_state_dict}")
-                                
+
         try:
             crane_state = crane_state_dict.get('data').get('crane_state')
-                      
-            ctrl_json = {"crane_state": crane_state}             
-            ctrl_str = orjson.dumps(ctrl_json, option=orjson.OPT_APPEND_NEWLINE)
+
+            ctrl_json = {"crane_state": crane_state}
             ctrl_str = orjson.dumps(ctrl_json, option=orjson.OPT_APPEND_NEWLINE)
-            self.get_logger().info(f"{ctrl_str}")
-            ctrl_str = orjson.dumps(ctrl_json, option=orjson.OPT_APPEND_NEWLINE)            
-            self.get_logger().info(f"{ctrl_str}")
             self._serial.write(ctrl_str)
         except orjson.JSONEncodeError as error:
             self.get_logger().error(f"Json encode error when recv message: {msg}")
             return
         # log
-        self.get_logger().info(f"{ctrl_str}")
+        self._log_sampler.log("crane_state", crane_state)
+
+    def destroy_node(self):
+        self._log_sampler.flush()
+        super().destroy_node()
 
 def main(args=None):
     rclpy.init(args=args)
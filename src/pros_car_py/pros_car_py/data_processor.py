@@ -2,17 +2,21 @@
 import math
 import time
 
-# LiDAR global constants
-LIDAR_RANGE = 90
-LIDAR_PER_SECTOR = 20
-FRONT_LIDAR_INDICES = list(range(0, 16)) + list(range(-15, 0))  # front lidar indices
-LEFT_LIDAR_INDICES = list(range(16, 46))  # left lidar indices
-RIGHT_LIDAR_INDICES = list(range(-45, -15))  # right lidar indices
+from pros_car_py.lidar_sectors import LidarSectorExtractor
+from pros_car_py.path_arrays import path_key, process_plan
+
+# Spacing (m) of the points kept from /received_global_plan
+PLAN_SPACING = 0.1
 
 
 class DataProcessor:
     def __init__(self, ros_communicator):
         self.ros_communicator = ros_communicator
+        self.lidar_extractor = LidarSectorExtractor()
+        # Cache of the processed global plan, see get_processed_plan
+        self._plan_msg = None
+        self._plan_key = None
+        self._processed_plan = None
 
     def get_processed_amcl_pose(self):
         amcl_pose_msg = self.ros_communicator.get_latest_amcl_pose()
@@ -36,23 +40,9 @@ class DataProcessor:
 
     def get_processed_lidar(self):
         lidar_msg = self.ros_communicator.get_latest_lidar()
-        angle_min = lidar_msg.angle_min
-        angle_max = lidar_msg.angle_max
-        angle_increment = lidar_msg.angle_increment
-        ranges_180 = []
-        direction_180 = []
-        all_ranges = lidar_msg.ranges
-        for i in range(len(all_ranges)):
-            if i % LIDAR_PER_SECTOR == 0:  # handle the amount of lidar.
-                angle_tmp = angle_min + i * angle_increment
-                ranges_180.append(all_ranges[i])
-                direction_180.append([math.cos(angle_tmp), math.sin(angle_tmp), 0])
-        combined_lidar_data = (
-            [ranges_180[i] for i in FRONT_LIDAR_INDICES]
-            + [ranges_180[i] for i in LEFT_LIDAR_INDICES]
-            + [ranges_180[i] for i in RIGHT_LIDAR_INDICES]
-        )
-        return combined_lidar_data
+        if lidar_msg is None:
+            return None
+        return self.lidar_extractor.extract(lidar_msg).tolist()
 
     import time
 
@@ -100,45 +90,35 @@ class DataProcessor:
         else:
             return None
 
-    def get_processed_received_global_plan(self):
+    def get_processed_plan(self):
+        """
+        /received_global_plan decimated every PLAN_SPACING meters, as a
+        ProcessedPlan of NumPy arrays, or None before the first plan.
+
+        The plan is only re-processed when a new Path arrives, so the
+        per-tick cost does not depend on the path length.
+        """
         received_global_plan_msg = (
             self.ros_communicator.get_latest_received_global_plan()
         )
         if received_global_plan_msg is None:
-            return None, None
-        path_length = len(received_global_plan_msg.poses)
-        orientation_points = []
-        coordinates = []
-        if path_length > 0:
-            last_recorded_point = received_global_plan_msg.poses[0].pose.position
-            orientation_points.append(
-                (
-                    received_global_plan_msg.poses[0].pose.orientation.z,
-                    received_global_plan_msg.poses[0].pose.orientation.w,
-                )
-            )
-            coordinates.append(
-                (
-                    received_global_plan_msg.poses[0].pose.position.x,
-                    received_global_plan_msg.poses[0].pose.position.y,
-                )
-            )
-            for i in range(1, path_length):
-                current_point = received_global_plan_msg.poses[i].pose.position
-                distance = math.sqrt(
-                    (current_point.x - last_recorded_point.x) ** 2
-                    + (current_point.y - last_recorded_point.y) ** 2
+            return None
+        if received_global_plan_msg is not self._plan_msg:
+            key = path_key(received_global_plan_msg)
+            if key != self._plan_key:
+                self._processed_plan = process_plan(
+                    received_global_plan_msg, PLAN_SPACING
                 )
-                if distance >= 0.1:
-                    orientation_points.append(
-                        (
-                            received_global_plan_msg.poses[i].pose.orientation.z,
-                            received_global_plan_msg.poses[i].pose.orientation.w,
-                        )
-                    )
-                    coordinates.append((current_point.x, current_point.y))
-                    last_recorded_point = current_point
-        return orientation_points, coordinates
+                self._plan_key = key
+            self._plan_msg = received_global_plan_msg
+        return self._processed_plan
+
+    def get_processed_received_global_plan(self):
+        """(orientation (M, 2) z, w, coordinates (M, 2) x, y) of the processed plan."""
+        plan = self.get_processed_plan()
+        if plan is None:
+            return None, None
+        return plan.orientation, plan.coordinates
 
     def get_processed_received_global_plan_no_dynamic(self):
         received_global_plan_msg = (
@@ -22,6 +22,7 @@ from ament_index_python.packages import get_package_share_directory
 import xml.etree.ElementTree as ET
 import math
 from scipy.spatial.transform import Rotation as R
+from pros_car_py.log_sampling import LogSampler
 
 
 class PybulletRobotController:
@@ -34,6 +35,8 @@ class PybulletRobotController:
         time_step=1e-3,
     ):
         self.robot_type = robot_type
+        # getJacobian is called per control step, only print a sampled matrix
+        self._log_sampler = LogSampler()
         robot_description_path = get_package_share_directory("robot_description")
         self.urdf_path = os.path.join(robot_description_path, "urdf", "target.urdf")
         self.robot_id = None
@@ -450,7 +453,7 @@ class PybulletRobotController:
         J_t = np.asarray(jac_t)
         J_r = np.asarray(jac_r)
         J = np.concatenate((J_t, J_r), axis=0)
-        print("Jacobian:", J)
+        self._log_sampler.log("Jacobian", J)
         return J
 
     # function to solve forward velocity kinematics
@@ -499,6 +502,8 @@ class PybulletRobotController:
             p.stepSimulation()
             time.sleep(self.time_step)
             t += self.time_step
+        # Summary of the last Jacobians of this run
+        self._log_sampler.flush()
 
     # Function to define GUI sliders (name of the parameter,range,initial value)
     def TaskSpaceGUIcontrol(self, goal, max_limit=3.14, min_limit=-3.14):
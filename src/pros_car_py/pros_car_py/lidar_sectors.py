@@ -0,0 +1,84 @@
+"""
+LiDAR sector extraction shared by DataProcessor and the scan service.
+
+A processed scan keeps every LIDAR_PER_SECTOR-th beam and concatenates the
+front, left and right sectors, given as indices into that decimated scan
+(negative indices count from its end). `LidarSectorExtractor` folds the
+decimation and the sector selection into one table of raw beam indices per
+scan geometry, so each scan costs a single fancy-index on a float32 view of
+`LaserScan.ranges` instead of a Python loop over every beam.
+
+    extractor = LidarSectorExtractor()
+    combined = extractor.extract(scan_msg)  # float32 ndarray, front + left + right
+"""
+
+from array import array
+
+import numpy as np
+
+# LiDAR global constants
+LIDAR_RANGE = 90
+LIDAR_PER_SECTOR = 20
+FRONT_LIDAR_INDICES = list(range(0, 16)) + list(range(-15, 0))  # front lidar indices
+LEFT_LIDAR_INDICES = list(range(16, 46))  # left lidar indices
+RIGHT_LIDAR_INDICES = list(range(-45, -15))  # right lidar indices
+
+
+def ranges_view(ranges):
+    """float32 ndarray over `ranges`, without copying the array.array rclpy uses."""
+    if type(ranges) is array and ranges.typecode == "f":
+        return np.frombuffer(ranges, dtype=np.float32)
+    return np.asarray(ranges, dtype=np.float32)
+
+
+class LidarSectorExtractor:
+    """
+    Args:
+        step (int): keep every `step`-th beam.
+        sectors (tuple): index lists into the decimated scan, concatenated
+            in this order.
+    """
+
+    def __init__(
+        self,
+        step=LIDAR_PER_SECTOR,
+        sectors=(FRONT_LIDAR_INDICES, LEFT_LIDAR_INDICES, RIGHT_LIDAR_INDICES),
+    ):
+        self.step = step
+        self.sectors = tuple(np.asarray(sector, dtype=np.intp) for sector in sectors)
+        self._sector_indices = np.concatenate(self.sectors)
+        # (angle_min, angle_increment, beam count) -> raw beam indices
+        self._tables = {}
+
+    def indices(self, angle_min, angle_increment, count):
+        """Raw beam indices selected for a scan of this geometry (cached)."""
+        geometry = (angle_min, angle_increment, count)
+        table = self._tables.get(geometry)
+        if table is None:
+            table = self._build_table(count)
+            self._tables[geometry] = table
+        return table
+
+    def _build_table(self, count):
+        decimated = len(range(0, count, self.step))
+        sector_indices = self._sector_indices
+        if sector_indices.size and (
+            sector_indices.min() < -decimated or sector_indices.max() >= decimated
+        ):
+            raise IndexError(
+                f"LiDAR sectors need {sector_indices.max() + 1} decimated beams, "
+                f"scan of {count} beams only has {decimated}"
+            )
+        table = (sector_indices % max(decimated, 1)) * self.step
+        table.setflags(write=False)
+        return table
+
+    def extract(self, scan):
+        """
+        Front, left and right sector ranges of a LaserScan.
+
+        Returns:
+            np.ndarray: float32 ranges, sectors concatenated in order.
+        """
+        ranges = ranges_view(scan.ranges)
+        return ranges[self.indices(scan.angle_min, scan.angle_increment, len(ranges))]
@@ -0,0 +1,140 @@
+"""
+Rate-limited, aggregated logging for per-message hot paths.
+
+Logging every frame at info level costs string formatting and stdout I/O on
+each message. `LogSampler` only records the value on the hot path; once per
+`period` and per key (one key per call site) it emits a single summary line:
+
+    rear target_vel: 100 in 1.0s, last [10.0, 10.0], min [-10.0, -10.0], max [10.0, 10.0]
+
+The first call for a key is emitted right away, so a new stream still shows
+up in the logs immediately. Values are only formatted when a summary is
+emitted. Numbers and flat lists/tuples of numbers also get min/max
+(element-wise for sequences).
+
+`log` only emits when the same key comes back after `period`, so the last
+window of a stream that went quiet waits for `flush`. Given a node, the
+sampler flushes itself from a timer every `period`; owners without a node
+call `flush` when their loop ends.
+
+    self._log = LogSampler(self.get_logger().info, node=self)
+    self._log.log("rear target_vel", target_vel)
+"""
+
+import math
+import threading
+import time
+
+
+def _is_number(value):
+    return type(value) in (int, float)
+
+
+def _numeric_sequence(value):
+    return (
+        type(value) in (list, tuple)
+        and len(value) > 0
+        and all(_is_number(v) for v in value)
+    )
+
+
+class _Window:
+    __slots__ = ("count", "last", "low", "high", "start", "last_emit")
+
+    def __init__(self):
+        self.count = 0
+        self.last = None
+        self.low = None
+        self.high = None
+        self.start = 0.0
+        self.last_emit = -math.inf
+
+
+class LogSampler:
+    """
+    Per-key sampling logger.
+
+    Args:
+        emit: callable taking the summary string, e.g. print or
+            node.get_logger().info.
+        period: seconds between two summaries of the same key.
+        node: optional rclpy node; a timer on it calls `flush` every `period`.
+    """
+
+    def __init__(self, emit=print, period=1.0, node=None):
+        self._emit = emit
+        self.period = period
+        self._windows = {}
+        self._lock = threading.Lock()
+        self.timer = None
+        if node is not None and period > 0:
+            self.timer = node.create_timer(period, self.flush)
+
+    def log(self, key, value=None):
+        """Record `value` for `key`; emit a summary if `period` has elapsed."""
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = _Window()
+                window.start = now
+            window.count += 1
+            window.last = value
+            self._update_range(window, value)
+            if now - window.last_emit < self.period:
+                return
+            line = self._summary(key, window, now)
+            self._reset(window, now)
+        self._emit(line)
+
+    def flush(self):
+        """Emit every window that recorded values since its last summary."""
+        now = time.monotonic()
+        lines = []
+        with self._lock:
+            for key, window in self._windows.items():
+                if window.count:
+                    lines.append(self._summary(key, window, now))
+                    self._reset(window, now)
+        for line in lines:
+            self._emit(line)
+
+    @staticmethod
+    def _update_range(window, value):
+        if _is_number(value):
+            if window.low is None or not _is_number(window.low):
+                window.low = window.high = value
+            else:
+                window.low = min(window.low, value)
+                window.high = max(window.high, value)
+        elif _numeric_sequence(value):
+            low = window.low
+            if type(low) is not list or len(low) != len(value):
+                window.low = list(value)
+                window.high = list(value)
+            else:
+                high = window.high
+                for i, v in enumerate(value):
+                    if v < low[i]:
+                        low[i] = v
+                    elif v > high[i]:
+                        high[i] = v
+        else:
+            window.low = window.high = None
+
+    @staticmethod
+    def _summary(key, window, now):
+        if window.last_emit == -math.inf:
+            # First occurrence of this key, log it like a plain message
+            return f"{key}: {window.last}"
+        line = f"{key}: {window.count} in {now - window.start:.1f}s, last {window.last}"
+        if window.low is not None:
+            line += f", min {window.low}, max {window.high}"
+        return line
+
+    @staticmethod
+    def _reset(window, now):
+        window.count = 0
+        window.low = window.high = None
+        window.start = now
+        window.last_emit = now
@@ -2,6 +2,7 @@ import urwid
 import os
 import threading
 import rclpy
+from rclpy.executors import MultiThreadedExecutor
 import time
 import io
 import sys
@@ -18,15 +19,26 @@ from pros_car_py.mode_app import ModeApp
 
 
 def init_ros_node():
+    """
+    Spin RosCommunicator on a MultiThreadedExecutor in a background thread.
+
+    Callbacks of different callback groups (config/topic_qos.yaml) run in
+    parallel, so a burst of LiDAR or YOLO messages does not hold back AMCL
+    and goal updates. The `executor_threads` parameter sets the number of
+    worker threads, 0 uses the executor default (CPU count).
+    """
     rclpy.init()
     node = RosCommunicator()
-    thread = threading.Thread(target=rclpy.spin, args=(node,))
+    num_threads = node.declare_parameter("executor_threads", 0).value
+    executor = MultiThreadedExecutor(num_threads=num_threads or None)
+    executor.add_node(node)
+    thread = threading.Thread(target=executor.spin, daemon=True)
     thread.start()
-    return node, thread
+    return node, executor, thread
 
 
 def main():
-    ros_communicator, ros_thread = init_ros_node()
+    ros_communicator, executor, ros_thread = init_ros_node()
     data_processor = DataProcessor(ros_communicator)
     nav2_processing = Nav2Processing(ros_communicator, data_processor)
     ik_solver = PybulletRobotController(end_eff_index=5)
@@ -43,6 +55,8 @@ def main():
     try:
         app.main()
     finally:
+        executor.shutdown()
+        ros_communicator.destroy_node()
         rclpy.shutdown()
         ros_thread.join()
 
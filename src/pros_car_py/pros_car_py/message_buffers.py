@@ -0,0 +1,71 @@
+"""
+Reusable messages for publishers that send numeric arrays at control rate.
+
+Building a new Float32MultiArray or JointTrajectoryPoint per command and
+assigning a Python list makes the generated setter type-check every element
+and copy the list into a fresh array.array. `ArrayPublisher` keeps one
+message per publisher whose payload field holds an array.array: new values
+are written into that buffer in place and the message is published again,
+so the setter and the serializer both take their array.array fast path.
+
+    publisher = node.create_publisher(Float32MultiArray, "car_C_rear_wheel", 10)
+    rear = ArrayPublisher(publisher, size=2)
+    rear.publish((10.0, 10.0))
+    rear.publish(np_velocities)  # NumPy arrays are copied without tolist()
+"""
+
+import threading
+from array import array
+
+import numpy as np
+
+NUMPY_TYPECODES = {"f": np.float32, "d": np.float64}
+
+
+class ArrayPublisher:
+    """
+    Publisher wrapper reusing one message with an array.array payload.
+
+    Args:
+        publisher: rclpy publisher of the message type.
+        msg: message instance to reuse; a default instance of the
+            publisher's type when None. Fields not written here keep the
+            values set on it.
+        field (str): payload field, e.g. "data" or "positions".
+        typecode (str): "f" for float32 fields, "d" for float64 fields.
+        zero_fields (tuple): fields kept as zeros of the payload's length,
+            e.g. ("velocities",) for JointTrajectoryPoint.
+        size (int): payload length to preallocate; publishing values of
+            another length reallocates the buffers once.
+    """
+
+    def __init__(
+        self, publisher, msg=None, field="data", typecode="f", zero_fields=(), size=0
+    ):
+        self.publisher = publisher
+        self.msg = msg if msg is not None else publisher.msg_type()
+        self.field = field
+        self.typecode = typecode
+        self.zero_fields = tuple(zero_fields)
+        self._dtype = NUMPY_TYPECODES[typecode]
+        # publish() may be called from the controller threads and callbacks
+        self._lock = threading.Lock()
+        self._resize(size)
+
+    def _resize(self, size):
+        self._buffer = array(self.typecode, bytes(size * array(self.typecode).itemsize))
+        self._view = np.frombuffer(self._buffer, dtype=self._dtype)
+        setattr(self.msg, self.field, self._buffer)
+        for field in self.zero_fields:
+            setattr(self.msg, field, array(self.typecode, bytes(self._buffer)))
+
+    def publish(self, values):
+        """Copy `values` (sequence or NumPy array) into the payload and publish."""
+        with self._lock:
+            if len(values) != len(self._buffer):
+                self._resize(len(values))
+            if isinstance(values, np.ndarray):
+                self._view[:] = values
+            else:
+                self._buffer[:] = array(self.typecode, values)
+            self.publisher.publish(self.msg)
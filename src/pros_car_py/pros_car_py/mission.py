@@ -0,0 +1,248 @@
+"""
+Multi-waypoint missions for target_auto_nav.
+
+The waypoints come from config/waypoints.yaml (or the `mission_config`
+parameter). At each waypoint the car used to stop until Nav2 published a
+plan for the next goal on /received_global_plan. `MissionExecutor` asks the
+planner for the next leg (from this leg's waypoint to the next one) as soon
+as a leg starts, so when the car arrives the next plan is usually ready and
+it drives on in the same control tick:
+
+    mission = MissionExecutor(nav_processing, declare_mission_config(node),
+                              request_plan=node.request_plan)
+    while running:
+        publish(mission.step())
+
+`request_plan(start, goal, done, planner_id)` must call `done(path)` later
+(from any thread) with a nav_msgs/Path or None; RosCommunicator.request_plan
+uses the Nav2 planner server. Without a prefetched plan a leg falls back to
+the plan Nav2 publishes for the goal, as before.
+
+Every arrival logs the idle time: from reaching a waypoint to the first
+drive command of the next leg.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from pros_car_py.package_config import load_config
+
+MissionConfig = namedtuple(
+    "MissionConfig", ["waypoints", "loop", "prefetch", "planner_id"]
+)
+MissionConfig.__doc__ = """\
+Settings of config/waypoints.yaml, see the comments there.
+"""
+
+# target_auto_nav waypoints used when no waypoints file is installed
+DEFAULT_WAYPOINTS = [
+    [0.12577216615733916, 4.207528556910003],
+    [0.004709751367064641, -0.43933601070552486],
+    [3.202388878639925, 3.893176401328583],
+]
+
+
+def load_mission_config(path=None):
+    """
+    MissionConfig from a waypoints YAML file.
+
+    Args:
+        path (str): file to read; None reads the installed default and
+            uses DEFAULT_WAYPOINTS when there is none.
+    """
+    config = load_config("waypoints.yaml", path, "waypoints")
+    waypoints = config.get("waypoints", DEFAULT_WAYPOINTS)
+    try:
+        waypoints = [[float(x), float(y)] for x, y in waypoints]
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid waypoints, expected [x, y] pairs: {e}")
+    if not waypoints:
+        raise ValueError("The mission needs at least one waypoint")
+    return MissionConfig(
+        waypoints,
+        bool(config.get("loop", True)),
+        bool(config.get("prefetch", True)),
+        str(config.get("planner_id", "")),
+    )
+
+
+def declare_mission_config(node):
+    """
+    MissionConfig of `node` from its `mission_config` parameter (YAML file
+    instead of the installed default).
+    """
+    path = node.declare_parameter("mission_config", "").value
+    return load_mission_config(path or None)
+
+
+def format_mission_stats(stats):
+    """One-line summary of MissionExecutor.stats()."""
+    return (
+        f"[mission] {stats['arrivals']} waypoints reached, idle avg "
+        f"{stats['idle_avg_s']:.2f} s max {stats['idle_max_s']:.2f} s, "
+        f"{stats['prefetched']} legs on prefetched plans, "
+        f"{stats['waited']} waited for Nav2"
+    )
+
+
+class MissionExecutor:
+    """
+    Args:
+        nav_processing (Nav2Processing): follows the plan of each leg.
+        config (MissionConfig): waypoints and prefetch settings.
+        request_plan: planner for the next leg, see the module docstring;
+            None disables the prefetch.
+        log: callable receiving the per-waypoint messages.
+    """
+
+    def __init__(self, nav_processing, config, request_plan=None, log=print):
+        self.nav_processing = nav_processing
+        self.config = config
+        self.request_plan = request_plan if config.prefetch else None
+        self.log = log
+        self.index = 0
+        self.finished = False
+        self._leg_started = False
+        self._leg_start_time = None
+        self._arrival_time = None
+        self._leg_prefetched = False
+        # Leg index -> prefetched Path, filled by planner callbacks
+        self._plans = {}
+        # Bumped by start(); plans requested before it are dropped
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._idle_times = []
+        self._arrivals = 0
+        self._prefetched = 0
+        self._waited = 0
+
+    @property
+    def waypoints(self):
+        return self.config.waypoints
+
+    def start(self):
+        """
+        (Re)start the current leg on the next step, e.g. when auto nav
+        resumes. A finished mission starts over from the first waypoint.
+        """
+        if self.finished:
+            self.finished = False
+            self.index = 0
+        self._leg_started = False
+        self._arrival_time = None
+        # Plans from the previous waypoint; the car may have moved since
+        with self._lock:
+            self._generation += 1
+            self._plans.clear()
+
+    def _next_index(self, index):
+        if index + 1 < len(self.waypoints):
+            return index + 1
+        return 0 if self.config.loop else None
+
+    def _prefetch(self, index):
+        """Request the plan from waypoint `index` to the next one."""
+        next_index = self._next_index(index)
+        if self.request_plan is None or next_index is None or next_index == index:
+            return
+
+        def done(path):
+            if path is not None and path.poses:
+                with self._lock:
+                    if self._generation == generation:
+                        self._plans[next_index] = path
+
+        with self._lock:
+            generation = self._generation
+            self._plans.pop(next_index, None)
+        self.request_plan(
+            self.waypoints[index],
+            self.waypoints[next_index],
+            done,
+            self.config.planner_id,
+        )
+
+    def _take_plan(self, index):
+        with self._lock:
+            return self._plans.pop(index, None)
+
+    def _start_leg(self):
+        self.nav_processing.reset_nav_process()
+        self._leg_started = True
+        self._leg_start_time = time.monotonic()
+        self._leg_prefetched = False
+        self._prefetch(self.index)
+
+    def _arrive(self):
+        now = time.monotonic()
+        self._arrivals += 1
+        self.log(
+            f"[mission] waypoint {self.index} {self.waypoints[self.index]} reached "
+            f"after {now - self._leg_start_time:.1f} s"
+        )
+        self._arrival_time = now
+        next_index = self._next_index(self.index)
+        if next_index is None:
+            self.finished = True
+            self.log("[mission] last waypoint reached, mission finished")
+            return
+        self.index = next_index
+        self._start_leg()
+
+    def step(self):
+        """
+        Command of this control tick for publish_car_control: an
+        ACTION_MAPPINGS key or wheel velocities, "STOP" once finished.
+        """
+        return self._step(chained=False)
+
+    def _step(self, chained):
+        if self.finished:
+            return "STOP"
+        if not self._leg_started:
+            self._start_leg()
+        goal = self.waypoints[self.index]
+
+        if not self.nav_processing.has_plan():
+            plan = self._take_plan(self.index)
+            if plan is not None:
+                self.nav_processing.use_plan(plan)
+                self._leg_prefetched = True
+
+        command = self.nav_processing.get_command_from_nav2_plan(goal_coordinates=goal)
+        if self.nav_processing.get_finish_flag():
+            if chained:
+                # Next leg already done: arrive on the next tick, not recursively
+                return "STOP"
+            self._arrive()
+            if self.finished:
+                return "STOP"
+            # Drive the next leg in this tick when its plan is ready
+            return self._step(chained=True)
+
+        if self._arrival_time is not None and command != "STOP":
+            idle = time.monotonic() - self._arrival_time
+            self._arrival_time = None
+            self._idle_times.append(idle)
+            if self._leg_prefetched:
+                self._prefetched += 1
+            else:
+                self._waited += 1
+            source = "prefetched plan" if self._leg_prefetched else "waited for Nav2 plan"
+            self.log(
+                f"[mission] idle {idle:.2f} s at the waypoint before leg {self.index} "
+                f"({source})"
+            )
+        return command
+
+    def stats(self):
+        """arrivals, idle_avg_s, idle_max_s, prefetched and waited legs so far."""
+        idle_times = self._idle_times
+        return {
+            "arrivals": self._arrivals,
+            "idle_avg_s": sum(idle_times) / len(idle_times) if idle_times else 0.0,
+            "idle_max_s": max(idle_times, default=0.0),
+            "prefetched": self._prefetched,
+            "waited": self._waited,
+        }
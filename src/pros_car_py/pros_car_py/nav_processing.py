@@ -5,6 +5,13 @@ from pros_car_py.nav2_utils import (
     calculate_angle_point,
     cal_distance,
 )
+from pros_car_py.path_arrays import path_to_arrays
+from pros_car_py.path_index import PathIndex
+from pros_car_py.path_tracker import (
+    PurePursuitTracker,
+    declare_tracker_config,
+    yaw_from_quaternion,
+)
 import math
 
 
@@ -15,14 +22,24 @@ class Nav2Processing:
         self.finishFlag = False
         self.global_plan_msg = None
         self.index = 0
+        # Arc-length index of global_plan_msg and the segment the car reached on it
+        self.path_index = None
+        self.segment = 0
         self.index_length = 0
         self.recordFlag = 0
         self.goal_published_flag = False
+        # Goal of the current navigation when the caller gives one; the
+        # /goal_pose echo lags behind a newly published goal
+        self.goal_coordinates = None
+        # Continuous-velocity alternative to the discrete action keys
+        self.tracker = PurePursuitTracker(declare_tracker_config(ros_communicator))
 
     def reset_nav_process(self):
         self.finishFlag = False
         self.recordFlag = 0
         self.goal_published_flag = False
+        self.goal_coordinates = None
+        self.tracker.reset()
 
     def finish_nav_process(self):
         self.finishFlag = True
@@ -32,14 +49,12 @@ class Nav2Processing:
         return self.finishFlag
 
     def get_action_from_nav2_plan(self, goal_coordinates=None):
-        if goal_coordinates is not None and not self.goal_published_flag:
-            self.ros_communicator.publish_goal_pose(goal_coordinates)
-            self.goal_published_flag = True
+        self.publish_goal(goal_coordinates)
         orientation_points, coordinates = (
             self.data_processor.get_processed_received_global_plan()
         )
         action_key = "STOP"
-        if not orientation_points or not coordinates:
+        if orientation_points is None or len(orientation_points) == 0:
             action_key = "STOP"
         else:
             try:
@@ -52,7 +67,7 @@ class Nav2Processing:
                     car_orientation[2],
                     car_orientation[3],
                 )
-                goal_position = self.ros_communicator.get_latest_goal()
+                goal_position = self.get_goal_position()
                 target_distance = cal_distance(car_position, goal_position)
                 if target_distance < 0.5:
                     action_key = "STOP"
@@ -74,27 +89,31 @@ class Nav2Processing:
                 action_key = "STOP"
         return action_key
 
-    def get_action_from_nav2_plan_no_dynamic_p_2_p(self, goal_coordinates=None):
-        if goal_coordinates is not None and not self.goal_published_flag:
+    def publish_goal(self, goal_coordinates):
+        """Publish `goal_coordinates` once per navigation and keep it as the goal."""
+        if goal_coordinates is None:
+            return
+        self.goal_coordinates = goal_coordinates
+        if not self.goal_published_flag:
             self.ros_communicator.publish_goal_pose(goal_coordinates)
             self.goal_published_flag = True
 
+    def get_goal_position(self):
+        """Goal of the current navigation, the latest /goal_pose without one."""
+        if self.goal_coordinates is not None:
+            return self.goal_coordinates
+        return self.ros_communicator.get_latest_goal()
+
+    def get_action_from_nav2_plan_no_dynamic_p_2_p(self, goal_coordinates=None):
+        self.publish_goal(goal_coordinates)
+
         # 只抓第一次路径
-        if self.recordFlag == 0:
-            if not self.check_data_availability():
-                return "STOP"
-            else:
-                print("Get first path")
-                self.index = 0
-                self.global_plan_msg = (
-                    self.data_processor.get_processed_received_global_plan_no_dynamic()
-                )
-                self.recordFlag = 1
-                action_key = "STOP"
+        if not self.record_first_plan():
+            return "STOP"
 
         car_position, car_orientation = self.data_processor.get_processed_amcl_pose()
 
-        goal_position = self.ros_communicator.get_latest_goal()
+        goal_position = self.get_goal_position()
         target_distance = cal_distance(car_position, goal_position)
 
         # 抓最近的物標(可調距離)
@@ -117,6 +136,71 @@ class Nav2Processing:
             action_key = "COUNTERCLOCKWISE_ROTATION"
         return action_key
 
+    def get_command_from_nav2_plan(self, goal_coordinates=None):
+        """
+        Next command along the first Nav2 plan with the configured controller:
+        an ACTION_MAPPINGS key for "discrete", a list of four wheel
+        velocities for "pure_pursuit". Both go to publish_car_control.
+        """
+        if self.tracker.config.controller != "pure_pursuit":
+            return self.get_action_from_nav2_plan_no_dynamic_p_2_p(goal_coordinates)
+        self.publish_goal(goal_coordinates)
+
+        # 只抓第一次路径
+        if not self.record_first_plan():
+            return "STOP"
+
+        car_position, car_orientation = self.data_processor.get_processed_amcl_pose()
+        goal_position = self.get_goal_position()
+        command = self.tracker.step(
+            car_position, yaw_from_quaternion(car_orientation[2], car_orientation[3])
+        )
+        if command.target is None or command.finished or (
+            cal_distance(car_position, goal_position) < self.tracker.config.goal_tolerance
+        ):
+            self.ros_communicator.reset_nav2()
+            self.finish_nav_process()
+            return "STOP"
+        self.ros_communicator.publish_selected_target_marker(
+            x=command.target[0], y=command.target[1]
+        )
+        return command.wheels
+
+    def record_first_plan(self):
+        """
+        Keep the first received plan of this navigation and its PathIndex.
+        Returns False while the plan, AMCL pose or goal is still missing.
+        """
+        if self.recordFlag != 0:
+            return True
+        if not self.check_data_availability():
+            return False
+        print("Get first path")
+        self.use_plan(
+            self.data_processor.get_processed_received_global_plan_no_dynamic()
+        )
+        return True
+
+    def use_plan(self, path_msg):
+        """
+        Follow `path_msg` (nav_msgs/Path) for the rest of this navigation
+        instead of waiting for the first /received_global_plan, e.g. a plan
+        requested from the planner in advance.
+        """
+        self.index = 0
+        self.segment = 0
+        self.global_plan_msg = path_msg
+        self.path_index = None
+        if path_msg is not None:
+            positions, _ = path_to_arrays(path_msg)
+            self.path_index = PathIndex(positions)
+        self.tracker.set_path(self.path_index)
+        self.recordFlag = 1
+
+    def has_plan(self):
+        """True once this navigation follows a plan."""
+        return self.recordFlag != 0
+
     def check_data_availability(self):
         return (
             self.data_processor.get_processed_received_global_plan_no_dynamic()
@@ -126,25 +210,22 @@ class Nav2Processing:
 
     def get_next_target_point(self, car_position, min_required_distance=0.5):
         """
-        選擇距離車輛 min_required_distance 以上最短路徑然後返回 target_x, target_y
+        選擇沿路徑距離車輛投影點 min_required_distance 以上的第一個路徑點，返回 target_x, target_y
         """
-        if self.global_plan_msg is None or self.global_plan_msg.poses is None:
+        if self.path_index is None:
             print("Error: global_plan_msg is None or poses is missing!")
             return None, None
-        while self.index < len(self.global_plan_msg.poses) - 1:
-            target_x = self.global_plan_msg.poses[self.index].pose.position.x
-            target_y = self.global_plan_msg.poses[self.index].pose.position.y
-            distance_to_target = cal_distance(car_position, (target_x, target_y))
-
-            if distance_to_target < min_required_distance:
-                self.index += 1
-            else:
-                self.ros_communicator.publish_selected_target_marker(
-                    x=target_x, y=target_y
-                )
-                return target_x, target_y
-
-        return None, None
+        # 沿路徑 (arc length) 往前 min_required_distance 的路徑點
+        self.index, projection = self.path_index.lookahead(
+            car_position, min_required_distance, self.segment
+        )
+        self.segment = projection.segment
+        if self.index >= len(self.path_index) - 1:
+            # 剩下的路徑不到 min_required_distance
+            return None, None
+        target_x, target_y = self.path_index.points[self.index].tolist()
+        self.ros_communicator.publish_selected_target_marker(x=target_x, y=target_y)
+        return target_x, target_y
 
     def calculate_diff_angle(self, car_position, car_orientation, target_x, target_y):
         target_pos = [target_x, target_y]
@@ -0,0 +1,526 @@
+"""
+Offline replay of recorded navigation inputs through the car controllers.
+
+A recording is a JSON Lines file with one message per line, in any order:
+
+    {"time": 0.00, "topic": "global_plan", "data": [[x, y, z, qx, qy, qz, qw], ...]}
+    {"time": 0.00, "topic": "goal", "data": [x, y, z]}
+    {"time": 0.05, "topic": "amcl_pose", "data": [x, y, z, qx, qy, qz, qw]}
+    {"time": 0.05, "topic": "camera_depth", "data": [d0, d1, ...]}
+    {"time": 0.05, "topic": "yolo_target_info", "data": [found, depth, offset]}
+    {"time": 0.05, "topic": "object_offsets", "data": {"ball": [x, y, z]}}
+
+`time` is in seconds; poses may leave out z and the quaternion. `ReplayNode`
+stands in for RosCommunicator and BaseCarControlNode: it stores the
+messages in a TopicCache as message-shaped objects, so Nav2Processing,
+DataProcessor and NavigationController run unchanged, and it records the
+published commands instead of sending them. Nothing is spun; `replay` steps
+the controller on a simulated clock as fast as it can:
+
+    result = replay(load_recording("run.jsonl"), "pure_pursuit", closed_loop=True)
+    print(format_replay_result(result))
+
+Open loop (the default) replays the recorded poses, so the commands do not
+move the car; use it to compare decisions and their compute time on real
+data. Closed loop only takes the first recorded pose and then moves the car
+with DiffDriveModel from the emitted commands, which gives a simulated time
+to goal.
+"""
+
+import logging
+import math
+import time
+from collections import namedtuple
+from types import SimpleNamespace
+
+import numpy as np
+import orjson
+
+from pros_car_py.data_processor import DataProcessor
+from pros_car_py.log_sampling import LogSampler
+from pros_car_py.nav_processing import Nav2Processing
+from pros_car_py.path_arrays import path_snapshot
+from pros_car_py.path_index import PathIndex
+from pros_car_py.ros_communicator_config import ACTION_MAPPINGS
+from pros_car_py.topic_cache import TopicCache
+
+RECORDED_TOPICS = (
+    "amcl_pose",
+    "global_plan",
+    "goal",
+    "camera_depth",
+    "yolo_target_info",
+    "object_offsets",
+)
+# Nav2Processing (robot_control) and NavigationController (car_control_pkg) steps
+CONTROLLERS = ("discrete", "pure_pursuit", "camera_nav", "manual_nav", "customize_nav")
+
+RecordedMessage = namedtuple("RecordedMessage", ["time", "topic", "data"])
+
+ReplayResult = namedtuple(
+    "ReplayResult",
+    [
+        "controller",
+        "status",
+        "ticks",
+        "tick_ns",
+        "actions",
+        "time_to_goal",
+        "final_distance",
+    ],
+)
+ReplayResult.__doc__ = """\
+Outcome of one replay.
+
+controller: name from CONTROLLERS.
+status: "succeeded", "aborted", "timeout" or "end of recording".
+ticks: number of controller steps.
+tick_ns: (ticks,) int64 wall time of every step in nanoseconds.
+actions: command of every step, an ACTION_MAPPINGS key, a list of wheel
+    velocities, or None when the step published nothing.
+time_to_goal: simulated seconds from the first pose to success, else None.
+final_distance: distance (m) from the last pose to the goal, None without one.
+"""
+
+
+# ------------------------------------------------------------------ recordings
+def load_recording(path):
+    """RecordedMessage list of a JSON Lines recording, sorted by time."""
+    messages = []
+    with open(path, "rb") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = orjson.loads(line)
+            if item.get("topic") not in RECORDED_TOPICS:
+                raise ValueError(
+                    f"{path}:{number}: unknown topic {item.get('topic')!r}, "
+                    f"expected one of {RECORDED_TOPICS}"
+                )
+            messages.append(
+                RecordedMessage(float(item["time"]), item["topic"], item["data"])
+            )
+    # Stable: messages with the same time keep the file order
+    messages.sort(key=lambda message: message.time)
+    return messages
+
+
+def write_recording(path, messages):
+    """Write RecordedMessage items (data may hold NumPy arrays) as JSON Lines."""
+    with open(path, "wb") as f:
+        for message in messages:
+            f.write(
+                orjson.dumps(message._asdict(), option=orjson.OPT_SERIALIZE_NUMPY)
+            )
+            f.write(b"\n")
+
+
+def pose_values(pose):
+    """[x, y, z, qx, qy, qz, qw] of a geometry_msgs/Pose."""
+    position = pose.position
+    orientation = pose.orientation
+    return [
+        position.x,
+        position.y,
+        position.z,
+        orientation.x,
+        orientation.y,
+        orientation.z,
+        orientation.w,
+    ]
+
+
+def _full_pose(values):
+    values = [float(v) for v in values]
+    if len(values) == 2:
+        values.append(0.0)
+    if len(values) == 3:
+        values.extend((0.0, 0.0, 0.0, 1.0))
+    if len(values) != 7:
+        raise ValueError(f"Expected x, y[, z[, qx, qy, qz, qw]], got {values}")
+    return values
+
+
+def _pose_msg(values):
+    x, y, z, qx, qy, qz, qw = _full_pose(values)
+    return SimpleNamespace(
+        position=SimpleNamespace(x=x, y=y, z=z),
+        orientation=SimpleNamespace(x=qx, y=qy, z=qz, w=qw),
+    )
+
+
+def _header(stamp):
+    sec = int(stamp)
+    return SimpleNamespace(
+        stamp=SimpleNamespace(sec=sec, nanosec=int((stamp - sec) * 1e9)),
+        frame_id="map",
+    )
+
+
+def _path_msg(poses, stamp):
+    return SimpleNamespace(
+        header=_header(stamp),
+        poses=[SimpleNamespace(pose=_pose_msg(values)) for values in poses],
+    )
+
+
+def pose_from_yaw(x, y, yaw):
+    """Recorded pose values of a planar pose."""
+    return [x, y, 0.0, 0.0, 0.0, math.sin(0.5 * yaw), math.cos(0.5 * yaw)]
+
+
+# ------------------------------------------------------------------- the node
+class ReplayNode:
+    """
+    Stand-in for RosCommunicator and BaseCarControlNode, fed with recorded
+    messages. Only implements what the navigation controllers use.
+
+    Args:
+        parameters (dict): values returned by declare_parameter instead of
+            the defaults, e.g. {"nav_controller": "pure_pursuit"}.
+    """
+
+    def __init__(self, parameters=None):
+        self.parameters = dict(parameters or {})
+        self.topic_cache = TopicCache()
+        self.logger = logging.getLogger("nav_replay")
+        self.log_sampler = LogSampler(self.logger.debug)
+        # Last command published through publish_car_control / publish_control
+        self.last_command = None
+        self._path_index = None
+
+    def declare_parameter(self, name, value=None):
+        return SimpleNamespace(value=self.parameters.get(name, value))
+
+    def get_logger(self):
+        return self.logger
+
+    def receive(self, message):
+        """Store a RecordedMessage like the node's subscriptions would."""
+        cache = self.topic_cache
+        topic, data = message.topic, message.data
+        if topic == "amcl_pose":
+            pose = SimpleNamespace(pose=_pose_msg(data))
+            cache.put("amcl_pose", SimpleNamespace(pose=pose))
+        elif topic == "global_plan":
+            path = _path_msg(data, message.time)
+            cache.put("received_global_plan", path)
+            cache.put("global_plan", path_snapshot(path))
+        elif topic == "goal":
+            goal = _pose_msg(data)
+            position = goal.position
+            cache.put("goal", [position.x, position.y, position.z])
+            cache.put(
+                "goal_pose", SimpleNamespace(header=_header(message.time), pose=goal)
+            )
+        elif topic == "camera_depth":
+            cache.put("camera_x_multi_depth", SimpleNamespace(data=list(data)))
+            cache.put("camera_depth", list(data))
+        elif topic == "yolo_target_info":
+            cache.put("yolo_target_info", SimpleNamespace(data=list(data)))
+        elif topic == "object_offsets":
+            cache.put("object_coordinates", dict(data))
+
+    # RosCommunicator: Nav2Processing and DataProcessor
+    def get_latest_amcl_pose(self, max_age=None):
+        return self.topic_cache.get("amcl_pose", max_age=max_age)
+
+    def get_latest_goal(self, max_age=None):
+        return self.topic_cache.get("goal", max_age=max_age)
+
+    def get_latest_received_global_plan(self, max_age=None):
+        return self.topic_cache.get("received_global_plan", max_age=max_age)
+
+    def get_latest_yolo_target_info(self, max_age=None):
+        return self.topic_cache.get("yolo_target_info", max_age=max_age)
+
+    def get_latest_camera_x_multi_depth(self, max_age=None):
+        return self.topic_cache.get("camera_x_multi_depth", max_age=max_age)
+
+    def publish_goal_pose(self, goal):
+        # Nav2 echoes a published goal on /goal_pose
+        self.receive(RecordedMessage(0.0, "goal", [goal[0], goal[1], 0.0]))
+
+    def publish_car_control(self, action_key, publish_rear=True, publish_front=True):
+        self.last_command = action_key
+
+    def publish_selected_target_marker(self, x, y, z=0.0):
+        pass
+
+    def publish_confirmed_initial_plan(self, path_msg):
+        pass
+
+    def reset_nav2(self):
+        self.topic_cache.clear("received_global_plan")
+        self.topic_cache.clear("global_plan")
+
+    # BaseCarControlNode: NavigationController
+    def get_car_position_and_orientation(self, max_age=None):
+        amcl_pose = self.topic_cache.get("amcl_pose", max_age=max_age)
+        if amcl_pose:
+            return amcl_pose.pose.pose.position, amcl_pose.pose.pose.orientation
+        return None, None
+
+    def get_goal_pose(self, max_age=None):
+        goal_pose = self.topic_cache.get("goal_pose", max_age=max_age)
+        return None if goal_pose is None else goal_pose.pose.position
+
+    def get_latest_object_coordinates(self, label=None, max_age=None):
+        object_coordinates = self.topic_cache.get(
+            "object_coordinates", {}, max_age=max_age
+        )
+        if label is None:
+            return object_coordinates
+        return object_coordinates.get(label, None)
+
+    def get_path_snapshot(self, max_age=None):
+        snapshot = self.topic_cache.get("global_plan", max_age=max_age)
+        if snapshot is None or len(snapshot.positions) == 0:
+            return None
+        return snapshot
+
+    def get_path_index(self):
+        sample = self.topic_cache.sample("global_plan")
+        if sample is None or len(sample.value.positions) == 0:
+            return None
+        cached = self._path_index
+        if cached is None or cached[0] != sample.seq:
+            snapshot = sample.value
+            cached = self._path_index = (
+                sample.seq,
+                PathIndex(snapshot.positions, snapshot.orientations),
+            )
+        return cached[1]
+
+    def publish_control(self, action):
+        self.last_command = action
+
+    def clear_plan(self):
+        self.reset_nav2()
+
+    def clear_goal_pose(self):
+        self.topic_cache.clear("goal")
+        self.topic_cache.clear("goal_pose")
+
+
+# ------------------------------------------------------------------ car model
+class DiffDriveModel:
+    """
+    Planar pose of a differential-drive car moved by wheel commands.
+
+    Args:
+        x, y, yaw: start pose (m, m, radians).
+        track_width (float): distance between the left and right wheels (m).
+        wheel_scale (float): m/s per unit of ACTION_MAPPINGS wheel velocity.
+    """
+
+    def __init__(self, x=0.0, y=0.0, yaw=0.0, track_width=0.5, wheel_scale=0.05):
+        self.x = x
+        self.y = y
+        self.yaw = yaw
+        self.track_width = track_width
+        self.wheel_scale = wheel_scale
+
+    @classmethod
+    def from_pose(cls, values, **kwargs):
+        """Model starting at recorded pose values, see DiffDriveModel for kwargs."""
+        x, y, _, _, _, qz, qw = _full_pose(values)
+        return cls(x, y, 2.0 * math.atan2(qz, qw), **kwargs)
+
+    def step(self, command, dt):
+        """
+        Move for `dt` seconds with an ACTION_MAPPINGS key, four wheel
+        velocities or a [left, right] pair (mirrored onto both axles).
+        """
+        if isinstance(command, str):
+            command = ACTION_MAPPINGS.get(command)
+        if command is None:
+            return
+        if len(command) == 2:
+            command = [command[0], command[1], command[0], command[1]]
+        # [front left, front right, rear left, rear right]
+        left = 0.5 * (command[0] + command[2]) * self.wheel_scale
+        right = 0.5 * (command[1] + command[3]) * self.wheel_scale
+        speed = 0.5 * (left + right)
+        heading = self.yaw + 0.5 * (right - left) / self.track_width * dt
+        self.x += speed * math.cos(heading) * dt
+        self.y += speed * math.sin(heading) * dt
+        self.yaw += (right - left) / self.track_width * dt
+
+    def pose(self):
+        return pose_from_yaw(self.x, self.y, self.yaw)
+
+
+# ---------------------------------------------------------------- controllers
+def _nav2_processing_step(node, method):
+    processing = Nav2Processing(node, DataProcessor(node))
+
+    def step():
+        if method == "camera_nav":
+            command = processing.camera_nav()
+            target = node.get_latest_yolo_target_info()
+            # camera_nav stops in front of a detected target
+            done = command == "STOP" and target is not None and target.data[0] == 1
+            return command, "succeeded" if done else None
+        command = processing.get_command_from_nav2_plan(goal_coordinates=None)
+        return command, "succeeded" if processing.get_finish_flag() else None
+
+    return step
+
+
+def _navigation_controller_step(node, method):
+    # car_control_pkg and action_interface must be built, rclpy is not spun
+    from car_control_pkg.car_nav_controller import NavigationController
+
+    nav_method = getattr(NavigationController(node), method)
+
+    def step():
+        result = nav_method()
+        if result is None:
+            return node.last_command, None
+        return node.last_command, "succeeded" if result.success else "aborted"
+
+    return step
+
+
+def controller_step(node, controller):
+    """Callable running one step of `controller` on `node`, see replay()."""
+    if controller in ("discrete", "pure_pursuit", "camera_nav"):
+        return _nav2_processing_step(node, controller)
+    if controller in ("manual_nav", "customize_nav"):
+        return _navigation_controller_step(node, controller)
+    raise ValueError(f"Unknown controller '{controller}', expected one of {CONTROLLERS}")
+
+
+def replay(
+    messages,
+    controller="discrete",
+    rate=20.0,
+    closed_loop=False,
+    parameters=None,
+    model=None,
+    max_time=120.0,
+):
+    """
+    Step `controller` on the recorded `messages` at `rate` simulated ticks
+    per second, starting at the first amcl_pose.
+
+    Args:
+        messages: RecordedMessage list sorted by time.
+        controller (str): one of CONTROLLERS.
+        rate (float): simulated control rate (Hz).
+        closed_loop (bool): move the car with `model` from the commands
+            instead of replaying the recorded poses.
+        parameters (dict): node parameters, see ReplayNode; "discrete" and
+            "pure_pursuit" set nav_controller.
+        model (DiffDriveModel): car model for closed loop, by default one
+            starting at the first recorded pose.
+        max_time (float): simulated seconds before a closed-loop run times out.
+
+    Returns:
+        ReplayResult
+    """
+    parameters = dict(parameters or {})
+    if controller in ("discrete", "pure_pursuit"):
+        parameters["nav_controller"] = controller
+    node = ReplayNode(parameters)
+    step = controller_step(node, controller)
+
+    poses = [index for index, message in enumerate(messages) if message.topic == "amcl_pose"]
+    if not poses:
+        raise ValueError("The recording has no amcl_pose message")
+    start = messages[poses[0]].time
+    if closed_loop and model is None:
+        model = DiffDriveModel.from_pose(messages[poses[0]].data)
+    end = start + max_time if closed_loop else messages[-1].time
+
+    dt = 1.0 / rate
+    tick_ns = []
+    actions = []
+    status = "timeout" if closed_loop else "end of recording"
+    time_to_goal = None
+    index = 0
+    tick = 0
+    now = start
+    while now <= end:
+        while index < len(messages) and messages[index].time <= now:
+            message = messages[index]
+            # Closed loop: only the first recorded pose, then the model's
+            if not closed_loop or message.topic != "amcl_pose" or index == poses[0]:
+                node.receive(message)
+            index += 1
+        if closed_loop and tick > 0:
+            node.receive(RecordedMessage(now, "amcl_pose", model.pose()))
+
+        node.last_command = None
+        begin = time.perf_counter_ns()
+        command, outcome = step()
+        tick_ns.append(time.perf_counter_ns() - begin)
+        actions.append(command)
+        if outcome is not None:
+            status = outcome
+            if outcome == "succeeded":
+                time_to_goal = now - start
+            break
+        if closed_loop:
+            model.step(command, dt)
+        tick += 1
+        now = start + tick * dt
+
+    return ReplayResult(
+        controller,
+        status,
+        len(tick_ns),
+        np.array(tick_ns, dtype=np.int64),
+        actions,
+        time_to_goal,
+        _goal_distance(node),
+    )
+
+
+def _goal_distance(node):
+    position, _ = node.get_car_position_and_orientation()
+    goal = node.get_latest_goal()
+    if position is None or goal is None:
+        return None
+    return math.hypot(goal[0] - position.x, goal[1] - position.y)
+
+
+# ------------------------------------------------------------------ reporting
+def action_runs(actions):
+    """Run-length encoded [(label, count)]; wheel velocity lists count as "WHEELS"."""
+    runs = []
+    for action in actions:
+        if action is None:
+            label = "-"
+        elif isinstance(action, str):
+            label = action
+        else:
+            label = "WHEELS"
+        if runs and runs[-1][0] == label:
+            runs[-1][1] += 1
+        else:
+            runs.append([label, 1])
+    return [tuple(run) for run in runs]
+
+
+def format_replay_result(result, max_runs=12):
+    """Summary lines of a ReplayResult."""
+    tick_us = result.tick_ns / 1e3
+    lines = [f"{result.controller}: {result.status} after {result.ticks} ticks"]
+    if result.time_to_goal is not None:
+        lines.append(f"  simulated time to goal: {result.time_to_goal:.2f} s")
+    if result.final_distance is not None:
+        lines.append(f"  final distance to goal: {result.final_distance:.2f} m")
+    if result.ticks:
+        lines.append(
+            f"  compute per tick: mean {tick_us.mean():.1f} us, "
+            f"p50 {np.percentile(tick_us, 50):.1f} us, "
+            f"p99 {np.percentile(tick_us, 99):.1f} us, max {tick_us.max():.1f} us"
+        )
+    runs = action_runs(result.actions)
+    shown = ", ".join(f"{label} x{count}" for label, count in runs[:max_runs])
+    if len(runs) > max_runs:
+        shown += f", ... ({len(runs) - max_runs} more)"
+    lines.append(f"  actions: {shown}")
+    return "\n".join(lines)
@@ -0,0 +1,43 @@
+"""
+YAML files installed in the config/ directory of this package.
+
+Nodes read their defaults from these files (e.g. topic_qos.yaml,
+path_tracker.yaml) and accept a parameter with another path.
+"""
+
+import os
+
+import yaml
+
+
+def default_config_path(filename):
+    """config/`filename` in the installed share directory, None if not installed."""
+    try:
+        from ament_index_python.packages import get_package_share_directory
+
+        share = get_package_share_directory("pros_car_py")
+    except Exception:
+        return None
+    path = os.path.join(share, "config", filename)
+    return path if os.path.exists(path) else None
+
+
+def load_config(filename, path=None, description="config"):
+    """
+    Read a YAML config file.
+
+    Args:
+        filename (str): name of the installed default in config/.
+        path (str): file to read; None reads the installed default and
+            returns an empty config when there is none.
+        description (str): what the file configures, for error messages.
+    """
+    if path is None:
+        path = default_config_path(filename)
+        if path is None:
+            return {}
+    try:
+        with open(path, "r") as file:
+            return yaml.safe_load(file) or {}
+    except Exception as e:
+        raise RuntimeError(f"Failed to load {description} {path}: {e}")
@@ -0,0 +1,124 @@
+"""
+NumPy form of nav_msgs/Path plans.
+
+Walking the PoseStamped list of a Nav2 plan with attribute access costs
+O(path length) Python work. Controllers that run at tick rate convert a
+plan once when it arrives (`path_to_arrays`, `path_snapshot`,
+`process_plan`) and then work on arrays; `path_key` tells whether a Path
+message carries a new plan.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from pros_car_py.nav2_utils import get_yaw_from_quaternion
+
+PathSnapshot = namedtuple("PathSnapshot", ["positions", "orientations", "frame_id"])
+PathSnapshot.__doc__ = """\
+Read-only arrays of every pose of a Path.
+
+positions: (N, 3) x, y, z.
+orientations: (N, 4) quaternion x, y, z, w.
+frame_id: header frame of the Path.
+"""
+
+ProcessedPlan = namedtuple(
+    "ProcessedPlan", ["coordinates", "orientation", "yaw", "arc_length"]
+)
+ProcessedPlan.__doc__ = """\
+Decimated global plan.
+
+coordinates: (M, 2) x, y of the kept poses.
+orientation: (M, 2) quaternion z, w of the kept poses.
+yaw: (M,) plan heading in degrees, as get_yaw_from_quaternion.
+arc_length: (M,) distance along the original path up to each kept pose.
+"""
+
+
+def path_key(path_msg):
+    """
+    Identity of the plan carried by `path_msg`: header stamp, pose count and
+    end points, so a re-published copy of the same plan is not re-processed.
+    """
+    stamp = path_msg.header.stamp
+    poses = path_msg.poses
+    if not poses:
+        return (stamp.sec, stamp.nanosec, 0)
+    first = poses[0].pose.position
+    last = poses[-1].pose.position
+    return (stamp.sec, stamp.nanosec, len(poses), first.x, first.y, last.x, last.y)
+
+
+def path_to_arrays(path_msg):
+    """
+    Positions and orientations of every pose in `path_msg`.
+
+    Returns:
+        (positions, orientations): float64 arrays of shape (N, 3) x, y, z
+        and (N, 4) x, y, z, w.
+    """
+    values = []
+    for pose_stamped in path_msg.poses:
+        pose = pose_stamped.pose
+        position = pose.position
+        orientation = pose.orientation
+        values.append(
+            (
+                position.x,
+                position.y,
+                position.z,
+                orientation.x,
+                orientation.y,
+                orientation.z,
+                orientation.w,
+            )
+        )
+    table = np.array(values, dtype=np.float64).reshape(len(values), 7)
+    return table[:, :3], table[:, 3:]
+
+
+def path_snapshot(path_msg):
+    """
+    PathSnapshot of `path_msg`. The arrays are read-only so the snapshot
+    can be shared between threads without copying.
+    """
+    positions, orientations = path_to_arrays(path_msg)
+    positions.setflags(write=False)
+    orientations.setflags(write=False)
+    return PathSnapshot(positions, orientations, path_msg.header.frame_id)
+
+
+def cumulative_arc_length(points):
+    """Distance along the polyline `points` (N, 2+) up to each point, starting at 0."""
+    if len(points) == 0:
+        return np.zeros(0)
+    steps = np.hypot(*np.diff(points[:, :2], axis=0).T)
+    return np.concatenate(([0.0], np.cumsum(steps)))
+
+
+def decimate_indices(arc_length, spacing):
+    """
+    Indices of the points kept when sampling a path every `spacing` meters.
+
+    Keeps the first point and the first point past every multiple of
+    `spacing` along the path, so kept points are about `spacing` apart.
+    """
+    if len(arc_length) == 0:
+        return np.zeros(0, dtype=np.intp)
+    marks = np.floor(arc_length / spacing)
+    return np.concatenate(([0], np.flatnonzero(np.diff(marks) > 0) + 1))
+
+
+def process_plan(path_msg, spacing=0.1):
+    """Decimate `path_msg` every `spacing` meters into a ProcessedPlan."""
+    positions, orientations = path_to_arrays(path_msg)
+    arc_length = cumulative_arc_length(positions)
+    keep = decimate_indices(arc_length, spacing)
+    orientation = orientations[keep][:, 2:]
+    return ProcessedPlan(
+        coordinates=positions[keep][:, :2],
+        orientation=orientation,
+        yaw=get_yaw_from_quaternion(orientation[:, 0], orientation[:, 1]),
+        arc_length=arc_length[keep],
+    )
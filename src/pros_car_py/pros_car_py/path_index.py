@@ -0,0 +1,133 @@
+"""
+Arc-length index over a planned path, for lookahead target selection.
+
+Built once per plan, `PathIndex` keeps the cumulative arc length and the
+segment vectors of the path. Each control tick then projects the car onto
+the path and bisects the arc length for the lookahead pose, so the cost
+per tick does not grow with the number of poses:
+
+    path_index = PathIndex(positions)
+    index, projection = path_index.lookahead(car_position, 0.5, segment)
+    segment = projection.segment  # start of the next search
+
+The projection only searches `search_window` meters of path ahead of the
+segment the caller reached last time. It falls back to the whole path when
+the car is farther than that from the window, e.g. after AMCL relocalises.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+import numpy as np
+
+from pros_car_py.path_arrays import cumulative_arc_length
+
+PathProjection = namedtuple(
+    "PathProjection", ["segment", "t", "arc_length", "distance"]
+)
+PathProjection.__doc__ = """\
+Closest point of the path to a position.
+
+segment: index of the segment from pose `segment` to pose `segment + 1`.
+t: position along that segment, 0.0 at its start and 1.0 at its end.
+arc_length: distance along the path from the first pose.
+distance: distance from the position to the path.
+"""
+
+
+class PathIndex:
+    """
+    Args:
+        points: (N, 2+) pose positions, only x and y are used.
+        orientations: optional (N, 4) pose quaternions, kept for callers
+            that report the orientation of the selected pose.
+        search_window (float): meters of path searched ahead of
+            `start_segment` by `project`.
+    """
+
+    def __init__(self, points, orientations=None, search_window=2.0):
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim != 2 or len(points) == 0:
+            raise ValueError("PathIndex needs at least one pose")
+        self.points = points[:, :2]
+        self.orientations = orientations
+        self.search_window = search_window
+        self.segments = np.diff(self.points, axis=0)
+        self.segment_lengths = np.hypot(self.segments[:, 0], self.segments[:, 1])
+        lengths_sq = self.segment_lengths**2
+        # Zero-length segments project onto their start point
+        self._inv_lengths_sq = np.divide(
+            1.0, lengths_sq, out=np.zeros_like(lengths_sq), where=lengths_sq > 0.0
+        )
+        self.arc_length = cumulative_arc_length(self.points)
+        # Python list for scalar bisection without NumPy call overhead
+        self._arc_list = self.arc_length.tolist()
+
+    def __len__(self):
+        return len(self.points)
+
+    @property
+    def length(self):
+        """Total path length (m)."""
+        return self._arc_list[-1]
+
+    def project(self, position, start_segment=0):
+        """Closest point of the path to `position`, searching ahead of `start_segment`."""
+        segment_count = len(self.segments)
+        position = np.asarray(position[:2], dtype=np.float64)
+        if segment_count == 0:
+            offset = position - self.points[0]
+            return PathProjection(0, 0.0, 0.0, float(np.hypot(*offset)))
+        start = min(max(int(start_segment), 0), segment_count - 1)
+        stop = bisect_right(self._arc_list, self._arc_list[start] + self.search_window)
+        stop = min(max(stop, start + 1), segment_count)
+        projection = self._project_range(position, start, stop)
+        if projection.distance > self.search_window and stop - start < segment_count:
+            projection = self._project_range(position, 0, segment_count)
+        return projection
+
+    def _project_range(self, position, start, stop):
+        origins = self.points[start:stop]
+        segments = self.segments[start:stop]
+        relative = position - origins
+        t = np.einsum("ij,ij->i", relative, segments) * self._inv_lengths_sq[start:stop]
+        np.clip(t, 0.0, 1.0, out=t)
+        offsets = relative - segments * t[:, None]
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        k = int(np.argmin(distances))
+        segment = start + k
+        t_k = float(t[k])
+        return PathProjection(
+            segment,
+            t_k,
+            self._arc_list[segment] + t_k * float(self.segment_lengths[segment]),
+            float(distances[k]),
+        )
+
+    def index_at(self, arc_length):
+        """First pose at least `arc_length` along the path, the last pose past its end."""
+        return min(bisect_left(self._arc_list, arc_length), len(self._arc_list) - 1)
+
+    def point_at(self, arc_length):
+        """[x, y] of the path `arc_length` meters from its start, clamped to the path."""
+        arc_list = self._arc_list
+        if arc_length <= 0.0 or len(arc_list) == 1:
+            return self.points[0].tolist()
+        if arc_length >= arc_list[-1]:
+            return self.points[-1].tolist()
+        segment = bisect_right(arc_list, arc_length) - 1
+        length = float(self.segment_lengths[segment])
+        t = (arc_length - arc_list[segment]) / length if length > 0.0 else 0.0
+        return (self.points[segment] + t * self.segments[segment]).tolist()
+
+    def lookahead(self, position, distance, start_segment=0):
+        """
+        Pose `distance` meters along the path past the projection of `position`.
+
+        Returns:
+            (index, projection): index of the first pose at least that far
+            along the path (the last pose near the end) and the
+            PathProjection of `position`.
+        """
+        projection = self.project(position, start_segment)
+        return self.index_at(projection.arc_length + distance), projection
@@ -0,0 +1,261 @@
+"""
+Pure-pursuit path tracking with continuous wheel velocities.
+
+The discrete navigation modes pick one ACTION_MAPPINGS key per tick and
+rotate in place whenever the heading error passes ±20°. `PurePursuitTracker`
+steers along the arc through a lookahead point of the plan instead and
+returns a left / right wheel velocity pair, so the car follows bends while
+driving. The speed comes down ahead of sharp bends and near the end of the
+path, and the car only turns in place when the lookahead point is far off
+its heading (e.g. behind it at the start).
+
+`set_path` computes the curvature of the whole plan and the speed limit at
+every pose with NumPy once per plan; each tick then costs one PathIndex
+projection and a few scalar operations:
+
+    tracker = PurePursuitTracker(load_tracker_config())
+    tracker.set_path(path_index)
+    command = tracker.step(car_position, car_yaw)
+    publish(command.wheels)  # [left, right, left, right], ACTION_MAPPINGS order
+
+Wheel velocities are in the units of ACTION_MAPPINGS.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from pros_car_py.package_config import load_config
+
+TrackerConfig = namedtuple(
+    "TrackerConfig",
+    [
+        "controller",
+        "lookahead",
+        "track_width",
+        "max_wheel_speed",
+        "min_wheel_speed",
+        "rotate_wheel_speed",
+        "rotate_in_place_angle",
+        "max_curvature",
+        "curvature_slowdown",
+        "curvature_window",
+        "preview_distance",
+        "slowdown_distance",
+        "goal_tolerance",
+    ],
+    defaults=["discrete", 0.8, 0.5, 10.0, 4.0, 5.0, 60.0, 3.0, 0.1, 0.8, 0.5, 0.3, 0.5],
+)
+TrackerConfig.__doc__ = """\
+Settings of config/path_tracker.yaml, see the comments there.
+"""
+
+CONTROLLERS = ("discrete", "pure_pursuit")
+
+PursuitCommand = namedtuple(
+    "PursuitCommand", ["wheels", "speed", "curvature", "target", "remaining", "finished"]
+)
+PursuitCommand.__doc__ = """\
+Output of one PurePursuitTracker step.
+
+wheels: [left, right, left, right] wheel velocities.
+speed: forward wheel velocity before steering, 0.0 when turning in place.
+curvature: commanded path curvature (1/m), positive to the left.
+target: [x, y] lookahead point, None without a path.
+remaining: distance along the path from the car's projection to its end (m).
+finished: the car is within goal_tolerance of the last pose.
+"""
+
+
+def load_tracker_config(path=None):
+    """
+    TrackerConfig from a path tracker YAML file.
+
+    Args:
+        path (str): file to read; None reads the installed default and
+            uses the built-in defaults when there is none.
+    """
+    config = load_config("path_tracker.yaml", path, "path tracker config")
+    try:
+        config = TrackerConfig(**config)
+    except TypeError as e:
+        raise ValueError(f"Invalid path tracker config: {e}")
+    if config.controller not in CONTROLLERS:
+        raise ValueError(
+            f"Invalid controller '{config.controller}', expected one of {CONTROLLERS}"
+        )
+    return config
+
+
+def declare_tracker_config(node):
+    """
+    TrackerConfig of `node` from its parameters:
+        path_tracker_config (str): YAML file instead of the installed default.
+        nav_controller (str): "discrete" or "pure_pursuit", overrides the file.
+    """
+    path = node.declare_parameter("path_tracker_config", "").value
+    config = load_tracker_config(path or None)
+    controller = node.declare_parameter("nav_controller", config.controller).value
+    if controller not in CONTROLLERS:
+        raise ValueError(
+            f"Invalid nav_controller '{controller}', expected one of {CONTROLLERS}"
+        )
+    return config._replace(controller=controller)
+
+
+def yaw_from_quaternion(z, w):
+    """Yaw (radians) of a planar quaternion."""
+    return 2.0 * math.atan2(z, w)
+
+
+def path_curvature(points, arc_length, window):
+    """
+    Curvature (1/m, positive to the left) at every point of a polyline.
+
+    Uses the circle through the path points `window` / 2 meters before and
+    after each point, which smooths out the grid steps of Nav2 plans.
+    """
+    count = len(points)
+    if count < 3 or arc_length[-1] <= 0.0:
+        return np.zeros(count)
+    x = points[:, 0]
+    y = points[:, 1]
+    before = np.maximum(arc_length - 0.5 * window, 0.0)
+    after = np.minimum(arc_length + 0.5 * window, arc_length[-1])
+    ax, ay = np.interp(before, arc_length, x), np.interp(before, arc_length, y)
+    bx, by = np.interp(arc_length, arc_length, x), np.interp(arc_length, arc_length, y)
+    cx, cy = np.interp(after, arc_length, x), np.interp(after, arc_length, y)
+    cross = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    sides = (
+        np.hypot(bx - ax, by - ay)
+        * np.hypot(cx - bx, cy - by)
+        * np.hypot(cx - ax, cy - ay)
+    )
+    curvature = np.zeros(count)
+    np.divide(2.0 * cross, sides, out=curvature, where=sides > 1e-12)
+    return curvature
+
+
+def preview_min(values, arc_length, distance):
+    """Minimum of `values` over the next `distance` meters of path from every point."""
+    count = len(values)
+    if count == 0:
+        return values
+    starts = np.arange(count)
+    ends = np.searchsorted(arc_length, arc_length + distance, side="right")
+    ends = np.maximum(ends, starts + 1)
+    # reduceat over [start, end) pairs; the sentinel lets `end` reach `count`
+    padded = np.append(values, np.inf)
+    bounds = np.column_stack((starts, ends)).ravel()
+    return np.minimum.reduceat(padded, bounds)[::2]
+
+
+class PurePursuitTracker:
+    """
+    Args:
+        config (TrackerConfig): tracker settings, the defaults when None.
+    """
+
+    def __init__(self, config=None):
+        self.config = config if config is not None else TrackerConfig()
+        self.path_index = None
+        self.segment = 0
+        self.speed_limits = None
+
+    def reset(self):
+        self.path_index = None
+        self.segment = 0
+        self.speed_limits = None
+
+    def set_path(self, path_index):
+        """Track `path_index` (PathIndex); the same index again keeps the progress."""
+        if path_index is self.path_index:
+            return
+        self.path_index = path_index
+        self.segment = 0
+        self.speed_limits = None
+        if path_index is None:
+            return
+        config = self.config
+        arc_length = path_index.arc_length
+        curvature = path_curvature(path_index.points, arc_length, config.curvature_window)
+        curve_limits = config.max_wheel_speed / (
+            1.0 + config.curvature_slowdown * np.abs(curvature)
+        )
+        limits = preview_min(curve_limits, arc_length, config.preview_distance)
+        if config.slowdown_distance > 0.0:
+            remaining = path_index.length - arc_length
+            ramp = np.clip(remaining / config.slowdown_distance, 0.0, 1.0)
+            goal_limits = config.min_wheel_speed + ramp * (
+                config.max_wheel_speed - config.min_wheel_speed
+            )
+            np.minimum(limits, goal_limits, out=limits)
+        np.maximum(limits, config.min_wheel_speed, out=limits)
+        self.speed_limits = limits
+
+    def _command(self, speed, curvature, target, remaining):
+        half_track = 0.5 * self.config.track_width * curvature
+        left = speed * (1.0 - half_track)
+        right = speed * (1.0 + half_track)
+        # Keep the ratio of the two sides when one exceeds the limit
+        scale = max(abs(left), abs(right)) / self.config.max_wheel_speed
+        if scale > 1.0:
+            left /= scale
+            right /= scale
+        return PursuitCommand(
+            [left, right, left, right], speed, curvature, target, remaining, False
+        )
+
+    def step(self, position, yaw):
+        """
+        Wheel command for the car at `position` ([x, y]) heading `yaw` (radians).
+        """
+        config = self.config
+        path_index = self.path_index
+        if path_index is None:
+            return PursuitCommand([0.0, 0.0, 0.0, 0.0], 0.0, 0.0, None, 0.0, False)
+
+        x, y = float(position[0]), float(position[1])
+        projection = path_index.project((x, y), self.segment)
+        self.segment = projection.segment
+        remaining = path_index.length - projection.arc_length
+        end_x, end_y = path_index.points[-1].tolist()
+        if math.hypot(end_x - x, end_y - y) < config.goal_tolerance:
+            return PursuitCommand(
+                [0.0, 0.0, 0.0, 0.0], 0.0, 0.0, [end_x, end_y], remaining, True
+            )
+
+        target = path_index.point_at(projection.arc_length + config.lookahead)
+        dx = target[0] - x
+        dy = target[1] - y
+        cos_yaw = math.cos(yaw)
+        sin_yaw = math.sin(yaw)
+        local_x = cos_yaw * dx + sin_yaw * dy
+        local_y = cos_yaw * dy - sin_yaw * dx
+        heading_error = math.atan2(local_y, local_x)
+
+        if abs(heading_error) > math.radians(config.rotate_in_place_angle):
+            # Target far off the heading: turn in place towards it
+            turn = math.copysign(config.rotate_wheel_speed, heading_error)
+            return PursuitCommand(
+                [-turn, turn, -turn, turn],
+                0.0,
+                math.copysign(math.inf, heading_error),
+                target,
+                remaining,
+                False,
+            )
+
+        distance_sq = local_x * local_x + local_y * local_y
+        curvature = 2.0 * local_y / distance_sq if distance_sq > 1e-9 else 0.0
+        curvature = max(-config.max_curvature, min(config.max_curvature, curvature))
+        speed = float(
+            np.interp(projection.arc_length, path_index.arc_length, self.speed_limits)
+        )
+        speed = min(
+            speed,
+            config.max_wheel_speed / (1.0 + config.curvature_slowdown * abs(curvature)),
+        )
+        speed = max(speed, config.min_wheel_speed)
+        return self._command(speed, curvature, target, remaining)
@@ -0,0 +1,293 @@
+"""
+Fixed-rate loops for the controller background threads.
+
+Sleeping a fixed time after each iteration makes the real period the sleep
+plus the work, and it drifts with the work. `RateLoop` wakes on absolute
+deadlines spaced one period apart instead, so the period stays the same
+whatever the work takes, as long as it fits in a period:
+
+    loop = RateLoop(20.0, name="car control", report=print)
+    while loop.sleep(stop_event):
+        step()
+
+When an iteration runs past the next deadline (an overrun) the loop either
+skips the missed deadlines and waits for the next one on the schedule
+("skip", for control loops where a late command is superseded anyway) or
+runs the missed iterations back to back until it is on schedule again
+("catch_up", for loops that must run a fixed number of times).
+
+Every wakeup records the actual period and the jitter (wakeup time minus
+deadline); `stats()` returns them together with the overrun counts.
+
+`EventRateLoop` ticks when one of its TopicCache keys gets a new sample
+instead, so a step reacts to a new pose as soon as it arrives. It ticks at
+most `max_rate` times per second however often the inputs update, and at
+least `min_rate` times per second while they are silent:
+
+    loop = EventRateLoop(topic_cache, ("amcl_pose", "global_plan"), 5.0, 30.0)
+    while rclpy.ok():
+        loop.sleep()
+        step()
+"""
+
+import threading
+import time
+
+from pros_car_py.serial_io import PortStats
+
+OVERRUN_POLICIES = ("skip", "catch_up")
+
+
+def format_rate_stats(stats):
+    """One-line summary of RateLoop.stats()."""
+    return (
+        f"{stats['name']}: {stats['rate']:.1f} Hz (target {stats['target_rate']:.1f}, "
+        f"ticks {stats['ticks']}), period p50 {stats['period_p50_ms']:.2f} ms "
+        f"max {stats['period_max_ms']:.2f} ms, jitter p50 {stats['jitter_p50_ms']:.3f} ms "
+        f"p99 {stats['jitter_p99_ms']:.3f} ms max {stats['jitter_max_ms']:.3f} ms, "
+        f"overruns {stats['overruns']}, skipped {stats['skipped']}"
+    )
+
+
+class RateLoop:
+    """
+    Args:
+        rate (float): iterations per second.
+        overrun (str): "skip" or "catch_up", see the module docstring.
+        name (str): name in the statistics.
+        report: optional callable receiving format_rate_stats() every
+            `report_period` seconds, e.g. print or node.get_logger().info.
+        report_period (float): seconds between two reports.
+    """
+
+    def __init__(
+        self, rate, overrun="skip", name="rate loop", report=None, report_period=5.0
+    ):
+        if rate <= 0:
+            raise ValueError(f"RateLoop rate must be positive, got {rate}")
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(
+                f"Invalid overrun policy '{overrun}', expected one of {OVERRUN_POLICIES}"
+            )
+        self.name = name
+        self.period = 1.0 / rate
+        self.overrun = overrun
+        self._report = report
+        self._report_period = report_period
+        self._deadline = None
+        self._last_tick = None
+        self._last_report = None
+        self._lock = threading.Lock()
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        # Jitter: deadline -> wakeup; period: previous wakeup -> wakeup
+        self._jitter = PortStats(name)
+        self._periods = PortStats(name)
+
+    def reset(self):
+        """Start a new schedule; the next sleep() returns immediately."""
+        self._deadline = None
+        self._last_tick = None
+
+    def sleep(self, stop_event=None):
+        """
+        Wait for the next deadline. The first call returns immediately and
+        starts the schedule.
+
+        Args:
+            stop_event (threading.Event): returns early when it is set.
+
+        Returns:
+            bool: False if `stop_event` is set, True otherwise.
+        """
+        now = time.monotonic()
+        if self._deadline is None:
+            self._deadline = now
+        else:
+            self._deadline += self.period
+            if now > self._deadline:
+                with self._lock:
+                    self.overruns += 1
+                    if self.overrun == "skip":
+                        missed = int((now - self._deadline) / self.period) + 1
+                        self._deadline += missed * self.period
+                        self.skipped += missed
+
+        delay = self._deadline - now
+        if stop_event is not None:
+            if stop_event.wait(delay) if delay > 0 else stop_event.is_set():
+                return False
+        elif delay > 0:
+            time.sleep(delay)
+
+        tick = time.monotonic()
+        self._jitter.record(self._deadline, tick)
+        if self._last_tick is not None:
+            self._periods.record(self._last_tick, tick)
+        self._last_tick = tick
+        with self._lock:
+            self.ticks += 1
+
+        if self._report is not None:
+            if self._last_report is None:
+                self._last_report = tick
+            elif tick - self._last_report >= self._report_period:
+                self._last_report = tick
+                self._report(format_rate_stats(self.stats()))
+        return True
+
+    def stats(self):
+        """
+        Statistics since the previous call: rate (Hz), target_rate, ticks,
+        overruns, skipped, period_avg/p50/p99/max_ms and jitter_p50/p99/max_ms.
+        """
+        jitter = self._jitter.snapshot()
+        periods = self._periods.snapshot()
+        with self._lock:
+            ticks, overruns, skipped = self.ticks, self.overruns, self.skipped
+        return {
+            "name": self.name,
+            "rate": jitter["rate"],
+            "target_rate": 1.0 / self.period,
+            "ticks": ticks,
+            "overruns": overruns,
+            "skipped": skipped,
+            "period_avg_ms": periods["latency_avg_ms"],
+            "period_p50_ms": periods["latency_p50_ms"],
+            "period_p99_ms": periods["latency_p99_ms"],
+            "period_max_ms": periods["latency_max_ms"],
+            "jitter_p50_ms": jitter["latency_p50_ms"],
+            "jitter_p99_ms": jitter["latency_p99_ms"],
+            "jitter_max_ms": jitter["latency_max_ms"],
+        }
+
+
+def format_event_stats(stats):
+    """One-line summary of EventRateLoop.stats()."""
+    return (
+        f"{stats['name']}: {stats['rate']:.1f} Hz (ticks {stats['ticks']}, "
+        f"{stats['triggered']} on updates, {stats['timeouts']} on min rate), "
+        f"period p50 {stats['period_p50_ms']:.2f} ms max {stats['period_max_ms']:.2f} ms, "
+        f"reaction p50 {stats['reaction_p50_ms']:.3f} ms p99 {stats['reaction_p99_ms']:.3f} ms "
+        f"max {stats['reaction_max_ms']:.3f} ms"
+    )
+
+
+class EventRateLoop:
+    """
+    Args:
+        topic_cache (TopicCache): cache holding the input topics.
+        keys: cache keys whose updates trigger a tick.
+        min_rate (float): ticks per second at least, also without updates.
+        max_rate (float): ticks per second at most.
+        name (str): name in the statistics.
+        report: optional callable receiving format_event_stats() every
+            `report_period` seconds.
+        report_period (float): seconds between two reports.
+    """
+
+    def __init__(
+        self,
+        topic_cache,
+        keys,
+        min_rate,
+        max_rate,
+        name="event loop",
+        report=None,
+        report_period=5.0,
+    ):
+        if not 0 < min_rate <= max_rate:
+            raise ValueError(
+                f"EventRateLoop needs 0 < min_rate <= max_rate, got {min_rate}, {max_rate}"
+            )
+        self.topic_cache = topic_cache
+        self.keys = tuple(keys)
+        self.name = name
+        self.min_period = 1.0 / max_rate
+        self.max_period = 1.0 / min_rate
+        self._report = report
+        self._report_period = report_period
+        self._last_report = None
+        self._lock = threading.Lock()
+        self.ticks = 0
+        self.triggered = 0
+        self.timeouts = 0
+        # Reaction: first unhandled update -> tick; period: tick -> tick
+        self._reactions = PortStats(name)
+        self._periods = PortStats(name)
+        self.reset()
+
+    def reset(self):
+        """
+        Start over: the next sleep() returns immediately and only samples
+        stored after this call trigger ticks.
+        """
+        self._seqs = {key: self.topic_cache.seq(key) for key in self.keys}
+        self._last_tick = None
+
+    def sleep(self):
+        """
+        Wait for the next tick.
+
+        Returns:
+            {key: TopicSample} of the inputs updated since the previous tick,
+            empty when the tick comes from `min_rate` or is the first one.
+        """
+        updated = {}
+        if self._last_tick is not None:
+            earliest = self._last_tick + self.min_period
+            delay = earliest - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            timeout = self._last_tick + self.max_period - time.monotonic()
+            updated = self.topic_cache.wait_for_any(self._seqs, max(timeout, 0.0))
+
+        tick = time.monotonic()
+        if updated:
+            for key, sample in updated.items():
+                self._seqs[key] = sample.seq
+            self._reactions.record(
+                min(sample.receive_time for sample in updated.values()), tick
+            )
+        if self._last_tick is not None:
+            self._periods.record(self._last_tick, tick)
+        with self._lock:
+            self.ticks += 1
+            if updated:
+                self.triggered += 1
+            elif self._last_tick is not None:
+                self.timeouts += 1
+        self._last_tick = tick
+
+        if self._report is not None:
+            if self._last_report is None:
+                self._last_report = tick
+            elif tick - self._last_report >= self._report_period:
+                self._last_report = tick
+                self._report(format_event_stats(self.stats()))
+        return updated
+
+    def stats(self):
+        """
+        Statistics since the previous call: rate (Hz), ticks, triggered,
+        timeouts, period_avg/p50/p99/max_ms and reaction_p50/p99/max_ms.
+        """
+        reactions = self._reactions.snapshot()
+        periods = self._periods.snapshot()
+        with self._lock:
+            ticks, triggered, timeouts = self.ticks, self.triggered, self.timeouts
+        return {
+            "name": self.name,
+            "rate": periods["rate"],
+            "ticks": ticks,
+            "triggered": triggered,
+            "timeouts": timeouts,
+            "period_avg_ms": periods["latency_avg_ms"],
+            "period_p50_ms": periods["latency_p50_ms"],
+            "period_p99_ms": periods["latency_p99_ms"],
+            "period_max_ms": periods["latency_max_ms"],
+            "reaction_p50_ms": reactions["latency_p50_ms"],
+            "reaction_p99_ms": reactions["latency_p99_ms"],
+            "reaction_max_ms": reactions["latency_max_ms"],
+        }
@@ -13,82 +13,78 @@ from std_msgs.msg import Float32MultiArray
 from visualization_msgs.msg import Marker
 from nav2_msgs.srv import ClearEntireCostmap
 from rclpy.action import ActionClient
-from nav2_msgs.action import NavigateToPose
+from nav2_msgs.action import ComputePathToPose, NavigateToPose
+from action_msgs.msg import GoalStatus
 import rclpy
+from pros_car_py.message_buffers import ArrayPublisher
+from pros_car_py.topic_cache import TopicCache
+from pros_car_py.topic_qos import TopicQosConfig
+
+
+def _goal_position(msg):
+    position = msg.pose.position
+    return [position.x, position.y, position.z]
 
 
 class RosCommunicator(Node):
     def __init__(self):
         super().__init__("RosCommunicator")
 
+        # Subscription QoS and callback groups from config/topic_qos.yaml
+        self.topic_qos = TopicQosConfig(self)
+        # Latest message of every subscribed topic, read by the controller threads
+        self.topic_cache = TopicCache(self.topic_qos)
+        cache = self.topic_cache
+
         # subscribeamcl_pose
-        self.latest_amcl_pose = None
-        self.subscriber_amcl = self.create_subscription(
-            PoseWithCovarianceStamped, "/amcl_pose", self.subscriber_amcl_callback, 10
+        self.subscriber_amcl = cache.subscribe(
+            self, PoseWithCovarianceStamped, "/amcl_pose", key="amcl_pose"
         )
 
         # subscribe goal_pose
-        self.target_pose = None
-        self.subscriber_goal = self.create_subscription(
-            PoseStamped, "/goal_pose", self.subscriber_goal_callback, 1
+        self.subscriber_goal = cache.subscribe(
+            self, PoseStamped, "/goal_pose", key="goal", convert=_goal_position, qos=1
         )
 
         # subscribe lidar
-        self.latest_lidar = None
-        self.subscriber_lidar = self.create_subscription(
-            LaserScan, "/scan", self.subscriber_lidar_callback, 1
+        self.subscriber_lidar = cache.subscribe(
+            self, LaserScan, "/scan", key="lidar", qos=1
         )
 
         # subscribe global_plan
-        self.latest_received_global_plan = None
-        self.subscriber_received_global_plan = self.create_subscription(
-            Path, "/received_global_plan", self.received_global_plan_callback, 1
+        self.subscriber_received_global_plan = cache.subscribe(
+            self, Path, "/received_global_plan", key="received_global_plan", qos=1
         )
 
         # Subscribe to YOLO detected object coordinates
-        self.latest_yolo_coordinates = None
-        self.subscriber_yolo_detection_position = self.create_subscription(
-            PointStamped,
-            "/yolo/detection/position",
-            self.yolo_detection_position_callback,
-            10,
+        self.subscriber_yolo_detection_position = cache.subscribe(
+            self, PointStamped, "/yolo/detection/position", key="yolo_position"
         )
 
         # Subscribe to YOLO detected object coordinates
-        self.latest_yolo_offset = None
-        self.subscriber_yolo_offset = self.create_subscription(
-            PointStamped,
-            "/yolo/detection/offset",
-            self.yolo_detection_offset_callback,
-            10,
+        self.subscriber_yolo_offset = cache.subscribe(
+            self, PointStamped, "/yolo/detection/offset", key="yolo_offset"
         )
 
-        self.latest_yolo_detection_status = None
-        self.subscriber_yolo_detection_status = self.create_subscription(
-            Bool, "/yolo/detection/status", self.yolo_detection_status_callback, 10
+        self.subscriber_yolo_detection_status = cache.subscribe(
+            self, Bool, "/yolo/detection/status", key="yolo_detection_status"
         )
 
-        self.latest_imu_data = None
-        self.imu_sub = self.create_subscription(
-            Imu, "/imu/data", self.imu_data_callback, 10
-        )
+        self.imu_sub = cache.subscribe(self, Imu, "/imu/data", key="imu")
 
-        self.latest_mediapipe_data = None
-        self.mediapipe_sub = self.create_subscription(
-            Point, "/mediapipe_data", self.mediapipe_data_callback, 10
+        self.mediapipe_sub = cache.subscribe(
+            self, Point, "/mediapipe_data", key="mediapipe"
         )
 
-        self.latest_yolo_target_info = None
-        self.yolo_target_info_sub = self.create_subscription(
-            Float32MultiArray, "/yolo/target_info", self.yolo_target_info_callback, 10
+        self.yolo_target_info_sub = cache.subscribe(
+            self, Float32MultiArray, "/yolo/target_info", key="yolo_target_info"
         )
 
-        self.latest_camera_x_multi_depth = None
-        self.camera_x_multi_depth_sub = self.create_subscription(
+        self.camera_x_multi_depth_sub = cache.subscribe(
+            self,
             Float32MultiArray,
             "/camera/x_multi_depth_values",
-            self.camera_x_multi_depth_callback,
-            10,
+            key="camera_x_multi_depth",
         )
 
         # publish car_C_rear_wheel and car_C_front_wheel
@@ -98,6 +94,9 @@ class RosCommunicator(Node):
         self.publisher_forward = self.create_publisher(
             Float32MultiArray, DeviceDataTypeEnum.car_C_front_wheel, 10
         )
+        # Reused messages for the wheel and arm commands sent at control rate
+        self.rear_wheel_command = ArrayPublisher(self.publisher_rear, size=2)
+        self.front_wheel_command = ArrayPublisher(self.publisher_forward, size=2)
 
         # publish goal_pose
         self.publisher_goal_pose = self.create_publisher(PoseStamped, "/goal_pose", 10)
@@ -106,6 +105,12 @@ class RosCommunicator(Node):
         self.publisher_joint_trajectory = self.create_publisher(
             JointTrajectoryPoint, DeviceDataTypeEnum.robot_arm, 10
         )
+        self.joint_trajectory_command = ArrayPublisher(
+            self.publisher_joint_trajectory,
+            field="positions",
+            typecode="d",
+            zero_fields=("velocities",),
+        )
 
         self.publisher_coordinates = self.create_publisher(
             PointStamped, "/coordinates", 10
@@ -146,6 +151,10 @@ class RosCommunicator(Node):
         self.navigate_to_pose_action_client = ActionClient(
             self, NavigateToPose, "/navigate_to_pose"
         )
+        # Planner server only: plans a path without Nav2 driving it
+        self.compute_path_action_client = ActionClient(
+            self, ComputePathToPose, "/compute_path_to_pose"
+        )
 
     def clear_received_global_plan(self):
         """
@@ -173,77 +182,114 @@ class RosCommunicator(Node):
         self.clear_plan()
         self.get_logger().info("Nav2 Reset Completed")
 
-    # amcl_pose callback and get_latest_amcl_pose
-    def subscriber_amcl_callback(self, msg):
-        self.latest_amcl_pose = msg
+    def wait_for(self, key, newer_than=None, timeout=None):
+        """
+        Block the calling thread until the cached topic `key` gets a sample
+        with a sequence number above `newer_than` (see TopicCache.wait_for).
+
+        Returns the TopicSample, or None on timeout.
+        """
+        return self.topic_cache.wait_for(key, newer_than, timeout)
 
-    def get_latest_amcl_pose(self):
-        if self.latest_amcl_pose is None:
+    # Getters of the cached topics. `max_age` (seconds) treats older data as
+    # missing; None accepts data of any age.
+    def get_latest_amcl_pose(self, max_age=None):
+        amcl_pose = self.topic_cache.get("amcl_pose", max_age=max_age)
+        if amcl_pose is None:
             self.get_logger().warn("No AMCL pose data received yet.")
-        return self.latest_amcl_pose
+        return amcl_pose
 
-    # goal callback and get_latest_goal
-    def subscriber_goal_callback(self, msg):
-        position = msg.pose.position
-        target = [position.x, position.y, position.z]
-        self.target_pose = target
-
-    def get_latest_goal(self):
-        if self.target_pose is None:
+    def get_latest_goal(self, max_age=None):
+        target_pose = self.topic_cache.get("goal", max_age=max_age)
+        if target_pose is None:
             self.get_logger().warn("No goal pose data received yet.")
-        return self.target_pose
-
-    # lidar callback and get_latest_lidar
-    def subscriber_lidar_callback(self, msg):
-        self.latest_lidar = msg
+        return target_pose
 
-    def get_latest_lidar(self):
-        if self.latest_lidar is None:
+    def get_latest_lidar(self, max_age=None):
+        lidar = self.topic_cache.get("lidar", max_age=max_age)
+        if lidar is None:
             self.get_logger().warn("No Lidar data received yet.")
-        return self.latest_lidar
+        return lidar
 
-    # received_global_plan callback and get_latest_received_global_plan
-    def received_global_plan_callback(self, msg):
-        self.latest_received_global_plan = msg
-
-    def get_latest_received_global_plan(self):
-        if self.latest_received_global_plan is None:
+    def get_latest_received_global_plan(self, max_age=None):
+        global_plan = self.topic_cache.get("received_global_plan", max_age=max_age)
+        if global_plan is None:
             self.get_logger().warn("No received global plan data received yet.")
-            return None
-        return self.latest_received_global_plan
+        return global_plan
 
     def publish_car_control(self, action_key, publish_rear=True, publish_front=True):
-        msg = Float32MultiArray()
-        if action_key not in ACTION_MAPPINGS:
-            # print("action error")
-            return
-        velocities = ACTION_MAPPINGS[action_key]
+        """
+        action_key: ACTION_MAPPINGS key, or a list of the four wheel
+        velocities in the same order (e.g. from PurePursuitTracker).
+        """
+        if isinstance(action_key, str):
+            if action_key not in ACTION_MAPPINGS:
+                # print("action error")
+                return
+            velocities = ACTION_MAPPINGS[action_key]
+        else:
+            velocities = action_key
         self._vel1, self._vel2, self._vel3, self._vel4 = velocities
-        msg.data = [self._vel1, self._vel2]
         if publish_rear == True:
-            self.publisher_rear.publish(msg)
-        msg.data = [self._vel3, self._vel4]
+            self.rear_wheel_command.publish(velocities[0:2])
         if publish_front == True:
-            self.publisher_forward.publish(msg)
+            self.front_wheel_command.publish(velocities[2:4])
+
+    def _map_pose(self, position):
+        pose = PoseStamped()
+        pose.header = Header()
+        pose.header.stamp = self.get_clock().now().to_msg()
+        pose.header.frame_id = "map"
+        pose.pose.position.x = float(position[0])
+        pose.pose.position.y = float(position[1])
+        pose.pose.position.z = 0.0
+        pose.pose.orientation.w = 1.0
+        return pose
 
     # publish goal_pose
     def publish_goal_pose(self, goal):
-        goal_pose = PoseStamped()
-        goal_pose.header = Header()
-        goal_pose.header.stamp = self.get_clock().now().to_msg()
-        goal_pose.header.frame_id = "map"
-        goal_pose.pose.position.x = goal[0]
-        goal_pose.pose.position.y = goal[1]
-        goal_pose.pose.position.z = 0.0
-        goal_pose.pose.orientation.w = 1.0
-        self.publisher_goal_pose.publish(goal_pose)
+        self.publisher_goal_pose.publish(self._map_pose(goal))
+
+    def request_plan(self, start, goal, done, planner_id=""):
+        """
+        Ask the Nav2 planner server for a path from `start` to `goal` ([x, y]
+        in the map frame) without starting navigation.
+
+        Does not block: `done` is called from the executor with the
+        nav_msgs/Path, or with None if the planner server is not available
+        or the planning fails.
+        """
+        client = self.compute_path_action_client
+        if not client.server_is_ready():
+            self.get_logger().warn("Planner server /compute_path_to_pose not available")
+            done(None)
+            return
+        request = ComputePathToPose.Goal()
+        request.start = self._map_pose(start)
+        request.goal = self._map_pose(goal)
+        request.use_start = True
+        request.planner_id = planner_id
+
+        def on_result(future):
+            response = future.result()
+            if response is None or response.status != GoalStatus.STATUS_SUCCEEDED:
+                done(None)
+                return
+            done(response.result.path)
+
+        def on_goal(future):
+            goal_handle = future.result()
+            if goal_handle is None or not goal_handle.accepted:
+                done(None)
+                return
+            goal_handle.get_result_async().add_done_callback(on_result)
+
+        client.send_goal_async(request).add_done_callback(on_goal)
 
     # publish robot arm angle
     def publish_robot_arm_angle(self, angle):
-        joint_trajectory_point = JointTrajectoryPoint()
-        joint_trajectory_point.positions = angle
-        joint_trajectory_point.velocities = [0.0] * len(angle)
-        self.publisher_joint_trajectory.publish(joint_trajectory_point)
+        # velocities stay zeros of the same length as the positions
+        self.joint_trajectory_command.publish(angle)
 
     def publish_coordinates(self, x, y, z, frame_id="map"):
         coordinate_msg = PointStamped()
@@ -254,49 +300,24 @@ class RosCommunicator(Node):
         coordinate_msg.point.z = z
         self.publisher_coordinates.publish(coordinate_msg)
 
-    def mediapipe_data_callback(self, msg):
-        self.latest_mediapipe_data = msg
-
-    def get_latest_mediapipe_data(self):
-        if self.latest_mediapipe_data is None:
+    def get_latest_mediapipe_data(self, max_age=None):
+        mediapipe_data = self.topic_cache.get("mediapipe", max_age=max_age)
+        if mediapipe_data is None:
             self.get_logger().warn("No Mediapipe data received yet.")
-            return None
-        return self.latest_mediapipe_data
+        return mediapipe_data
 
-    def yolo_target_info_callback(self, msg):
-        self.latest_yolo_target_info = msg
+    def get_latest_yolo_target_info(self, max_age=None):
+        return self.topic_cache.get("yolo_target_info", max_age=max_age)
 
-    def get_latest_yolo_target_info(self):
-        if self.latest_yolo_target_info is None:
-            return None
-        return self.latest_yolo_target_info
+    def get_latest_camera_x_multi_depth(self, max_age=None):
+        return self.topic_cache.get("camera_x_multi_depth", max_age=max_age)
 
-    def camera_x_multi_depth_callback(self, msg):
-        self.latest_camera_x_multi_depth = msg
-
-    def get_latest_camera_x_multi_depth(self):
-        if self.latest_camera_x_multi_depth is None:
-            return None
-        return self.latest_camera_x_multi_depth
-
-    # YOLO coordinates callback
-    def yolo_detection_position_callback(self, msg):
-        """Callback to receive YOLO detected object coordinates."""
-        self.latest_yolo_coordinates = msg
-
-    def get_latest_yolo_detection_position(self):
+    def get_latest_yolo_detection_position(self, max_age=None):
         """Getter for the latest YOLO detected object coordinates."""
-        if self.latest_yolo_coordinates is None:
-            return None
-        return self.latest_yolo_coordinates
+        return self.topic_cache.get("yolo_position", max_age=max_age)
 
-    def yolo_detection_offset_callback(self, msg):
-        self.latest_yolo_offset = msg
-
-    def get_latest_yolo_detection_offset(self):
-        if self.latest_yolo_offset is None:
-            return None
-        return self.latest_yolo_offset
+    def get_latest_yolo_detection_offset(self, max_age=None):
+        return self.topic_cache.get("yolo_offset", max_age=max_age)
 
     def publish_target_label(self, label):
         target_label_msg = String()
@@ -310,21 +331,11 @@ class RosCommunicator(Node):
         crane_state_msg.data = orjson.dumps(control_signal).decode()
         self.crane_state_publisher.publish(crane_state_msg)
 
-    def yolo_detection_status_callback(self, msg):
-        self.latest_yolo_detection_status = msg
-
-    def get_latest_yolo_detection_status(self):
-        if self.latest_yolo_detection_status is None:
-            return None
-        return self.latest_yolo_detection_status
-
-    def imu_data_callback(self, msg):
-        self.latest_imu_data = msg
+    def get_latest_yolo_detection_status(self, max_age=None):
+        return self.topic_cache.get("yolo_detection_status", max_age=max_age)
 
-    def get_latest_imu_data(self):
-        if self.latest_imu_data is None:
-            return None
-        return self.latest_imu_data
+    def get_latest_imu_data(self, max_age=None):
+        return self.topic_cache.get("imu", max_age=max_age)
 
     def publish_confirmed_initial_plan(self, path_msg: Path):
         """
@@ -0,0 +1,275 @@
+"""
+Single serial gateway for the rear wheels, front wheels and robot arm.
+
+Replaces running carC_reader, carC_writer, arm_reader, arm_writer and
+crane_writer as separate processes. Every configured port is opened once and
+all reads and writes go through one SerialEventLoop thread, so the arm reader
+and writer no longer fight over /dev/usb_robot_arm. The node publishes and
+subscribes the same topics as the individual nodes.
+"""
+
+import math
+import orjson
+import pydantic
+import rclpy
+from rclpy.node import Node
+from serial import Serial
+from sensor_msgs.msg import JointState
+from std_msgs.msg import String
+from trajectory_msgs.msg import JointTrajectoryPoint
+from custome_interfaces.msg import WheelState
+from pros_car_py.car_models import (
+    DeviceDataTypeEnum,
+    FrameError,
+    SerialProtocolEnum,
+    car_c_state_envelope,
+    decode_car_c_state_frame,
+    decode_servo_current_angles_frame,
+    encode_car_c_control_frame,
+    encode_servo_target_angles_frame,
+    validate_car_c_control,
+)
+from pros_car_py.env import (
+    ARM_SERIAL_PORT_DEFAULT,
+    SERIAL_DEV_DEFAULT,
+    SERIAL_DEV_FORWARD_DEFAULT,
+)
+from pros_car_py.serial_io import (
+    PortStats,
+    SerialEventLoop,
+    format_stats,
+    format_writer_counters,
+    frame_delimiter,
+    negotiate_protocol,
+    receive_stamp,
+)
+from pros_car_py.arm_utils import JointVelocityEstimator
+from pros_car_py.topic_qos import TopicQosConfig
+
+
+class SerialGateway(Node):
+    def __init__(self):
+        super().__init__("serial_gateway")
+        # Subscription QoS and callback groups from config/topic_qos.yaml
+        self.topic_qos = TopicQosConfig(self)
+
+        rear_port = self.declare_parameter("serial_port", SERIAL_DEV_DEFAULT).value
+        front_port = self.declare_parameter(
+            "serial_port_forward", SERIAL_DEV_FORWARD_DEFAULT
+        ).value
+        arm_port = self.declare_parameter(
+            "arm_serial_port", ARM_SERIAL_PORT_DEFAULT
+        ).value
+        enable_wheels = self.declare_parameter("enable_wheels", True).value
+        enable_arm = self.declare_parameter("enable_arm", True).value
+        # crane_writer topics (joint_trajectory_point, crane_state) on the arm port
+        enable_crane = self.declare_parameter("enable_crane", False).value
+        protocol = self.declare_parameter("protocol", "json").value
+        # also publish custome_interfaces/WheelState on <topic>_typed
+        self._publish_typed = self.declare_parameter("publish_typed", False).value
+        # > 0 coalesces the wheel and arm commands to the newest one and
+        # writes at most this many per second; the default writes them all
+        max_write_rate = self.declare_parameter("max_write_rate", 0.0).value
+        max_out_waiting = self.declare_parameter("max_out_waiting", 0).value
+        stats_period = self.declare_parameter("stats_period", 5.0).value
+
+        self._loop = SerialEventLoop(log=self.get_logger().error)
+        self._latest_wins = max_write_rate > 0
+        self._stats = []
+        self._joint_names = ["joint1", "joint2", "joint3", "joint4", "joint5"]
+
+        if enable_wheels:
+            self._rear = self._open_port(
+                rear_port, protocol, max_write_rate, max_out_waiting, "rear",
+                self._publish_wheel_state(DeviceDataTypeEnum.car_C_state, "rear"),
+            )
+            self._front = self._open_port(
+                front_port, protocol, max_write_rate, max_out_waiting, "front",
+                self._publish_wheel_state(DeviceDataTypeEnum.car_C_state_front, "front"),
+            )
+            self.topic_qos.subscribe(
+                String,
+                DeviceDataTypeEnum.car_C_rear_wheel,
+                lambda msg: self.wheel_control_callback(
+                    msg, DeviceDataTypeEnum.car_C_rear_wheel, self._rear
+                ),
+                10,
+            )
+            self.topic_qos.subscribe(
+                String,
+                DeviceDataTypeEnum.car_C_front_wheel,
+                lambda msg: self.wheel_control_callback(
+                    msg, DeviceDataTypeEnum.car_C_front_wheel, self._front
+                ),
+                10,
+            )
+
+        if enable_arm or enable_crane:
+            self._joint_state_pub = self.create_publisher(JointState, "joint_states", 10)
+            self._joint_velocity = JointVelocityEstimator(
+                self.declare_parameter("velocity_window", 5).value
+            )
+            self._arm = self._open_port(
+                arm_port, protocol, max_write_rate, max_out_waiting, "arm",
+                self._publish_arm_state(),
+            )
+            if enable_arm:
+                self.topic_qos.subscribe(
+                    JointTrajectoryPoint,
+                    DeviceDataTypeEnum.robot_arm,
+                    self.arm_control_callback,
+                    10,
+                )
+            if enable_crane and self._arm[1] != SerialProtocolEnum.json:
+                # crane_state frames only exist as JSON lines
+                self.get_logger().error(
+                    f"enable_crane needs the json protocol on the arm port, "
+                    f"negotiated {self._arm[1]}; crane topics disabled"
+                )
+            elif enable_crane:
+                self.topic_qos.subscribe(
+                    JointTrajectoryPoint,
+                    "joint_trajectory_point",
+                    self.arm_control_callback,
+                    10,
+                )
+                self.topic_qos.subscribe(
+                    String, "crane_state", self.crane_state_callback, 10
+                )
+
+        self._loop.start()
+        if stats_period > 0:
+            self.stats_timer = self.create_timer(stats_period, self.stats_callback)
+
+    def _open_port(self, port, protocol, max_write_rate, max_out_waiting, name, handler):
+        """Open `port` once, negotiate framing and hand it to the event loop."""
+        serial_port = Serial(port, 115200, timeout=0)
+        negotiated = negotiate_protocol(serial_port, protocol)
+        stats = PortStats(name)
+        self._stats.append(stats)
+        self._loop.register(
+            serial_port,
+            lambda frame, receive_time: handler(frame, receive_time, stats),
+            frame_delimiter(negotiated),
+            max_write_rate=max_write_rate,
+            max_out_waiting=max_out_waiting,
+            name=name,
+            stats=stats,
+        )
+        self.get_logger().info(f"Opened {name} port {port} ({negotiated})")
+        return serial_port, negotiated
+
+    # ---------------------------------------------------------------- reads
+    def _publish_wheel_state(self, topic, name):
+        publisher = self.create_publisher(String, topic, 10)
+        typed_publisher = None
+        if self._publish_typed:
+            typed_publisher = self.create_publisher(WheelState, f"{topic}_typed", 10)
+
+        def handler(frame, receive_time, stats):
+            try:
+                state_msg = String()
+                state_data = decode_car_c_state_frame(frame)
+                state_msg.data = car_c_state_envelope(state_data)
+            except (orjson.JSONDecodeError, FrameError) as e:
+                stats.record_error()
+                self.get_logger().error(f"{name} frame error: {e}")
+                return
+            publisher.publish(state_msg)
+            if typed_publisher is not None:
+                typed_msg = WheelState()
+                typed_msg.header.stamp = receive_stamp(self.get_clock(), receive_time)
+                typed_msg.vels = state_data["vels"]
+                typed_msg.encoders = state_data["encoders"]
+                typed_publisher.publish(typed_msg)
+            stats.record(receive_time)
+
+        return handler
+
+    def _publish_arm_state(self):
+        def handler(frame, receive_time, stats):
+            try:
+                degree_positions = decode_servo_current_angles_frame(frame)
+            except (orjson.JSONDecodeError, KeyError, FrameError) as e:
+                stats.record_error()
+                self.get_logger().error(f"arm frame error: {e}")
+                return
+            msg = JointState()
+            msg.header.stamp = receive_stamp(self.get_clock(), receive_time)
+            msg.name = self._joint_names
+            msg.position = [math.radians(deg) for deg in degree_positions]
+            msg.velocity = self._joint_velocity.update(receive_time, msg.position)
+            self._joint_state_pub.publish(msg)
+            stats.record(receive_time)
+
+        return handler
+
+    # --------------------------------------------------------------- writes
+    def wheel_control_callback(self, msg, expected_type, port):
+        serial_port, protocol = port
+        try:
+            control_data = orjson.loads(msg.data)
+            if control_data.get("type") != expected_type:
+                return
+            target_vel = validate_car_c_control(control_data.get("data", {}))
+            self._loop.submit(
+                serial_port,
+                encode_car_c_control_frame(target_vel, protocol),
+                latest_wins=self._latest_wins,
+            )
+        except orjson.JSONDecodeError as e:
+            self.get_logger().error(f"JSON decode error: {e}")
+        except (pydantic.ValidationError, TypeError, AttributeError) as e:
+            # Well-formed JSON of the wrong shape
+            self.get_logger().error(f"Invalid {expected_type} message {msg.data}: {e}")
+        except FrameError as e:
+            self.get_logger().error(f"Binary frame error: {e}")
+
+    def arm_control_callback(self, msg: JointTrajectoryPoint):
+        serial_port, protocol = self._arm
+        degree_positions = [math.degrees(rad) % 360 for rad in msg.positions]
+        self._loop.submit(
+            serial_port,
+            encode_servo_target_angles_frame(degree_positions, protocol),
+            latest_wins=self._latest_wins,
+        )
+
+    def crane_state_callback(self, msg: String):
+        serial_port, _ = self._arm
+        try:
+            crane_state = orjson.loads(msg.data).get("data").get("crane_state")
+        except (orjson.JSONDecodeError, AttributeError) as e:
+            self.get_logger().error(f"Invalid crane_state message {msg.data}: {e}")
+            return
+        self._loop.submit(
+            serial_port,
+            orjson.dumps({"crane_state": crane_state}, option=orjson.OPT_APPEND_NEWLINE),
+            latest_wins=False,
+        )
+
+    # ---------------------------------------------------------------- stats
+    def stats_callback(self):
+        for stats in self._stats:
+            self.get_logger().info(format_stats(stats.snapshot()))
+        for counters in self._loop.writer_counters():
+            self.get_logger().info(format_writer_counters(counters))
+
+    def destroy_node(self):
+        self._loop.stop()
+        super().destroy_node()
+
+
+def main(args=None):
+    rclpy.init(args=args)
+    serial_gateway = SerialGateway()
+    try:
+        rclpy.spin(serial_gateway)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serial_gateway.destroy_node()
+        rclpy.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,614 @@
+"""
+Serial helpers shared by the serial reader and writer nodes.
+
+Instead of polling every port from an rclpy timer, a single I/O thread
+blocks on the port file descriptors (epoll, or select where epoll is not
+available) and hands every complete frame to its callback as soon as it
+arrives. Bytes are read in bulk and split by a `FrameAssembler`, which
+keeps partial frames until their tail arrives. Writers use
+`negotiate_protocol` to pick JSON or binary framing and `CoalescingWriter`
+to keep only the newest command per port. The same
+loop can also own the writes of its ports, which is what the serial gateway
+uses to serve every device from a single thread.
+"""
+
+import os
+import select
+import threading
+import time
+from collections import deque
+from pros_car_py.car_models import (
+    BINARY_FRAME_DELIMITER,
+    JSON_FRAME_DELIMITER,
+    SerialProtocolEnum,
+    handshake_request,
+    is_handshake_ack,
+)
+
+
+class PortStats:
+    """
+    Frame rate and receive-to-publish latency bookkeeping for one port.
+
+    `record` is called from the I/O thread, `snapshot` from the node's
+    reporting timer, so both are guarded by a lock.
+    """
+
+    def __init__(self, name, window=1000):
+        self.name = name
+        self.frames = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._window_frames = 0
+        self._window_start = time.monotonic()
+
+    def record(self, receive_time, publish_time=None):
+        """Record one frame received at `receive_time` (time.monotonic())."""
+        if publish_time is None:
+            publish_time = time.monotonic()
+        with self._lock:
+            self.frames += 1
+            self._window_frames += 1
+            self._latencies.append(publish_time - receive_time)
+
+    def record_message(self):
+        """Count a frame whose latency is unknown."""
+        with self._lock:
+            self.frames += 1
+            self._window_frames += 1
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self):
+        """
+        Return the statistics since the previous snapshot and start a new window.
+
+        Latencies are reported in milliseconds.
+        """
+        now = time.monotonic()
+        with self._lock:
+            elapsed = now - self._window_start
+            frames = self._window_frames
+            latencies = sorted(self._latencies)
+            self._latencies.clear()
+            self._window_frames = 0
+            self._window_start = now
+            total_frames = self.frames
+            errors = self.errors
+
+        stats = {
+            "name": self.name,
+            "frames": total_frames,
+            "errors": errors,
+            "rate": frames / elapsed if elapsed > 0 else 0.0,
+            "latency_samples": len(latencies),
+            "latency_avg_ms": 0.0,
+            "latency_p50_ms": 0.0,
+            "latency_p99_ms": 0.0,
+            "latency_max_ms": 0.0,
+        }
+        if latencies:
+            stats["latency_avg_ms"] = sum(latencies) / len(latencies) * 1e3
+            stats["latency_p50_ms"] = _percentile(latencies, 0.50) * 1e3
+            stats["latency_p99_ms"] = _percentile(latencies, 0.99) * 1e3
+            stats["latency_max_ms"] = latencies[-1] * 1e3
+        return stats
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def receive_stamp(clock, receive_time):
+    """
+    Header stamp on `clock` (an rclpy Clock) for a frame read at `receive_time`.
+
+    `receive_time` is time.monotonic() taken by the reader; the age of the
+    frame is subtracted from the clock's current time.
+    """
+    now = clock.now()
+    age_ns = int((time.monotonic() - receive_time) * 1e9)
+    return type(now)(
+        nanoseconds=now.nanoseconds - age_ns, clock_type=now.clock_type
+    ).to_msg()
+
+
+def format_stats(stats):
+    """One-line summary of a PortStats.snapshot() result for the node logs."""
+    return (
+        f"{stats['name']}: {stats['rate']:.1f} frames/s "
+        f"(total {stats['frames']}, errors {stats['errors']}), "
+        f"latency avg {stats['latency_avg_ms']:.3f} ms "
+        f"p50 {stats['latency_p50_ms']:.3f} ms "
+        f"p99 {stats['latency_p99_ms']:.3f} ms "
+        f"max {stats['latency_max_ms']:.3f} ms"
+    )
+
+
+class FrameAssembler:
+    """
+    Split a byte stream into delimited frames.
+
+    `feed` appends whatever the port returned and gives back every complete
+    frame (without its delimiter) as one batch. A trailing partial frame stays
+    in the buffer until the rest of it arrives, so a read that stops in the
+    middle of a line no longer produces a decode error. Consumed bytes are
+    dropped from the front of the buffer in one step per feed, which keeps it
+    bounded like a ring buffer. A tail that grows past `max_frame_size`
+    without a delimiter is garbage (wrong baud rate, missing delimiter) and
+    is discarded.
+    """
+
+    def __init__(self, delimiter=JSON_FRAME_DELIMITER, max_frame_size=4096):
+        self.delimiter = delimiter
+        self.max_frame_size = max_frame_size
+        self._buffer = bytearray()
+        self.frames = 0
+        self.overflows = 0
+
+    def __len__(self):
+        """Number of buffered bytes belonging to an incomplete frame."""
+        return len(self._buffer)
+
+    def feed(self, data):
+        buffer = self._buffer
+        delimiter = self.delimiter
+        step = len(delimiter)
+        # The old tail has no delimiter in it, only search the new bytes
+        search = max(0, len(buffer) - step + 1)
+        start = 0
+        buffer += data
+        frames = []
+        while True:
+            end = buffer.find(delimiter, search)
+            if end < 0:
+                break
+            if end > start:
+                frames.append(bytes(buffer[start:end]))
+            start = search = end + step
+        if start:
+            del buffer[:start]
+        if len(buffer) > self.max_frame_size:
+            self.overflows += 1
+            buffer.clear()
+        self.frames += len(frames)
+        return frames
+
+    def read(self, serial_port):
+        """Read everything `serial_port` has buffered and return the complete frames."""
+        waiting = serial_port.in_waiting
+        if not waiting:
+            return []
+        return self.feed(serial_port.read(waiting))
+
+    def reset(self):
+        self._buffer.clear()
+
+
+class SerialEventLoop:
+    """
+    Drive the reads and writes of several serial ports from one I/O thread.
+
+    Every port registered with a callback gets
+    `callback(frame: bytes, receive_time: float)` invoked from the I/O thread
+    for each complete frame, split on the port's delimiter (newline for
+    JSON, 0x00 for binary framing) by a per-port `FrameAssembler`. Frames
+    are passed without their delimiter. `receive_time` is `time.monotonic()`
+    taken when the descriptor became readable. An exception raised by a
+    callback is passed to `log` and counted on the port's `PortStats`, and
+    the loop goes on with the next frame.
+
+    Ports registered with `max_write_rate` also accept `submit(serial_port,
+    frame)` from any thread. Writes follow the same latest-wins policy as
+    `CoalescingWriter`, but are performed by the I/O thread itself.
+    """
+
+    def __init__(self, poll_timeout=0.5, log=print):
+        self._poll_timeout = poll_timeout
+        self._log = log
+        self._ports = {}
+        self._writers = {}
+        self._write_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._epoll = select.epoll() if hasattr(select, "epoll") else None
+        # Self-pipe so submit() can wake the loop out of poll()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        if self._epoll is not None:
+            self._epoll.register(self._wake_r, select.EPOLLIN)
+
+    def register(
+        self,
+        serial_port,
+        callback=None,
+        delimiter=JSON_FRAME_DELIMITER,
+        max_write_rate=None,
+        max_out_waiting=0,
+        name="serial",
+        stats=None,
+    ):
+        """
+        Add a port to the loop.
+
+        Args:
+            callback: frame handler; None for a write-only port.
+            stats (PortStats): counts the frames the callback fails on.
+            max_write_rate: enable `submit` for this port, writing at most this
+                many frames per second (0 means no rate limit). None leaves
+                the port read-only.
+        """
+        fd = serial_port.fileno()
+        if callback is not None:
+            serial_port.timeout = 0
+            self._ports[fd] = (
+                serial_port, callback, FrameAssembler(delimiter), stats, name
+            )
+            if self._epoll is not None:
+                self._epoll.register(fd, select.EPOLLIN)
+        if max_write_rate is not None:
+            with self._write_lock:
+                self._writers[fd] = (
+                    serial_port,
+                    LatestFrameSlot(max_write_rate, max_out_waiting, name),
+                )
+
+    def submit(self, serial_port, frame, latest_wins=True):
+        """
+        Queue `frame` for `serial_port`.
+
+        With `latest_wins` the frame replaces any frame not yet written;
+        otherwise it is queued and always delivered, in order. Frames for a
+        port that went away, or submitted after `stop`, are dropped.
+        """
+        with self._write_lock:
+            if self._stopped:
+                return
+            writer = self._writers.get(serial_port.fileno())
+            if writer is None:
+                # Device went away; _unregister already logged it once
+                return
+            slot = writer[1]
+            if latest_wins:
+                slot.offer(frame)
+            else:
+                slot.enqueue(frame)
+            try:
+                os.write(self._wake_w, b"\x00")
+            except BlockingIOError:
+                # Pipe already full, the loop is awake anyway
+                pass
+
+    def writer_counters(self):
+        with self._write_lock:
+            return [slot.counters() for _, slot in self._writers.values()]
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="serial_event_loop", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        with self._write_lock:
+            # submit() checks this before touching the wake pipe
+            self._stopped = True
+        self._stop_event.set()
+        try:
+            os.write(self._wake_w, b"\x00")
+        except BlockingIOError:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout=self._poll_timeout * 2)
+            self._thread = None
+        if self._epoll is not None:
+            self._epoll.close()
+            self._epoll = None
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+    def _wait(self, timeout):
+        if self._epoll is not None:
+            return [fd for fd, _ in self._epoll.poll(timeout)]
+        readable, _, _ = select.select(
+            [self._wake_r] + list(self._ports), [], [], timeout
+        )
+        return readable
+
+    def _run(self):
+        timeout = self._poll_timeout
+        while not self._stop_event.is_set():
+            try:
+                ready = self._wait(timeout)
+            except (OSError, ValueError):
+                # Descriptor closed underneath us during shutdown
+                break
+            for fd in ready:
+                if fd == self._wake_r:
+                    self._drain_wake_pipe()
+                    continue
+                self._read_port(fd)
+            next_write = self._flush_writes()
+            timeout = (
+                self._poll_timeout
+                if next_write is None
+                else min(self._poll_timeout, next_write)
+            )
+
+    def _drain_wake_pipe(self):
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _read_port(self, fd):
+        if fd not in self._ports:
+            return
+        serial_port, callback, assembler, stats, name = self._ports[fd]
+        receive_time = time.monotonic()
+        try:
+            # Everything already buffered in one read, not one line per wakeup
+            frames = assembler.read(serial_port)
+        except OSError:
+            # SerialException is an OSError; the device went away
+            self._unregister(fd)
+            return
+        for frame in frames:
+            try:
+                callback(frame, receive_time)
+            except Exception as e:
+                # One bad frame must not take the I/O thread down
+                if stats is not None:
+                    stats.record_error()
+                self._log(f"[{name}] frame handler error: {e!r}")
+
+    def _flush_writes(self):
+        """Write every due frame; return seconds until the next one is due, or None."""
+        next_write = None
+        with self._write_lock:
+            writers = list(self._writers.values())
+        for serial_port, slot in writers:
+            now = time.monotonic()
+            with self._write_lock:
+                delay = slot.wait_time(now)
+            if delay is None:
+                continue
+            if delay <= 0:
+                if _out_waiting(serial_port) > slot.max_out_waiting:
+                    with self._write_lock:
+                        slot.backlogged = True
+                    delay = 0.001
+                else:
+                    with self._write_lock:
+                        frame = slot.take()
+                    try:
+                        serial_port.write(frame)
+                    except OSError:
+                        with self._write_lock:
+                            slot.mark_failed()
+                        continue
+                    with self._write_lock:
+                        slot.mark_written(time.monotonic())
+                        delay = slot.wait_time(time.monotonic())
+                    if delay is None:
+                        continue
+            next_write = delay if next_write is None else min(next_write, delay)
+        return next_write
+
+    def _unregister(self, fd):
+        port = self._ports.pop(fd, None)
+        with self._write_lock:
+            writer = self._writers.pop(fd, None)
+        if port is None and writer is None:
+            return
+        name = port[4] if port is not None else writer[1].name
+        self._log(f"[{name}] serial port lost, removed from the event loop")
+        if self._epoll is not None:
+            try:
+                self._epoll.unregister(fd)
+            except OSError:
+                pass
+
+
+def negotiate_protocol(serial_port, requested, timeout=0.5):
+    """
+    Decide which framing to use on `serial_port`.
+
+    "json" and "binary" are returned unchanged. For "auto" the binary
+    handshake is sent and the port is read for up to `timeout` seconds; the
+    link only switches to binary if the board acknowledges, so boards still
+    running JSON firmware keep working.
+
+    The acknowledgement is read from the same port, so "auto" is only
+    reliable when no other process is reading that device at the same time.
+    """
+    if requested != SerialProtocolEnum.auto:
+        return SerialProtocolEnum(requested)
+
+    serial_port.write(handshake_request())
+    deadline = time.monotonic() + timeout
+    previous_timeout = serial_port.timeout
+    try:
+        while time.monotonic() < deadline:
+            serial_port.timeout = max(0.0, deadline - time.monotonic())
+            line = serial_port.readline()
+            if line and is_handshake_ack(line):
+                return SerialProtocolEnum.binary
+    finally:
+        serial_port.timeout = previous_timeout
+    return SerialProtocolEnum.json
+
+
+def frame_delimiter(protocol):
+    if protocol == SerialProtocolEnum.binary:
+        return BINARY_FRAME_DELIMITER
+    return JSON_FRAME_DELIMITER
+
+
+def _out_waiting(serial_port):
+    try:
+        return serial_port.out_waiting
+    except (OSError, AttributeError, NotImplementedError):
+        # Not every backend can report the output queue length
+        return 0
+
+
+class LatestFrameSlot:
+    """
+    Newest pending frame of one port plus its coalescing counters.
+
+    Not thread-safe on its own; `CoalescingWriter` and `SerialEventLoop` guard
+    it with their locks. Counters:
+
+    - coalesced: frames replaced by a newer one while waiting for the rate limit
+    - dropped: frames replaced while the UART was backed up, or lost to a write error
+    """
+
+    def __init__(self, max_rate=100.0, max_out_waiting=0, name="serial"):
+        self.name = name
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.max_out_waiting = max_out_waiting
+        self.pending = None
+        # Frames that must all be delivered in order (e.g. discrete state commands)
+        self.queued = deque()
+        self.backlogged = False
+        self.last_write = 0.0
+        self.submitted = 0
+        self.written = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def offer(self, frame):
+        self.submitted += 1
+        if self.pending is not None:
+            if self.backlogged:
+                self.dropped += 1
+            else:
+                self.coalesced += 1
+        self.pending = frame
+
+    def enqueue(self, frame):
+        """Add a frame that is never coalesced and bypasses the rate limit."""
+        self.submitted += 1
+        self.queued.append(frame)
+
+    @property
+    def idle(self):
+        return self.pending is None and not self.queued
+
+    def wait_time(self, now):
+        """Seconds until the next frame may be written, None if nothing is pending."""
+        if self.queued:
+            return 0.0
+        if self.idle:
+            return None
+        return self.last_write + self.min_interval - now
+
+    def take(self):
+        if self.queued:
+            return self.queued.popleft()
+        frame, self.pending = self.pending, None
+        self.backlogged = False
+        return frame
+
+    def mark_written(self, now):
+        self.written += 1
+        self.last_write = now
+
+    def mark_failed(self):
+        self.dropped += 1
+
+    def counters(self):
+        return {
+            "name": self.name,
+            "submitted": self.submitted,
+            "written": self.written,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+        }
+
+
+class CoalescingWriter:
+    """
+    Latest-wins write stage for one serial port.
+
+    `submit` only replaces the pending frame; a dedicated thread writes the
+    newest one at most `max_rate` times per second, and holds off while the
+    driver still has more than `max_out_waiting` bytes queued so stale
+    commands never pile up in the OS buffer. See `LatestFrameSlot` for the
+    counters.
+    """
+
+    def __init__(self, serial_port, max_rate=100.0, max_out_waiting=0, name="serial"):
+        self._serial = serial_port
+        self._slot = LatestFrameSlot(max_rate, max_out_waiting, name)
+        self.name = name
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"{name}_writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, frame):
+        with self._cond:
+            self._slot.offer(frame)
+            self._cond.notify()
+
+    def counters(self):
+        with self._cond:
+            return self._slot.counters()
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
+
+    def _run(self):
+        slot = self._slot
+        while True:
+            with self._cond:
+                while slot.idle and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                delay = slot.wait_time(time.monotonic())
+
+            # Pace writes, letting newer commands replace the pending one meanwhile
+            if delay > 0:
+                time.sleep(delay)
+
+            while _out_waiting(self._serial) > slot.max_out_waiting:
+                with self._cond:
+                    slot.backlogged = True
+                    if self._stop:
+                        return
+                time.sleep(0.001)
+
+            with self._cond:
+                frame = slot.take()
+            try:
+                self._serial.write(frame)
+            except OSError:
+                with self._cond:
+                    slot.mark_failed()
+                continue
+            with self._cond:
+                slot.mark_written(time.monotonic())
+
+
+def format_writer_counters(counters):
+    return (
+        f"{counters['name']}: submitted {counters['submitted']}, "
+        f"written {counters['written']}, coalesced {counters['coalesced']}, "
+        f"dropped {counters['dropped']}"
+    )
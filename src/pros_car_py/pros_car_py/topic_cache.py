@@ -0,0 +1,191 @@
+"""
+Latest-value cache for subscribed topics.
+
+Subscription callbacks run on the executor thread while controllers read
+from their own background threads. `TopicCache` keeps one immutable
+`TopicSample` per key (value, raw message, receive time, sequence number).
+Writers swap the sample under a lock; readers fetch it with a single dict
+lookup, which is atomic under the GIL, so a reader always sees a complete
+sample and never blocks the executor.
+
+`wait_for` lets a control loop sleep until a key gets a sample newer than
+the one it last handled instead of polling on a fixed interval; writers
+wake waiters through a condition variable on the same lock.
+
+An optional `convert` function runs once per message in the callback, so
+control loops read ready-to-use values instead of re-converting the message
+on every tick.
+
+    self.topic_cache = TopicCache()
+    self.topic_cache.subscribe(self, PoseStamped, "/goal_pose", key="goal",
+                               convert=lambda msg: [msg.pose.position.x, ...])
+    goal = self.topic_cache.get("goal", max_age=1.0)
+
+    sample = self.topic_cache.wait_for("goal", newer_than=seq, timeout=0.5)
+    samples = self.topic_cache.wait_for_any({"goal": seq, "pose": pose_seq}, 0.5)
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+TopicSample = namedtuple("TopicSample", ["value", "msg", "receive_time", "seq"])
+TopicSample.__doc__ = """\
+One cached message.
+
+value: converted value (the message itself without a converter).
+msg: raw message, None for values stored with `put`.
+receive_time: time.monotonic() when the sample was stored.
+seq: per-key counter, starting at 1 and never reset by `clear`.
+"""
+
+
+class TopicCache:
+    """
+    Args:
+        topic_qos: optional TopicQosConfig of the node; `subscribe` then takes
+            QoS and callback group of each topic from it.
+    """
+
+    def __init__(self, topic_qos=None):
+        self.topic_qos = topic_qos
+        self._samples = {}
+        self._seqs = {}
+        self._lock = threading.Lock()
+        self._updated = threading.Condition(self._lock)
+
+    # ---------------------------------------------------------------- writes
+    def update(self, key, msg, convert=None):
+        """Store `msg` (converted with `convert` if given) as the newest sample of `key`."""
+        value = msg if convert is None else convert(msg)
+        return self._store(key, value, msg)
+
+    def put(self, key, value, msg=None):
+        """Store an already converted value."""
+        return self._store(key, value, msg)
+
+    def _store(self, key, value, msg):
+        receive_time = time.monotonic()
+        with self._lock:
+            seq = self._seqs.get(key, 0) + 1
+            self._seqs[key] = seq
+            sample = TopicSample(value, msg, receive_time, seq)
+            self._samples[key] = sample
+            self._updated.notify_all()
+        return sample
+
+    def clear(self, key):
+        """Forget the current sample of `key`; its sequence counter keeps counting."""
+        with self._lock:
+            self._samples.pop(key, None)
+
+    def subscribe(self, node, msg_type, topic, key=None, convert=None, qos=10):
+        """
+        Create a subscription on `node` that stores every message under `key`
+        (default: topic). With a `topic_qos` config, `qos` is only the
+        default for topics the config does not cover.
+        """
+        key = topic if key is None else key
+
+        def callback(msg):
+            self.update(key, msg, convert)
+
+        if self.topic_qos is not None:
+            return self.topic_qos.subscribe(msg_type, topic, callback, qos)
+        return node.create_subscription(msg_type, topic, callback, qos)
+
+    # ----------------------------------------------------------------- reads
+    def sample(self, key, max_age=None):
+        """
+        Newest `TopicSample` of `key`, or None if there is none or it is
+        older than `max_age` seconds.
+        """
+        sample = self._samples.get(key)
+        if sample is None:
+            return None
+        if max_age is not None and time.monotonic() - sample.receive_time > max_age:
+            return None
+        return sample
+
+    def get(self, key, default=None, max_age=None):
+        """Newest value of `key`, or `default` if missing or stale."""
+        sample = self.sample(key, max_age)
+        return default if sample is None else sample.value
+
+    def wait_for(self, key, newer_than=None, timeout=None):
+        """
+        Block until `key` has a sample with a sequence number above `newer_than`.
+
+        Args:
+            key: cache key.
+            newer_than (int): last sequence number the caller has seen; None
+                waits for the next sample stored after this call.
+            timeout (float): seconds to wait at most, None waits forever.
+
+        Returns:
+            TopicSample or None on timeout. A sample that is already newer
+            than `newer_than` is returned without waiting.
+        """
+        with self._updated:
+            if newer_than is None:
+                newer_than = self._seqs.get(key, 0)
+            if self._updated.wait_for(
+                lambda: self._seqs.get(key, 0) > newer_than and key in self._samples,
+                timeout,
+            ):
+                return self._samples[key]
+        return None
+
+    def wait_for_any(self, newer_than, timeout=None):
+        """
+        Block until any of several keys has a sample newer than the caller's.
+
+        Args:
+            newer_than (dict): {key: last sequence number seen} of the keys
+                to wait on (0 for keys without a sample yet).
+            timeout (float): seconds to wait at most, None waits forever.
+
+        Returns:
+            {key: TopicSample} of the keys with a newer sample, empty on
+            timeout. Samples already newer are returned without waiting.
+        """
+
+        def updated():
+            return {
+                key: self._samples[key]
+                for key, seq in newer_than.items()
+                if self._seqs.get(key, 0) > seq and key in self._samples
+            }
+
+        with self._updated:
+            return self._updated.wait_for(updated, timeout)
+
+    def seq(self, key):
+        """Number of samples stored for `key` so far (0 if none)."""
+        return self._seqs.get(key, 0)
+
+    def age(self, key):
+        """Seconds since `key` was last updated, None if it has no sample."""
+        sample = self._samples.get(key)
+        if sample is None:
+            return None
+        return time.monotonic() - sample.receive_time
+
+    def snapshot(self, keys=None, max_age=None):
+        """
+        Consistent view of several keys at once, as {key: TopicSample}.
+
+        Stale or missing keys are left out.
+        """
+        with self._lock:
+            samples = dict(self._samples)
+        if keys is not None:
+            samples = {key: samples[key] for key in keys if key in samples}
+        if max_age is not None:
+            now = time.monotonic()
+            samples = {
+                key: sample
+                for key, sample in samples.items()
+                if now - sample.receive_time <= max_age
+            }
+        return samples
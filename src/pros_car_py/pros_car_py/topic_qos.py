@@ -0,0 +1,270 @@
+"""
+Per-topic subscription QoS and callback groups.
+
+Nodes create their subscriptions through `TopicQosConfig.subscribe` instead
+of `create_subscription` with a hard-coded depth. The QoS profile and the
+callback group of every topic come from a YAML file (by default
+config/topic_qos.yaml of this package) and can be overridden per node with
+ROS parameters, so sensor topics can be tuned without editing code:
+
+    ros2 run pros_car_py robot_control --ros-args \\
+        -p qos.scan.reliability:=best_effort -p qos.scan.depth:=1
+
+The parameter prefix of a topic is its name without the leading slash and
+with "/" replaced by ".", e.g. /yolo/detection/offset -> qos.yolo.detection.offset.
+Topics without an entry keep the QoS given in the code.
+
+With `qos_report_period` > 0 every subscription also records its rate,
+queue latency (callback start minus header stamp, for stamped messages)
+and callback duration, and the node logs one line per topic each period.
+"""
+
+import time
+
+from rclpy.callback_groups import (
+    MutuallyExclusiveCallbackGroup,
+    ReentrantCallbackGroup,
+)
+from rclpy.qos import (
+    DurabilityPolicy,
+    HistoryPolicy,
+    QoSProfile,
+    ReliabilityPolicy,
+)
+
+from pros_car_py.package_config import load_config
+from pros_car_py.serial_io import PortStats
+
+RELIABILITY_POLICIES = {
+    "reliable": ReliabilityPolicy.RELIABLE,
+    "best_effort": ReliabilityPolicy.BEST_EFFORT,
+}
+HISTORY_POLICIES = {
+    "keep_last": HistoryPolicy.KEEP_LAST,
+    "keep_all": HistoryPolicy.KEEP_ALL,
+}
+DURABILITY_POLICIES = {
+    "volatile": DurabilityPolicy.VOLATILE,
+    "transient_local": DurabilityPolicy.TRANSIENT_LOCAL,
+}
+CALLBACK_GROUP_TYPES = {
+    "mutually_exclusive": MutuallyExclusiveCallbackGroup,
+    "reentrant": ReentrantCallbackGroup,
+}
+
+
+def load_topic_config(path=None):
+    """
+    Read a topic QoS YAML file.
+
+    Args:
+        path (str): file to read; None reads the installed default and
+            returns an empty config when there is none.
+    """
+    return load_config("topic_qos.yaml", path, "topic QoS config")
+
+
+def parameter_prefix(topic):
+    """ROS parameter prefix of `topic`, e.g. /imu/data -> qos.imu.data."""
+    return "qos." + topic.strip("/").replace("/", ".")
+
+
+def _policy(policies, value, field, topic):
+    try:
+        return policies[value]
+    except KeyError:
+        raise ValueError(
+            f"Invalid {field} '{value}' for topic {topic}, expected one of {sorted(policies)}"
+        )
+
+
+def format_topic_stats(stats):
+    """One-line summary of one entry of TopicQosConfig.stats()."""
+    line = f"{stats['name']}: {stats['rate']:.1f} msg/s (total {stats['frames']}), "
+    if not stats["latency_samples"]:
+        line += "queue latency n/a (no header stamp)"
+    else:
+        line += (
+            f"queue latency avg {stats['latency_avg_ms']:.3f} ms "
+            f"p50 {stats['latency_p50_ms']:.3f} ms "
+            f"p99 {stats['latency_p99_ms']:.3f} ms "
+            f"max {stats['latency_max_ms']:.3f} ms"
+        )
+    return line + (
+        f", callback p50 {stats['callback_p50_ms']:.3f} ms "
+        f"p99 {stats['callback_p99_ms']:.3f} ms "
+        f"max {stats['callback_max_ms']:.3f} ms"
+    )
+
+
+class TopicQosConfig:
+    """
+    QoS and callback group lookup for the subscriptions of one node.
+
+    Node parameters:
+        qos_config (str): YAML file to use instead of the installed default.
+        qos_report_period (float): seconds between topic reports, 0 disables
+            them (default from the file's `report_period`).
+        qos.<topic>.profile / depth / reliability / callback_group: per-topic
+            overrides, declared when the topic is subscribed.
+    """
+
+    def __init__(self, node, config=None):
+        self._node = node
+        if config is None:
+            path = node.declare_parameter("qos_config", "").value
+            config = load_topic_config(path or None)
+        self._profiles = config.get("profiles") or {}
+        self._group_types = config.get("callback_groups") or {}
+        self._topics = config.get("topics") or {}
+        self._groups = {}
+        self._stats = {}
+        self.report_period = node.declare_parameter(
+            "qos_report_period", float(config.get("report_period", 0.0))
+        ).value
+        self._report_timer = None
+        if self.report_period > 0:
+            self._report_timer = node.create_timer(self.report_period, self.report)
+
+    def _entry(self, topic):
+        # Relative names match their absolute form in the file
+        entry = self._topics.get(topic)
+        if entry is None:
+            entry = self._topics.get("/" + topic.lstrip("/"))
+        return entry or {}
+
+    def _parameter(self, name, default):
+        node = self._node
+        if node.has_parameter(name):
+            return node.get_parameter(name).value
+        return node.declare_parameter(name, default).value
+
+    def qos(self, topic, default=10):
+        """
+        QoSProfile for subscribing to `topic`.
+
+        Args:
+            default: QoSProfile or history depth the code would use without
+                a config entry.
+        """
+        if isinstance(default, QoSProfile):
+            settings = {
+                "reliability": default.reliability,
+                "history": default.history,
+                "durability": default.durability,
+                "depth": default.depth,
+            }
+        else:
+            settings = {
+                "reliability": ReliabilityPolicy.RELIABLE,
+                "history": HistoryPolicy.KEEP_LAST,
+                "durability": DurabilityPolicy.VOLATILE,
+                "depth": int(default),
+            }
+        entry = self._entry(topic)
+        prefix = parameter_prefix(topic)
+
+        profile_name = self._parameter(f"{prefix}.profile", entry.get("profile", ""))
+        values = {}
+        if profile_name:
+            if profile_name not in self._profiles:
+                raise ValueError(f"Unknown QoS profile '{profile_name}' for topic {topic}")
+            values.update(self._profiles[profile_name])
+        values.update({k: v for k, v in entry.items() if k in settings})
+
+        if "reliability" in values:
+            settings["reliability"] = _policy(
+                RELIABILITY_POLICIES, values["reliability"], "reliability", topic
+            )
+        if "history" in values:
+            settings["history"] = _policy(
+                HISTORY_POLICIES, values["history"], "history", topic
+            )
+        if "durability" in values:
+            settings["durability"] = _policy(
+                DURABILITY_POLICIES, values["durability"], "durability", topic
+            )
+        settings["depth"] = int(values.get("depth", settings["depth"]))
+
+        # Parameters override the file; their defaults show the resolved values
+        reliability_names = {v: k for k, v in RELIABILITY_POLICIES.items()}
+        reliability = self._parameter(
+            f"{prefix}.reliability", reliability_names[settings["reliability"]]
+        )
+        settings["reliability"] = _policy(
+            RELIABILITY_POLICIES, reliability, "reliability", topic
+        )
+        settings["depth"] = self._parameter(f"{prefix}.depth", settings["depth"])
+        return QoSProfile(**settings)
+
+    def callback_group(self, topic):
+        """Callback group of `topic`, None for the node's default group."""
+        entry = self._entry(topic)
+        name = self._parameter(
+            f"{parameter_prefix(topic)}.callback_group",
+            entry.get("callback_group", ""),
+        )
+        if not name:
+            return None
+        group = self._groups.get(name)
+        if group is None:
+            group_type = self._group_types.get(name, "mutually_exclusive")
+            group = _policy(CALLBACK_GROUP_TYPES, group_type, "callback group type", topic)()
+            self._groups[name] = group
+        return group
+
+    def subscribe(self, msg_type, topic, callback, qos=10):
+        """create_subscription on the node with the configured QoS and callback group."""
+        if self.report_period > 0:
+            callback = self._recording(topic, callback)
+        return self._node.create_subscription(
+            msg_type,
+            topic,
+            callback,
+            self.qos(topic, qos),
+            callback_group=self.callback_group(topic),
+        )
+
+    def _recording(self, topic, callback):
+        stats = self._stats.get(topic)
+        if stats is None:
+            # (queue latency, callback duration)
+            stats = self._stats[topic] = (PortStats(topic), PortStats(topic))
+        queue, duration = stats
+        clock = self._node.get_clock()
+
+        def recording_callback(msg):
+            start = time.monotonic()
+            header = getattr(msg, "header", None)
+            stamp = header.stamp if header is not None else None
+            if stamp is not None and (stamp.sec or stamp.nanosec):
+                queue.record(stamp.sec + stamp.nanosec * 1e-9, clock.now().nanoseconds * 1e-9)
+            else:
+                queue.record_message()
+            try:
+                return callback(msg)
+            finally:
+                duration.record(start)
+
+        return recording_callback
+
+    def stats(self):
+        """
+        Statistics of every recorded topic since the previous call: the
+        PortStats.snapshot() of its queue latency plus callback_p50_ms,
+        callback_p99_ms and callback_max_ms.
+        """
+        results = []
+        for queue, duration in self._stats.values():
+            stats = queue.snapshot()
+            callback = duration.snapshot()
+            stats["callback_p50_ms"] = callback["latency_p50_ms"]
+            stats["callback_p99_ms"] = callback["latency_p99_ms"]
+            stats["callback_max_ms"] = callback["latency_max_ms"]
+            results.append(stats)
+        return results
+
+    def report(self):
+        logger = self._node.get_logger()
+        for stats in self.stats():
+            logger.info(format_topic_stats(stats))
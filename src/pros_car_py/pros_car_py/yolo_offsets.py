@@ -0,0 +1,110 @@
+"""
+Parsing of the YOLO object offsets published on /yolo/object/offset.
+
+The detector publishes a JSON list of objects on a std_msgs/String:
+
+    [{"label": "ball", "offset_flu": [0.52, -0.03, 0.11]}, ...]
+
+`parse_object_offsets` turns it into the {label: [x, y, z]} mapping the
+car and arm nodes cache as "object_coordinates". Well-formed items (three
+floats) are accepted with plain type tests on the orjson result; anything
+else is validated by the ObjectOffset model, which keeps the coercion of
+the previous float() conversion, and skipped with a warning if invalid.
+
+Detectors can publish custome_interfaces/ObjectOffsets on
+/yolo/object/offset_typed instead, which `object_offsets_from_msg` reads
+without any JSON decoding.
+"""
+
+from array import array
+from typing import Tuple
+
+import numpy as np
+import orjson
+import pydantic
+
+OBJECT_OFFSET_TOPIC = "/yolo/object/offset"
+OBJECT_OFFSET_TYPED_TOPIC = "/yolo/object/offset_typed"
+
+
+class ObjectOffset(pydantic.BaseModel):
+    label: str
+    offset_flu: Tuple[float, float, float]
+
+
+def _object_offset(item):
+    """[x, y, z] of a well-formed item, None if it needs the model."""
+    if type(item) is not dict:
+        return None
+    offset = item.get("offset_flu")
+    if (
+        type(offset) is list
+        and len(offset) == 3
+        and type(offset[0]) is float
+        and type(offset[1]) is float
+        and type(offset[2]) is float
+        and type(item.get("label")) is str
+    ):
+        return offset
+    return None
+
+
+def parse_object_offsets(data, warn=None):
+    """
+    Parse a /yolo/object/offset JSON list into {label: [x, y, z]}.
+
+    Args:
+        data (str | bytes): JSON text of the message.
+        warn: optional callable receiving a message for every skipped item.
+
+    Raises:
+        orjson.JSONDecodeError: `data` is not valid JSON (a subclass of
+            json.JSONDecodeError).
+    """
+    object_list = orjson.loads(data)
+    if type(object_list) is not list:
+        if warn is not None:
+            warn(f"Expected a JSON list of objects, got: {object_list}")
+        return {}
+
+    coordinates = {}
+    for item in object_list:
+        offset = _object_offset(item)
+        if offset is not None:
+            coordinates[item["label"]] = offset
+            continue
+        try:
+            model = ObjectOffset.model_validate(item)
+        except pydantic.ValidationError:
+            if warn is not None:
+                warn(f"Skipping invalid item in JSON list: {item}")
+            continue
+        coordinates[model.label] = list(model.offset_flu)
+    return coordinates
+
+
+def object_offsets_from_msg(msg):
+    """
+    {label: [x, y, z]} of a custome_interfaces/ObjectOffsets message.
+
+    Raises:
+        ValueError: offsets_flu does not hold three values per label.
+    """
+    labels = msg.labels
+    offsets = np.asarray(msg.offsets_flu, dtype=np.float64)
+    if offsets.size != 3 * len(labels):
+        raise ValueError(
+            f"ObjectOffsets has {len(labels)} labels but {offsets.size} offset values"
+        )
+    return dict(zip(labels, offsets.reshape(-1, 3).tolist()))
+
+
+def fill_object_offsets_msg(msg, coordinates):
+    """
+    Fill a custome_interfaces/ObjectOffsets message from {label: [x, y, z]},
+    for detectors publishing the typed topic. The header is left to the caller.
+    """
+    msg.labels = list(coordinates)
+    offsets = np.asarray(list(coordinates.values()), dtype=np.float32).reshape(-1)
+    msg.offsets_flu = array("f", offsets.tobytes())
+    return msg
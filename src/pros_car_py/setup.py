@@ -10,6 +10,7 @@ setup(
     data_files=[
         ("share/ament_index/resource_index/packages", ["resource/" + package_name]),
         ("share/" + package_name, ["package.xml"]),
+        (os.path.join("share", package_name, "config"), glob("config/*.yaml")),
         # ("share/" + package_name + "/launch", glob("launch/*.launch.py")),
     ],
     install_requires=["setuptools"],
@@ -27,8 +28,15 @@ setup(
             "arm_reader = pros_car_py.arm_reader:main",
             "arm_writer = pros_car_py.arm_writer:main",
             "crane_writer = pros_car_py.crane_writer:main",
+            "serial_gateway = pros_car_py.serial_gateway:main",
             "arm_test = pros_car_py.arm_test:main",
             "lidar_trans = pros_car_py.lidar_trans:main",
+            "bench_car_models = pros_car_py.benchmarks.car_models_bench:main",
+            "bench_serial = pros_car_py.benchmarks.serial_bench:main",
+            "bench_publish = pros_car_py.benchmarks.publish_bench:main",
+            "esp32_emulator = pros_car_py.benchmarks.esp32_emulator:main",
+            "nav_replay = pros_car_py.benchmarks.nav_replay_bench:main",
+            "nav_recorder = pros_car_py.benchmarks.nav_recorder:main",
         ],
     },
 )
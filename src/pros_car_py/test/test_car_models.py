@@ -0,0 +1,119 @@
+import orjson
+import pytest
+
+from pros_car_py.car_models import (
+    FrameError,
+    FrameType,
+    SerialProtocolEnum,
+    cobs_decode,
+    cobs_encode,
+    crc16_ccitt,
+    decode_car_c_control,
+    decode_car_c_state_frame,
+    decode_frame,
+    decode_servo_angles,
+    decode_servo_current_angles_frame,
+    encode_car_c_control_frame,
+    encode_car_c_state,
+    encode_frame,
+    encode_servo_angles,
+    encode_servo_target_angles_frame,
+    validate_car_c_control,
+    validate_car_c_state,
+)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", b"\x00", b"\x00\x00", b"abc", b"a\x00b\x00", bytes(range(256)), b"\x01" * 300],
+)
+def test_cobs_round_trip(data):
+    encoded = cobs_encode(data)
+    assert b"\x00" not in encoded
+    assert cobs_decode(encoded) == data
+
+
+def test_crc16_ccitt_check_value():
+    # CRC-16/CCITT-FALSE check value
+    assert crc16_ccitt(b"123456789") == 0x29B1
+
+
+def test_frame_round_trip():
+    frame = encode_frame(FrameType.car_C_state, b"\x01\x02\x00\x03")
+    assert frame.endswith(b"\x00")
+    assert decode_frame(frame) == (FrameType.car_C_state, b"\x01\x02\x00\x03")
+    assert decode_frame(frame[:-1]) == (FrameType.car_C_state, b"\x01\x02\x00\x03")
+
+
+def test_decode_frame_rejects_corruption():
+    body = cobs_decode(encode_frame(FrameType.car_C_state, b"\x01\x02")[:-1])
+    corrupted = bytes((body[0],)) + b"\x09" + body[2:]
+    with pytest.raises(FrameError, match="CRC"):
+        decode_frame(cobs_encode(corrupted))
+    with pytest.raises(FrameError, match="too short"):
+        decode_frame(cobs_encode(b"\x01"))
+
+
+def test_car_c_control_frames():
+    binary = encode_car_c_control_frame([1.5, -2.0], SerialProtocolEnum.binary)
+    frame_type, payload = decode_frame(binary)
+    assert frame_type == FrameType.car_C_control
+    assert decode_car_c_control(payload) == [1.5, -2.0]
+    json_line = encode_car_c_control_frame([1.5, -2.0], SerialProtocolEnum.json)
+    assert orjson.loads(json_line) == {"target_vel": [1.5, -2.0]}
+    assert json_line.endswith(b"\n")
+
+
+def test_decode_car_c_state_frame_json_and_binary():
+    expected = {"vels": [1.0, 2.0], "encoders": [3, -4]}
+    assert decode_car_c_state_frame(b'{"vels": [1, 2.0], "encoders": [3, -4]}') == expected
+    assert decode_car_c_state_frame(encode_car_c_state([1.0, 2.0], [3, -4])) == expected
+
+
+@pytest.mark.parametrize(
+    "frame",
+    [
+        b'{"vels": "x"}',
+        b'{"vels": [1.0], "encoders": 5}',
+        b'{"vels": ["a"], "encoders": [1]}',
+        b"[1, 2]",
+        b"3",
+        encode_frame(FrameType.car_C_control, b"\x00" * 8),
+        encode_frame(FrameType.car_C_state, b"\x00" * 3),
+    ],
+)
+def test_decode_car_c_state_frame_wrong_shape_raises_frame_error(frame):
+    with pytest.raises(FrameError):
+        decode_car_c_state_frame(frame)
+
+
+def test_decode_car_c_state_frame_invalid_json():
+    with pytest.raises(orjson.JSONDecodeError):
+        decode_car_c_state_frame(b'{"vels": ')
+
+
+def test_validators_fast_path_and_model_fallback():
+    state = {"vels": [1, 2], "encoders": [1, 2]}
+    assert validate_car_c_state(state) == {"vels": [1.0, 2.0], "encoders": [1, 2]}
+    assert validate_car_c_control({"target_vel": [1, 2.5]}) == [1.0, 2.5]
+    # Not the fast path: coerced by the pydantic model
+    assert validate_car_c_control({"target_vel": ["1.5", 2]}) == [1.5, 2.0]
+
+
+def test_servo_angles_round_trip():
+    angles = [0.0, 90.0, 180.0, 45.5, 10.0]
+    frame = encode_servo_target_angles_frame(angles, SerialProtocolEnum.binary)
+    frame_type, payload = decode_frame(frame)
+    assert frame_type == FrameType.servo_target_angles
+    assert decode_servo_angles(payload) == angles
+    current = encode_servo_angles(FrameType.servo_current_angles, angles)
+    assert decode_servo_current_angles_frame(current) == angles
+    assert decode_servo_current_angles_frame(b'{"servo_current_angles": [1, 2]}') == [1, 2]
+
+
+def test_decode_servo_angles_checks_length():
+    _, payload = decode_frame(encode_servo_angles(FrameType.servo_current_angles, [1.0, 2.0]))
+    assert decode_servo_angles(payload) == [1.0, 2.0]
+    for bad in (b"", payload[:-1], payload + b"\x00\x00\x00\x00"):
+        with pytest.raises(FrameError):
+            decode_servo_angles(bad)
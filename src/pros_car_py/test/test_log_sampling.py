@@ -0,0 +1,47 @@
+from pros_car_py.log_sampling import LogSampler
+
+
+class FakeNode:
+    def __init__(self):
+        self.timers = []
+
+    def create_timer(self, period, callback):
+        self.timers.append((period, callback))
+        return object()
+
+
+def test_first_value_is_emitted_and_the_rest_aggregated():
+    lines = []
+    sampler = LogSampler(lines.append, period=60.0)
+    for value in (3.0, 1.0, 5.0):
+        sampler.log("speed", value)
+    assert lines == ["speed: 3.0"]
+    sampler.flush()
+    assert lines[1].startswith("speed: 2 in ")
+    assert lines[1].endswith("last 5.0, min 1.0, max 5.0")
+    # Nothing new since the last summary
+    sampler.flush()
+    assert len(lines) == 2
+
+
+def test_sequences_get_element_wise_ranges():
+    lines = []
+    sampler = LogSampler(lines.append, period=60.0)
+    sampler.log("vel", [0.0, 0.0])
+    sampler.log("vel", [1.0, -2.0])
+    sampler.log("vel", [-1.0, 2.0])
+    sampler.flush()
+    assert lines[-1].endswith("min [-1.0, -2.0], max [1.0, 2.0]")
+
+
+def test_node_timer_flushes_quiet_streams():
+    node = FakeNode()
+    lines = []
+    sampler = LogSampler(lines.append, period=0.5, node=node)
+    assert [period for period, _ in node.timers] == [0.5]
+    sampler.log("angles", [1.0])
+    sampler.log("angles", [2.0])
+    # The stream went quiet; the timer still reports the last window
+    node.timers[0][1]()
+    assert lines[-1].startswith("angles: 1 in ")
+    assert LogSampler(lines.append, period=0.0, node=node).timer is None
@@ -0,0 +1,137 @@
+from types import SimpleNamespace
+
+from pros_car_py.mission import MissionConfig, MissionExecutor
+
+WAYPOINTS = [[0.0, 0.0], [1.0, 0.0], [2.0, 0.0]]
+
+
+class FakeNavProcessing:
+    """Nav2Processing stand-in: drives while it has a plan, arrives on demand."""
+
+    def __init__(self):
+        self.plan = None
+        self.arrived = False
+        self.goals = []
+
+    def reset_nav_process(self):
+        self.plan = None
+        self.arrived = False
+
+    def has_plan(self):
+        return self.plan is not None
+
+    def use_plan(self, plan):
+        self.plan = plan
+
+    def get_command_from_nav2_plan(self, goal_coordinates=None):
+        self.goals.append(goal_coordinates)
+        return "FORWARD" if self.plan is not None else "STOP"
+
+    def get_finish_flag(self):
+        return self.arrived
+
+
+def make_mission(loop=False, prefetch=True):
+    nav = FakeNavProcessing()
+    requests = []
+
+    def request_plan(start, goal, done, planner_id):
+        requests.append((start, goal, done))
+
+    mission = MissionExecutor(
+        nav,
+        MissionConfig(WAYPOINTS, loop, prefetch, ""),
+        request_plan=request_plan,
+        log=lambda message: None,
+    )
+    return mission, nav, requests
+
+
+def plan(name):
+    return SimpleNamespace(name=name, poses=[name])
+
+
+def test_prefetched_plan_chains_the_next_leg_in_the_same_tick():
+    mission, nav, requests = make_mission()
+    assert mission.step() == "STOP"
+    # Leg 0 is followed from Nav2; the plan of leg 1 is requested right away
+    assert [(start, goal) for start, goal, _ in requests] == [(WAYPOINTS[0], WAYPOINTS[1])]
+    nav.plan = plan("nav2 leg 0")
+    assert mission.step() == "FORWARD"
+    requests[0][2](plan("leg 1"))
+
+    nav.arrived = True
+    assert mission.step() == "FORWARD"
+    assert mission.index == 1
+    assert nav.plan.name == "leg 1"
+    assert nav.goals[-1] == WAYPOINTS[1]
+    assert requests[1][:2] == (WAYPOINTS[1], WAYPOINTS[2])
+    assert mission.stats()["prefetched"] == 1
+
+
+def test_leg_without_prefetched_plan_waits_for_nav2():
+    mission, nav, requests = make_mission(prefetch=False)
+    nav.plan = plan("nav2 leg 0")
+    mission.step()
+    nav.arrived = True
+    assert mission.step() == "STOP"
+    assert mission.index == 1
+    assert requests == []
+    nav.plan = plan("nav2 leg 1")
+    assert mission.step() == "FORWARD"
+    assert mission.stats()["waited"] == 1
+
+
+def test_mission_finishes_and_restarts_from_the_first_waypoint():
+    mission, nav, _ = make_mission(loop=False)
+    for _ in WAYPOINTS:
+        nav.plan = plan("nav2")
+        mission.step()
+        nav.arrived = True
+        mission.step()
+    assert mission.finished
+    assert mission.step() == "STOP"
+    assert mission.stats()["arrivals"] == len(WAYPOINTS)
+
+    mission.start()
+    assert not mission.finished
+    assert mission.index == 0
+    assert mission.step() == "STOP"
+    nav.plan = plan("nav2 again")
+    assert mission.step() == "FORWARD"
+    assert nav.goals[-1] == WAYPOINTS[0]
+
+
+def test_looping_mission_wraps_around():
+    mission, nav, _ = make_mission(loop=True)
+    for _ in WAYPOINTS:
+        nav.plan = plan("nav2")
+        mission.step()
+        nav.arrived = True
+        mission.step()
+    assert not mission.finished
+    assert mission.index == 0
+
+
+def test_plans_requested_before_a_restart_are_dropped():
+    mission, nav, requests = make_mission()
+    mission.step()
+    stale_done = requests[0][2]
+    mission.start()
+    mission.step()
+    stale_done(plan("stale leg 1"))
+
+    nav.plan = plan("nav2 leg 0")
+    nav.arrived = True
+    assert mission.step() == "STOP"
+    assert nav.plan is None
+
+    # The request made after the restart still delivers
+    mission, nav, requests = make_mission()
+    mission.step()
+    mission.start()
+    mission.step()
+    requests[-1][2](plan("fresh leg 1"))
+    nav.arrived = True
+    assert mission.step() == "FORWARD"
+    assert nav.plan.name == "fresh leg 1"
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from pros_car_py.path_index import PathIndex
+
+
+def straight_path(length=5.0, spacing=0.1):
+    x = np.arange(0.0, length + spacing / 2, spacing)
+    return np.column_stack((x, np.zeros_like(x)))
+
+
+def test_path_index_needs_a_pose():
+    with pytest.raises(ValueError):
+        PathIndex(np.zeros((0, 2)))
+
+
+def test_lookahead_along_straight_path():
+    path_index = PathIndex(straight_path())
+    index, projection = path_index.lookahead([1.02, 0.3], 0.5)
+    assert projection.segment == 10
+    assert projection.arc_length == pytest.approx(1.02)
+    assert projection.distance == pytest.approx(0.3)
+    # First pose at least 1.52 m along the path
+    assert index == 16
+    assert path_index.point_at(1.52) == pytest.approx([1.52, 0.0])
+
+
+def test_lookahead_clamps_to_the_last_pose():
+    path_index = PathIndex(straight_path())
+    index, projection = path_index.lookahead([4.9, 0.0], 2.0)
+    assert index == len(path_index) - 1
+    assert path_index.point_at(projection.arc_length + 2.0) == pytest.approx([5.0, 0.0])
+
+
+def test_lookahead_follows_the_turn_of_an_l_path():
+    leg = np.arange(0.0, 2.0, 0.1)
+    points = np.vstack(
+        (
+            np.column_stack((leg, np.zeros_like(leg))),
+            np.column_stack((np.full_like(leg, 2.0), leg)),
+        )
+    )
+    path_index = PathIndex(points)
+    index, projection = path_index.lookahead([1.8, 0.05], 0.5, start_segment=15)
+    assert projection.arc_length == pytest.approx(1.8)
+    assert points[index] == pytest.approx([2.0, 0.3])
+
+
+def test_projection_falls_back_to_the_whole_path():
+    path_index = PathIndex(straight_path(10.0), search_window=1.0)
+    # Relocalised far behind the segment reached last time
+    projection = path_index.project([1.0, 0.0], start_segment=80)
+    assert projection.arc_length == pytest.approx(1.0)
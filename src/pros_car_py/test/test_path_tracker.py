@@ -0,0 +1,38 @@
+import math
+import os
+
+import numpy as np
+
+from pros_car_py.path_index import PathIndex
+from pros_car_py.path_tracker import PurePursuitTracker, TrackerConfig, load_tracker_config
+
+
+def straight_path(length=5.0, spacing=0.1):
+    x = np.arange(0.0, length + spacing / 2, spacing)
+    return np.column_stack((x, np.zeros_like(x)))
+
+
+def test_pure_pursuit_drives_straight_and_finishes():
+    tracker = PurePursuitTracker(TrackerConfig(controller="pure_pursuit"))
+    tracker.set_path(PathIndex(straight_path()))
+    command = tracker.step([0.0, 0.0], 0.0)
+    assert not command.finished
+    left, right = command.wheels[:2]
+    assert left == right
+    assert left > 0.0
+    assert tracker.step([4.8, 0.0], 0.0).finished
+
+
+def test_pure_pursuit_turns_in_place_towards_a_target_behind():
+    config = TrackerConfig(controller="pure_pursuit")
+    tracker = PurePursuitTracker(config)
+    tracker.set_path(PathIndex(straight_path()))
+    command = tracker.step([0.0, 0.0], math.pi)
+    assert command.speed == 0.0
+    assert abs(command.wheels[0]) == config.rotate_wheel_speed
+    assert command.wheels[0] == -command.wheels[1]
+
+
+def test_config_file_matches_the_defaults():
+    path = os.path.join(os.path.dirname(__file__), "..", "config", "path_tracker.yaml")
+    assert load_tracker_config(path) == TrackerConfig()
@@ -0,0 +1,42 @@
+import threading
+import time
+
+import pytest
+
+from pros_car_py.rate_loop import RateLoop
+
+
+def test_rate_loop_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        RateLoop(0.0)
+    with pytest.raises(ValueError):
+        RateLoop(10.0, overrun="wait")
+
+
+def test_rate_loop_keeps_a_fixed_schedule():
+    loop = RateLoop(100.0)
+    start = time.monotonic()
+    for _ in range(11):
+        assert loop.sleep()
+    # Ten periods after the first, immediate tick
+    assert time.monotonic() - start >= 0.1 - 1e-3
+    assert loop.ticks == 11
+
+
+def test_rate_loop_skips_missed_periods():
+    loop = RateLoop(100.0, overrun="skip")
+    loop.sleep()
+    time.sleep(0.055)
+    loop.sleep()
+    assert loop.overruns == 1
+    assert loop.skipped >= 4
+
+
+def test_rate_loop_stops_on_event():
+    stop_event = threading.Event()
+    loop = RateLoop(1.0)
+    assert loop.sleep(stop_event)
+    stop_event.set()
+    started = time.monotonic()
+    assert not loop.sleep(stop_event)
+    assert time.monotonic() - started < 0.5
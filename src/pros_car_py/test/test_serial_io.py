@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+
+from pros_car_py.car_models import BINARY_FRAME_DELIMITER
+from pros_car_py.serial_io import (
+    FrameAssembler,
+    LatestFrameSlot,
+    PortStats,
+    SerialEventLoop,
+)
+
+
+class PipePort:
+    """Serial port stand-in backed by a pipe: the test writes, the loop reads."""
+
+    port = "/dev/pipe"
+
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+        self.timeout = None
+        self.written = []
+
+    def fileno(self):
+        return self.read_fd
+
+    @property
+    def in_waiting(self):
+        return 4096
+
+    def read(self, size):
+        try:
+            return os.read(self.read_fd, size)
+        except BlockingIOError:
+            return b""
+
+    def write(self, frame):
+        self.written.append(frame)
+
+    def close(self):
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
+def test_frame_assembler_keeps_partial_frames():
+    assembler = FrameAssembler()
+    assert assembler.feed(b'{"a": 1}\n{"b"') == [b'{"a": 1}']
+    assert len(assembler) == 4
+    assert assembler.feed(b": 2}\n\n") == [b'{"b": 2}']
+    assert len(assembler) == 0
+    assert assembler.frames == 2
+
+
+def test_frame_assembler_binary_delimiter_and_overflow():
+    assembler = FrameAssembler(BINARY_FRAME_DELIMITER, max_frame_size=8)
+    assert assembler.feed(b"\x01\x02\x00\x03") == [b"\x01\x02"]
+    assert assembler.feed(b"\x04" * 10) == []
+    assert assembler.overflows == 1
+    assert len(assembler) == 0
+
+
+def test_latest_frame_slot_coalesces_and_queues():
+    slot = LatestFrameSlot(max_rate=10.0)
+    slot.offer(b"a")
+    slot.offer(b"b")
+    slot.enqueue(b"q")
+    assert slot.wait_time(0.0) == 0.0
+    # Queued frames go first and are never coalesced
+    assert slot.take() == b"q"
+    assert slot.take() == b"b"
+    slot.mark_written(1.0)
+    assert slot.idle
+    assert slot.wait_time(1.0) is None
+    slot.offer(b"c")
+    assert abs(slot.wait_time(1.0) - 0.1) < 1e-9
+    counters = slot.counters()
+    assert counters["submitted"] == 4
+    assert counters["coalesced"] == 1
+    assert counters["written"] == 1
+
+
+def test_event_loop_survives_callback_errors():
+    port = PipePort()
+    stats = PortStats("pipe")
+    frames = []
+    logs = []
+    done = threading.Event()
+
+    def callback(frame, receive_time):
+        if frame == b"bad":
+            raise ValueError("bad frame")
+        frames.append(frame)
+        if frame == b"last":
+            done.set()
+
+    loop = SerialEventLoop(poll_timeout=0.05, log=logs.append)
+    loop.register(port, callback, name="pipe", stats=stats)
+    loop.start()
+    try:
+        os.write(port.write_fd, b"first\nbad\nlast\n")
+        assert done.wait(2.0)
+    finally:
+        loop.stop()
+        port.close()
+    assert frames == [b"first", b"last"]
+    assert stats.snapshot()["errors"] == 1
+    assert any("bad frame" in line for line in logs)
+
+
+def test_event_loop_submit_writes_in_order_and_ignores_lost_ports():
+    port = PipePort()
+    loop = SerialEventLoop(poll_timeout=0.05, log=lambda message: None)
+    loop.register(port, max_write_rate=0.0, name="pipe")
+    loop.start()
+    try:
+        for frame in (b"1", b"2", b"3"):
+            loop.submit(port, frame, latest_wins=False)
+        for _ in range(100):
+            if len(port.written) == 3:
+                break
+            time.sleep(0.01)
+        assert port.written == [b"1", b"2", b"3"]
+        # Device unplugged: later commands are dropped, not a KeyError
+        loop._unregister(port.fileno())
+        loop.submit(port, b"4")
+    finally:
+        loop.stop()
+    # Subscriptions may still fire after stop()
+    loop.submit(port, b"5")
+    port.close()
+    assert port.written == [b"1", b"2", b"3"]
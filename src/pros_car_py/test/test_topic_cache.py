@@ -0,0 +1,47 @@
+import threading
+import time
+
+from pros_car_py.topic_cache import TopicCache
+
+
+def test_topic_cache_converts_and_counts():
+    cache = TopicCache()
+    assert cache.get("pose", default="none") == "none"
+    assert cache.seq("pose") == 0
+    cache.update("pose", {"x": 1.0}, convert=lambda msg: msg["x"])
+    sample = cache.sample("pose")
+    assert sample.value == 1.0
+    assert sample.msg == {"x": 1.0}
+    assert sample.seq == 1
+    cache.put("pose", 2.0)
+    assert cache.get("pose") == 2.0
+    assert cache.seq("pose") == 2
+
+
+def test_topic_cache_max_age():
+    cache = TopicCache()
+    cache.put("goal", [1.0, 2.0])
+    assert cache.get("goal", max_age=10.0) == [1.0, 2.0]
+    time.sleep(0.02)
+    assert cache.get("goal", max_age=0.01) is None
+
+
+def test_wait_for_returns_newer_samples_only():
+    cache = TopicCache()
+    cache.put("goal", 1)
+    assert cache.wait_for("goal", newer_than=0, timeout=0.0).value == 1
+    assert cache.wait_for("goal", newer_than=1, timeout=0.01) is None
+
+    threading.Timer(0.02, cache.put, ("goal", 2)).start()
+    assert cache.wait_for("goal", newer_than=1, timeout=2.0).value == 2
+
+
+def test_wait_for_any_wakes_on_any_key():
+    cache = TopicCache()
+    cache.put("pose", "p")
+    assert cache.wait_for_any({"pose": 1, "plan": 0}, timeout=0.01) == {}
+
+    threading.Timer(0.02, cache.put, ("plan", "path")).start()
+    samples = cache.wait_for_any({"pose": 1, "plan": 0}, timeout=2.0)
+    assert list(samples) == ["plan"]
+    assert samples["plan"].value == "path"
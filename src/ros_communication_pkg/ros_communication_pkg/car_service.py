@@ -5,13 +5,7 @@ from sensor_msgs.msg import LaserScan
 from std_msgs.msg import Float32MultiArray
 from geometry_msgs.msg import PoseWithCovarianceStamped, PoseStamped
 from custome_interfaces.srv import GetScan
-
-# LiDAR global constants
-LIDAR_RANGE = 90
-LIDAR_PER_SECTOR = 20
-FRONT_LIDAR_INDICES = list(range(0, 16)) + list(range(-15, 0))  # front lidar indices
-LEFT_LIDAR_INDICES = list(range(16, 46))  # left lidar indices
-RIGHT_LIDAR_INDICES = list(range(-45, -15))  # right lidar indices
+from pros_car_py.lidar_sectors import LidarSectorExtractor
 
 
 class DataReceiverServiceNode(Node):
@@ -40,6 +34,7 @@ class DataReceiverServiceNode(Node):
         self.latest_scan = None
         self.latest_amcl_pose = None
         self.latest_goal_pose = None
+        self.lidar_extractor = LidarSectorExtractor()
 
         self.get_logger().info(
             "DataReceiverServiceNode 啟動完成，持續接收 /scan、/amcl_pose 與 /goal_pose 資料，並等待 service 呼叫"
@@ -112,23 +107,7 @@ class DataReceiverServiceNode(Node):
         處理 /scan 資料：根據全域常數將原始 LiDAR 資料轉換，
         並回傳一個 float 陣列，內容包含前方、左側與右側區域的距離資料。
         """
-        lidar_msg = self.latest_scan
-        angle_min = lidar_msg.angle_min
-        angle_increment = lidar_msg.angle_increment
-        ranges_180 = []
-        # 根據 LIDAR_PER_SECTOR 篩選取樣
-        all_ranges = lidar_msg.ranges
-        for i in range(len(all_ranges)):
-            if i % LIDAR_PER_SECTOR == 0:
-                # 可選擇計算對應角度，這裡僅保留距離數值
-                ranges_180.append(all_ranges[i])
-        # 根據設定好的索引範圍抽取對應區域的資料
-        combined_lidar_data = (
-            [ranges_180[i] for i in FRONT_LIDAR_INDICES]
-            + [ranges_180[i] for i in LEFT_LIDAR_INDICES]
-            + [ranges_180[i] for i in RIGHT_LIDAR_INDICES]
-        )
-        return combined_lidar_data
+        return self.lidar_extractor.extract(self.latest_scan).tolist()
 
 
 def main(args=None):